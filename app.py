@@ -1,141 +1,308 @@
-from flask import Flask, render_template, request, jsonify
-from flask_socketio import SocketIO, emit, join_room, leave_room
+from flask import Flask, Response, render_template, request, jsonify
+from flask_socketio import SocketIO, close_room, emit, join_room, leave_room
 from flask_cors import CORS
 import os
 import json
-import base64
-import numpy as np
-from PIL import Image
-import io
-import tensorflow as tf
 import logging
-import uuid
+import threading
+import time
+from functools import partial, wraps
+
+import serving
+from config import ServerConfig
+from executor import InferenceExecutor
+from metrics import CONTENT_TYPE, ServerMetrics
+from preprocessing import FrameDecodeError, FramePreprocessor
+from profiling import Profiler, ProfilerBusyError, ProfilerError
+from rooms import RoomError, RoomRegistry
+from scheduler import InferenceScheduler
+from serving import (admin_authorized, build_emission_policy, build_flight_recorder, build_gates,
+                     build_traffic_recorder, load_class_names, load_inference_model)
+from workers import InferencePool
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Model calls run on native threads so they never block the event loop, and
+# the Socket.IO async mode follows the server (eventlet under gunicorn)
+executor = InferenceExecutor()
+
 app = Flask(__name__)
 CORS(app)
-socketio = SocketIO(app, cors_allowed_origins="*", async_mode='threading')
+socketio = SocketIO(app, cors_allowed_origins="*", async_mode=executor.async_mode)
 
-# Store active rooms
-rooms = {}
+config = ServerConfig.from_env()
 
-# Load the model
-try:
-    model_path = 'models/new_sign_language_model.keras'
-    if os.path.exists(model_path):
-        model = tf.keras.models.load_model(model_path)
-        logger.info("Model loaded successfully")
-    else:
-        logger.error(f"Model not found at: {model_path}")
-        model = None
-except Exception as e:
-    logger.error(f"Error loading model: {e}")
-    model = None
-
-# Get class names
-try:
-    class_names = sorted(os.listdir("processed_dataset")) if os.path.exists("processed_dataset") else []
-    logger.info(f"Loaded {len(class_names)} classes: {class_names}")
-except Exception as e:
-    logger.error(f"Error loading classes: {e}")
-    class_names = []
+# Active signaling rooms
+rooms = RoomRegistry(max_peers=config.room_max_peers, idle_ttl_s=config.room_idle_ttl_s)
+
+# Model state, filled in by the background loader so the port opens right away
+model = None
+preprocessor = None  # matches the loaded model's input shape
+model_status = 'loading'  # 'loading' until warmed up, then 'ready' or 'unavailable'
+startup_timings = {}
+started_at = time.perf_counter()
+
+def load_model_in_background():
+    global model, model_status, preprocessor
+    loaded = load_inference_model(config, startup_timings, executor)
+    startup_timings['ready_s'] = time.perf_counter() - started_at
+    if loaded is None:
+        model_status = 'unavailable'
+        return
+    preprocessor = FramePreprocessor.for_model(loaded)
+    logger.info(f"Model input shape: {preprocessor.input_shape}")
+    model = loaded
+    scheduler.start()
+    model_status = 'ready'
+    logger.info(f"Model ready {startup_timings['ready_s']:.2f}s after startup")
+
+class_names = load_class_names(config.classes_dir)
+motion_gate, prediction_cache = build_gates(config)
+emission_policy = build_emission_policy(config)
+recorder = build_flight_recorder(config)
+# Opt-in log of incoming Socket.IO traffic for benchmarks/replay_traffic.py
+traffic = build_traffic_recorder(config)
+# Admin-triggered sampling, cProfile and TensorFlow profiler sessions
+profiler = Profiler()
+
+def run_model(batch):
+    with metrics.stages['inference'].time():
+        # The worker pool only waits on other processes; an in-process model would
+        # hold the event loop for the whole predict, so it runs on a native thread
+        if isinstance(model, InferencePool):
+            return model(batch)
+        return executor.run(profiler.inference, model, batch)
+
+def prepare_frame(data, trace):
+    return executor.run(profiler.call, serving.prepare_frame, preprocessor, data, metrics, recorder, trace)
+
+# Batch frames from all clients into shared model calls. Frames are decoded
+# on the scheduler thread so stale or replaced frames are never decoded.
+scheduler = InferenceScheduler(
+    run_model,
+    prepare_fn=prepare_frame,
+    max_batch_size=config.batch_max_size,
+    max_wait_ms=config.batch_max_wait_ms,
+    queue_depth=config.frame_queue_depth,
+    max_frame_age_ms=config.max_frame_age_ms,
+    concurrency=max(1, config.inference_workers),
+    gates=[gate for gate in (motion_gate, prediction_cache) if gate is not None],
+    recorder=recorder,
+)
+
+# Per-stage latency histograms and frame counters, scraped at /metrics
+metrics = ServerMetrics(scheduler, rooms, motion_gate=motion_gate, prediction_cache=prediction_cache)
+metrics.instrument_emits(socketio.server)
+
+# Spawned inference workers re-import this file as __mp_main__ when the server
+# is started with `python app.py`; they must not load models of their own.
+if __name__ != '__mp_main__':
+    threading.Thread(target=load_model_in_background, name='model-loader', daemon=True).start()
 
 @app.route('/')
 def index():
     return render_template('index.html', classes=class_names)
 
+@app.route('/ready')
+def ready():
+    # Health check target: only succeeds once the model can serve detections
+    status_code = 200 if model_status == 'ready' else 503
+    return jsonify({'status': model_status, 'startup': startup_timings}), status_code
+
+@app.route('/stats')
+def stats():
+    return jsonify({
+        'scheduler': scheduler.stats(),
+        'motion_gate': motion_gate.stats() if motion_gate else None,
+        'prediction_cache': prediction_cache.stats() if prediction_cache else None,
+        'emission': emission_policy.stats() if emission_policy else None,
+        'rooms': rooms.stats(),
+        'traffic_recorder': traffic.stats() if traffic else None,
+        'inference_pool': model.stats() if isinstance(model, InferencePool) else None,
+    })
+
+@app.route('/metrics')
+def prometheus_metrics():
+    return Response(metrics.expose(), content_type=CONTENT_TYPE)
+
+def require_admin(view):
+    # Admin routes need `Authorization: Bearer <ADMIN_TOKEN>`
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not admin_authorized(config, request.headers.get('Authorization')):
+            return jsonify({'error': 'Forbidden'}), 403
+        return view(*args, **kwargs)
+    return wrapper
+
+@app.route('/admin/flight-recorder')
+@require_admin
+def flight_recorder():
+    if recorder is None:
+        return jsonify({'error': 'Flight recorder disabled'}), 404
+    return jsonify(recorder.dump())
+
+@app.route('/admin/profile', methods=['POST'])
+@require_admin
+def profile():
+    # ?mode=sample (collapsed stacks) or cprofile (pstats), &seconds=N
+    mode = request.args.get('mode', 'sample')
+    try:
+        seconds = float(request.args.get('seconds', 10))
+        if mode == 'sample':
+            interval_ms = float(request.args.get('interval_ms', 5))
+            body = executor.run(profiler.sample, seconds, interval_ms)
+            content_type, filename = 'text/plain; charset=utf-8', 'profile.folded'
+        elif mode == 'cprofile':
+            body = executor.run(profiler.cprofile, seconds)
+            content_type, filename = 'application/octet-stream', 'profile.pstats'
+        else:
+            return jsonify({'error': f'Unknown profile mode: {mode}'}), 400
+    except ProfilerBusyError as e:
+        return jsonify({'error': str(e)}), 409
+    except (ProfilerError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+    return Response(body, content_type=content_type,
+                    headers={'Content-Disposition': f'attachment; filename={filename}'})
+
+@app.route('/admin/tf-trace', methods=['POST', 'DELETE'])
+@require_admin
+def tf_trace():
+    # POST traces the next ?calls=K model calls into PROFILE_DIR; DELETE stops a pending trace
+    if request.method == 'DELETE':
+        return jsonify({'cancelled': profiler.cancel_tf_trace()})
+    if model_status != 'ready' or isinstance(model, InferencePool) or config.inference_backend != 'keras':
+        return jsonify({'error': 'TensorFlow traces need the keras backend loaded in the server process'}), 400
+    logdir = os.path.join(config.profile_dir, time.strftime('%Y%m%d-%H%M%S'))
+    try:
+        calls = int(request.args.get('calls', 10))
+        # Importing TensorFlow and starting its profiler block
+        executor.run(profiler.start_tf_trace, logdir, calls)
+    except ProfilerBusyError as e:
+        return jsonify({'error': str(e)}), 409
+    except (ProfilerError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'logdir': logdir, 'calls': calls}), 202
+
 # WebRTC Signaling
+def record_traffic(event, room=None, data=None):
+    if traffic is not None:
+        traffic.record(event, request.sid, room, data)
+
+@socketio.on('connect')
+def on_connect():
+    metrics.connected.inc()
+    record_traffic('connect')
+
 @socketio.on('create_room')
 def on_create_room():
-    room_id = str(uuid.uuid4())[:8]
+    for room_id in rooms.expire():
+        close_room(room_id)
+        logger.info(f"Room expired: {room_id}")
+    room_id = rooms.create(request.sid)
+    record_traffic('create_room', room_id)
     join_room(room_id)
-    rooms[room_id] = {
-        'creator': request.sid,
-        'peers': [request.sid]
-    }
     logger.info(f"Room created: {room_id}")
     emit('room_created', room_id)
 
 @socketio.on('join_room')
 def on_join_room(room_id):
-    if room_id in rooms:
-        join_room(room_id)
-        rooms[room_id]['peers'].append(request.sid)
-        logger.info(f"User {request.sid} joined room: {room_id}")
-        emit('room_joined', room_id)
-    else:
-        emit('error', {'message': 'Room not found'})
+    record_traffic('join_room', room_id)
+    try:
+        rooms.join(room_id, request.sid)
+    except RoomError as e:
+        emit('error', {'message': str(e)})
+        return
+    join_room(room_id)
+    logger.info(f"User {request.sid} joined room: {room_id}")
+    emit('room_joined', room_id)
 
 @socketio.on('offer')
 def on_offer(data):
     room_id = data.get('roomId')
-    if room_id in rooms:
+    record_traffic('offer', room_id, data)
+    if rooms.touch(room_id):
         emit('offer', data.get('offer'), room=room_id, skip_sid=request.sid)
         logger.info(f"Offer forwarded in room: {room_id}")
 
 @socketio.on('answer')
 def on_answer(data):
     room_id = data.get('roomId')
-    if room_id in rooms:
+    record_traffic('answer', room_id, data)
+    if rooms.touch(room_id):
         emit('answer', data.get('answer'), room=room_id, skip_sid=request.sid)
         logger.info(f"Answer forwarded in room: {room_id}")
 
 @socketio.on('ice_candidate')
 def on_ice_candidate(data):
     room_id = data.get('roomId')
-    if room_id in rooms:
+    record_traffic('ice_candidate', room_id, data)
+    if rooms.touch(room_id):
         emit('ice_candidate', data.get('candidate'), room=room_id, skip_sid=request.sid)
         logger.info(f"ICE candidate forwarded in room: {room_id}")
 
 @socketio.on('disconnect')
 def on_disconnect():
-    for room_id in list(rooms.keys()):
-        if request.sid in rooms[room_id]['peers']:
-            rooms[room_id]['peers'].remove(request.sid)
-            if not rooms[room_id]['peers']:
-                del rooms[room_id]
-            else:
-                emit('peer_disconnected', room=room_id, skip_sid=request.sid)
-            leave_room(room_id)
-            logger.info(f"User {request.sid} left room: {room_id}")
+    metrics.connected.dec()
+    record_traffic('disconnect')
+    scheduler.remove_client(request.sid)
+    if emission_policy is not None:
+        emission_policy.remove_client(request.sid)
+    for room_id, remaining in rooms.leave_all(request.sid):
+        if remaining:
+            emit('peer_disconnected', room=room_id, skip_sid=request.sid)
+        leave_room(room_id)
+        logger.info(f"User {request.sid} left room: {room_id}")
 
 # Sign Detection
-def process_frame(frame_data):
+def decode_prediction(prediction):
+    return serving.decode_prediction(prediction, class_names)
+
+def emit_prediction(target, sid, client_ts, prediction, error):
+    # Runs on the scheduler thread, so emit through the server rather than the request context
+    if isinstance(error, FrameDecodeError):
+        logger.error(f"Frame processing failed: {error}")
+        metrics.frames_errored.labels('decode').inc()
+        socketio.emit('detection_error', {'error': 'Frame processing failed'}, room=sid)
+        return
+    if error is not None:
+        metrics.frames_errored.labels('inference').inc()
+        socketio.emit('detection_error', {'error': str(error)}, room=sid)
+        return
     try:
-        # Convert base64 image to numpy array
-        img_data = base64.b64decode(frame_data.split(',')[1])
-        img = Image.open(io.BytesIO(img_data))
-        img = img.resize((224, 224))  # Resize to model input size
-        img_array = np.array(img)
-        
-        # Normalize the image
-        img_array = img_array.astype('float32') / 255.0
-        
-        # Add batch dimension
-        img_array = np.expand_dims(img_array, axis=0)
-        
-        # Make prediction
-        predictions = model.predict(img_array)
-        predicted_class_index = np.argmax(predictions[0])
-        confidence = float(predictions[0][predicted_class_index])
-        
-        # Get the class label
-        predicted_class = class_names[predicted_class_index]
-        
-        return {
-            'label': predicted_class,
-            'confidence': confidence
-        }
+        result = decode_prediction(prediction)
     except Exception as e:
-        logger.error(f"Error processing frame: {str(e)}")
-        return None
+        logger.error(f"Error decoding prediction: {e}")
+        metrics.frames_errored.labels('inference').inc()
+        socketio.emit('detection_error', {'error': 'Frame processing failed'}, room=sid)
+        return
+
+    reason = 'label'
+    if emission_policy is not None:
+        reason = emission_policy.reason_to_emit(sid, result['label'], result['confidence'])
+        if reason is None:
+            return
+
+    if client_ts is not None:
+        # Echo the capture time so clients can measure end-to-end latency
+        result['ts'] = client_ts
+
+    socketio.emit('detection_result', result, room=target)
+    if reason == 'label':
+        logger.info(f"Detection: {result['label']} ({result['confidence']:.2f})")
+    else:
+        logger.debug(f"Detection ({reason}): {result['label']} ({result['confidence']:.2f})")
 
 @socketio.on('detect_sign')
 def detect_sign(data):
+    metrics.frames_received.inc()
+    record_traffic('detect_sign', data.get('roomId') if isinstance(data, dict) else None, data)
     try:
+        if model_status == 'loading':
+            emit('detection_error', {'error': 'Model loading', 'status': 'loading'})
+            return
+
         if not model:
             logger.error("Model not loaded")
             emit('detection_error', {'error': 'Model not loaded'})
@@ -146,21 +313,19 @@ def detect_sign(data):
             emit('detection_error', {'error': 'No image data received'})
             return
 
-        # Process frame
-        result = process_frame(data['image'])
-        if result is None:
-            logger.error("Frame processing failed")
-            emit('detection_error', {'error': 'Frame processing failed'})
-            return
+        # Optional client capture time (ms since epoch) used to drop stale frames
+        client_ts = data.get('ts')
+        if not isinstance(client_ts, (int, float)) or isinstance(client_ts, bool):
+            client_ts = None
 
-        # Emit result to all users in the room
+        # Results go to all users in the room, or back to the sender. The
+        # image (binary attachment or base64 data URL) is decoded by the scheduler.
         room_id = data.get('roomId')
-        if room_id and room_id in rooms:
-            emit('detection_result', result, room=room_id)
-        else:
-            emit('detection_result', result)
-             
-        logger.info(f"Detection: {result['label']} ({result['confidence']:.2f})")
+        target = room_id if room_id and rooms.touch(room_id) else request.sid
+        if not scheduler.submit(request.sid, data, partial(emit_prediction, target, request.sid, client_ts),
+                                client_ts=client_ts):
+            # Too old on arrival; tell the client rather than going quiet
+            emit('frame_dropped', {'reason': 'stale', 'ts': client_ts})
 
     except Exception as e:
         logger.error(f"Error in detection: {e}")
@@ -0,0 +1,387 @@
+"""ASGI entry point: the same routes and Socket.IO events as ``app.py`` on asyncio.
+
+    uvicorn asgi:app --host 0.0.0.0 --port 5000
+
+One event loop serves every Socket.IO connection through python-socketio's
+``AsyncServer``, so idle signaling connections cost a coroutine each rather
+than a green thread. Nothing blocking runs on the loop: the model is loaded
+with ``loop.run_in_executor`` on a bounded thread pool, frames are decoded and
+predicted on the inference scheduler's threads (micro-batching and gates work
+as in ``app.py``), and results are handed back to the loop to be emitted.
+"""
+import asyncio
+import inspect
+import json
+import logging
+import os
+import time
+from urllib.parse import parse_qs
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+import socketio
+from jinja2 import Environment, FileSystemLoader
+
+import serving
+from config import ServerConfig
+from metrics import CONTENT_TYPE, ServerMetrics
+from preprocessing import FrameDecodeError, FramePreprocessor
+from profiling import Profiler, ProfilerBusyError, ProfilerError
+from rooms import RoomError, RoomRegistry
+from scheduler import InferenceScheduler
+from serving import (admin_authorized, build_emission_policy, build_flight_recorder, build_gates,
+                     build_traffic_recorder, load_class_names, load_inference_model)
+from workers import InferencePool
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+config = ServerConfig.from_env()
+
+sio = socketio.AsyncServer(async_mode='asgi', cors_allowed_origins='*')
+
+# Active signaling rooms
+rooms = RoomRegistry(max_peers=config.room_max_peers, idle_ttl_s=config.room_idle_ttl_s)
+
+# Model state, filled in by the background loader so the port opens right away
+model = None
+preprocessor = None  # matches the loaded model's input shape
+model_status = 'loading'  # 'loading' until warmed up, then 'ready' or 'unavailable'
+startup_timings = {}
+started_at = time.perf_counter()
+
+# Blocking startup work (importing TensorFlow, loading and warming up the model)
+blocking_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='model-loader')
+loop = None  # the server's event loop, set at startup
+
+class_names = load_class_names(config.classes_dir)
+motion_gate, prediction_cache = build_gates(config)
+emission_policy = build_emission_policy(config)
+recorder = build_flight_recorder(config)
+# Opt-in log of incoming Socket.IO traffic for benchmarks/replay_traffic.py
+traffic = build_traffic_recorder(config)
+# Admin-triggered sampling, cProfile and TensorFlow profiler sessions
+profiler = Profiler()
+
+def run_model(batch):
+    with metrics.stages['inference'].time():
+        if isinstance(model, InferencePool):
+            return model(batch)
+        return profiler.inference(model, batch)
+
+def prepare_frame(data, trace):
+    return profiler.call(serving.prepare_frame, preprocessor, data, metrics, recorder, trace)
+
+# The scheduler's threads are the bounded inference pool: each one decodes,
+# batches and predicts, then hands the results back to the event loop
+scheduler = InferenceScheduler(
+    run_model,
+    prepare_fn=prepare_frame,
+    max_batch_size=config.batch_max_size,
+    max_wait_ms=config.batch_max_wait_ms,
+    queue_depth=config.frame_queue_depth,
+    max_frame_age_ms=config.max_frame_age_ms,
+    concurrency=max(1, config.inference_workers),
+    gates=[gate for gate in (motion_gate, prediction_cache) if gate is not None],
+    recorder=recorder,
+)
+
+# Per-stage latency histograms and frame counters, scraped at /metrics
+metrics = ServerMetrics(scheduler, rooms, motion_gate=motion_gate, prediction_cache=prediction_cache)
+metrics.instrument_emits(sio)
+
+async def load_model_in_background():
+    global model, model_status, preprocessor
+    loaded = await loop.run_in_executor(blocking_pool, load_inference_model, config, startup_timings)
+    startup_timings['ready_s'] = time.perf_counter() - started_at
+    if loaded is None:
+        model_status = 'unavailable'
+        return
+    preprocessor = FramePreprocessor.for_model(loaded)
+    logger.info(f"Model input shape: {preprocessor.input_shape}")
+    model = loaded
+    scheduler.start()
+    model_status = 'ready'
+    logger.info(f"Model ready {startup_timings['ready_s']:.2f}s after startup")
+
+async def on_startup():
+    global loop
+    loop = asyncio.get_running_loop()
+    loop.create_task(load_model_in_background())
+
+def on_shutdown():
+    if model_status == 'ready':
+        scheduler.stop()
+    if isinstance(model, InferencePool):
+        model.close()
+    blocking_pool.shutdown(wait=False)
+    if traffic is not None:
+        traffic.close()
+
+# HTTP routes
+templates = Environment(loader=FileSystemLoader(os.path.join(ROOT, 'templates')), autoescape=True)
+# index.html links its assets with Flask's url_for
+templates.globals['url_for'] = lambda endpoint, filename: f'/{endpoint}/{filename}'
+
+async def send_response(send, status, body, content_type, headers=()):
+    await send({'type': 'http.response.start', 'status': status,
+                'headers': [(b'content-type', content_type.encode()),
+                            (b'content-length', str(len(body)).encode())] + list(headers)})
+    await send({'type': 'http.response.body', 'body': body})
+
+async def send_json(send, data, status=200):
+    await send_response(send, status, json.dumps(data).encode(), 'application/json')
+
+async def profile(send, params):
+    # ?mode=sample (collapsed stacks) or cprofile (pstats), &seconds=N
+    mode = params.get('mode', 'sample')
+    try:
+        seconds = float(params.get('seconds', 10))
+        if mode == 'sample':
+            interval_ms = float(params.get('interval_ms', 5))
+            body = await loop.run_in_executor(None, profiler.sample, seconds, interval_ms)
+            body, content_type, filename = body.encode(), 'text/plain; charset=utf-8', 'profile.folded'
+        elif mode == 'cprofile':
+            body = await loop.run_in_executor(None, profiler.cprofile, seconds)
+            content_type, filename = 'application/octet-stream', 'profile.pstats'
+        else:
+            await send_json(send, {'error': f'Unknown profile mode: {mode}'}, 400)
+            return
+    except ProfilerBusyError as e:
+        await send_json(send, {'error': str(e)}, 409)
+        return
+    except (ProfilerError, ValueError) as e:
+        await send_json(send, {'error': str(e)}, 400)
+        return
+    await send_response(send, 200, body, content_type,
+                        [(b'content-disposition', f'attachment; filename={filename}'.encode())])
+
+async def tf_trace(send, params, method='POST'):
+    # POST traces the next ?calls=K model calls into PROFILE_DIR; DELETE stops a pending trace
+    if method == 'DELETE':
+        await send_json(send, {'cancelled': profiler.cancel_tf_trace()})
+        return
+    if model_status != 'ready' or isinstance(model, InferencePool) or config.inference_backend != 'keras':
+        await send_json(send, {'error': 'TensorFlow traces need the keras backend loaded in the server process'}, 400)
+        return
+    logdir = os.path.join(config.profile_dir, time.strftime('%Y%m%d-%H%M%S'))
+    try:
+        calls = int(params.get('calls', 10))
+        await loop.run_in_executor(None, profiler.start_tf_trace, logdir, calls)
+    except ProfilerBusyError as e:
+        await send_json(send, {'error': str(e)}, 409)
+        return
+    except (ProfilerError, ValueError) as e:
+        await send_json(send, {'error': str(e)}, 400)
+        return
+    await send_json(send, {'logdir': logdir, 'calls': calls}, 202)
+
+def query_params(scope):
+    return {name: values[-1] for name, values in parse_qs(scope['query_string'].decode()).items()}
+
+def is_admin(scope):
+    # Admin routes need `Authorization: Bearer <ADMIN_TOKEN>`
+    headers = dict(scope['headers'])
+    return admin_authorized(config, headers.get(b'authorization', b'').decode('latin-1'))
+
+async def http_app(scope, receive, send):
+    if scope['type'] != 'http':
+        return
+    path = scope['path']
+    if path.startswith('/admin/') and not is_admin(scope):
+        await send_json(send, {'error': 'Forbidden'}, 403)
+        return
+    if path == '/':
+        page = templates.get_template('index.html').render(classes=class_names)
+        await send_response(send, 200, page.encode(), 'text/html; charset=utf-8')
+    elif path == '/ready':
+        # Health check target: only succeeds once the model can serve detections
+        status_code = 200 if model_status == 'ready' else 503
+        await send_json(send, {'status': model_status, 'startup': startup_timings}, status_code)
+    elif path == '/metrics':
+        await send_response(send, 200, metrics.expose().encode(), CONTENT_TYPE)
+    elif path == '/stats':
+        await send_json(send, {
+            'scheduler': scheduler.stats(),
+            'motion_gate': motion_gate.stats() if motion_gate else None,
+            'prediction_cache': prediction_cache.stats() if prediction_cache else None,
+            'emission': emission_policy.stats() if emission_policy else None,
+            'rooms': rooms.stats(),
+            'traffic_recorder': traffic.stats() if traffic else None,
+            'inference_pool': model.stats() if isinstance(model, InferencePool) else None,
+        })
+    elif path == '/admin/flight-recorder':
+        if recorder is None:
+            await send_json(send, {'error': 'Flight recorder disabled'}, 404)
+        else:
+            await send_json(send, recorder.dump())
+    elif path == '/admin/profile' and scope['method'] == 'POST':
+        await profile(send, query_params(scope))
+    elif path == '/admin/tf-trace' and scope['method'] in ('POST', 'DELETE'):
+        await tf_trace(send, query_params(scope), scope['method'])
+    else:
+        await send_response(send, 404, b'Not Found', 'text/plain')
+
+app = socketio.ASGIApp(sio, other_asgi_app=http_app, static_files={'/static': os.path.join(ROOT, 'static')},
+                       on_startup=on_startup, on_shutdown=on_shutdown)
+
+# WebRTC Signaling
+def record_traffic(event, sid, room=None, data=None):
+    if traffic is not None:
+        traffic.record(event, sid, room, data)
+
+async def room_membership(method, sid, room_id):
+    # AsyncServer.enter_room/leave_room are plain methods up to python-socketio
+    # 5.8 (the pinned 5.4.0) and coroutines from 5.9 on
+    result = method(sid, room_id)
+    if inspect.isawaitable(result):
+        await result
+
+@sio.on('connect')
+async def on_connect(sid, environ):
+    metrics.connected.inc()
+    record_traffic('connect', sid)
+
+@sio.on('create_room')
+async def on_create_room(sid):
+    for room_id in rooms.expire():
+        await sio.close_room(room_id)
+        logger.info(f"Room expired: {room_id}")
+    room_id = rooms.create(sid)
+    record_traffic('create_room', sid, room_id)
+    await room_membership(sio.enter_room, sid, room_id)
+    logger.info(f"Room created: {room_id}")
+    await sio.emit('room_created', room_id, to=sid)
+
+@sio.on('join_room')
+async def on_join_room(sid, room_id):
+    record_traffic('join_room', sid, room_id)
+    try:
+        rooms.join(room_id, sid)
+    except RoomError as e:
+        await sio.emit('error', {'message': str(e)}, to=sid)
+        return
+    await room_membership(sio.enter_room, sid, room_id)
+    logger.info(f"User {sid} joined room: {room_id}")
+    await sio.emit('room_joined', room_id, to=sid)
+
+@sio.on('offer')
+async def on_offer(sid, data):
+    room_id = data.get('roomId')
+    record_traffic('offer', sid, room_id, data)
+    if rooms.touch(room_id):
+        await sio.emit('offer', data.get('offer'), room=room_id, skip_sid=sid)
+        logger.info(f"Offer forwarded in room: {room_id}")
+
+@sio.on('answer')
+async def on_answer(sid, data):
+    room_id = data.get('roomId')
+    record_traffic('answer', sid, room_id, data)
+    if rooms.touch(room_id):
+        await sio.emit('answer', data.get('answer'), room=room_id, skip_sid=sid)
+        logger.info(f"Answer forwarded in room: {room_id}")
+
+@sio.on('ice_candidate')
+async def on_ice_candidate(sid, data):
+    room_id = data.get('roomId')
+    record_traffic('ice_candidate', sid, room_id, data)
+    if rooms.touch(room_id):
+        await sio.emit('ice_candidate', data.get('candidate'), room=room_id, skip_sid=sid)
+        logger.info(f"ICE candidate forwarded in room: {room_id}")
+
+@sio.on('disconnect')
+async def on_disconnect(sid):
+    metrics.connected.dec()
+    record_traffic('disconnect', sid)
+    scheduler.remove_client(sid)
+    if emission_policy is not None:
+        emission_policy.remove_client(sid)
+    for room_id, remaining in rooms.leave_all(sid):
+        if remaining:
+            await sio.emit('peer_disconnected', room=room_id, skip_sid=sid)
+        await room_membership(sio.leave_room, sid, room_id)
+        logger.info(f"User {sid} left room: {room_id}")
+
+# Sign Detection
+def emit_prediction(target, sid, client_ts, prediction, error):
+    # Runs on a scheduler thread; the emit itself is scheduled on the event loop
+    def emit(event, data, room):
+        asyncio.run_coroutine_threadsafe(sio.emit(event, data, room=room), loop)
+
+    if isinstance(error, FrameDecodeError):
+        logger.error(f"Frame processing failed: {error}")
+        metrics.frames_errored.labels('decode').inc()
+        emit('detection_error', {'error': 'Frame processing failed'}, sid)
+        return
+    if error is not None:
+        metrics.frames_errored.labels('inference').inc()
+        emit('detection_error', {'error': str(error)}, sid)
+        return
+    try:
+        result = serving.decode_prediction(prediction, class_names)
+    except Exception as e:
+        logger.error(f"Error decoding prediction: {e}")
+        metrics.frames_errored.labels('inference').inc()
+        emit('detection_error', {'error': 'Frame processing failed'}, sid)
+        return
+
+    reason = 'label'
+    if emission_policy is not None:
+        reason = emission_policy.reason_to_emit(sid, result['label'], result['confidence'])
+        if reason is None:
+            return
+
+    if client_ts is not None:
+        # Echo the capture time so clients can measure end-to-end latency
+        result['ts'] = client_ts
+
+    emit('detection_result', result, target)
+    if reason == 'label':
+        logger.info(f"Detection: {result['label']} ({result['confidence']:.2f})")
+    else:
+        logger.debug(f"Detection ({reason}): {result['label']} ({result['confidence']:.2f})")
+
+@sio.on('detect_sign')
+async def detect_sign(sid, data):
+    metrics.frames_received.inc()
+    record_traffic('detect_sign', sid, data.get('roomId') if isinstance(data, dict) else None, data)
+    try:
+        if model_status == 'loading':
+            await sio.emit('detection_error', {'error': 'Model loading', 'status': 'loading'}, to=sid)
+            return
+
+        if not model:
+            logger.error("Model not loaded")
+            await sio.emit('detection_error', {'error': 'Model not loaded'}, to=sid)
+            return
+
+        if not data or 'image' not in data:
+            logger.error("No image data received")
+            await sio.emit('detection_error', {'error': 'No image data received'}, to=sid)
+            return
+
+        # Optional client capture time (ms since epoch) used to drop stale frames
+        client_ts = data.get('ts')
+        if not isinstance(client_ts, (int, float)) or isinstance(client_ts, bool):
+            client_ts = None
+
+        # Results go to all users in the room, or back to the sender. The
+        # image is decoded by the scheduler, off the event loop.
+        room_id = data.get('roomId')
+        target = room_id if room_id and rooms.touch(room_id) else sid
+        if not scheduler.submit(sid, data, partial(emit_prediction, target, sid, client_ts), client_ts=client_ts):
+            # Too old on arrival; tell the client rather than going quiet
+            await sio.emit('frame_dropped', {'reason': 'stale', 'ts': client_ts}, to=sid)
+
+    except Exception as e:
+        logger.error(f"Error in detection: {e}")
+        await sio.emit('detection_error', {'error': str(e)}, to=sid)
+
+if __name__ == '__main__':
+    import uvicorn
+    port = int(os.environ.get('PORT', 5000))
+    logger.info(f"Starting ASGI server on port {port}")
+    uvicorn.run(app, host='0.0.0.0', port=port)
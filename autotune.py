@@ -0,0 +1,210 @@
+"""Tune the inference settings for this machine and write them to the server config.
+
+Sweeps the backend (keras, the traced ``tf.function`` the server runs, and
+tflite), TensorFlow's intra-op and inter-op threads with OpenMP threads
+matched to intra-op, the TFLite interpreter threads, and the scheduler's
+batch size. Every thread setting runs in a fresh process, since TensorFlow
+and OpenMP fix their thread pools when they start. Each process loads the
+deployed model and drives it through the server's ``InferenceScheduler``
+with ``--concurrency`` clients. Every client submits a frame, waits for
+its prediction and submits the next, for ``--duration`` seconds per batch
+size.
+
+The winner has the highest throughput among the settings whose p99 latency
+fits within ``--max-p99-ms``, or the lowest p99 if none does. It is merged
+into ``--output`` (``server_config.json``, which ``ServerConfig.from_env``
+reads at startup), and environment variables still override it.
+
+    python convert_model.py tflite
+    python autotune.py --concurrency 8 --max-p99-ms 100
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from dataclasses import asdict
+
+import numpy as np
+
+from config import CONFIG_FILE, ServerConfig
+from preprocessing import as_frame_dtype
+
+BATCH_SIZES = (1, 2, 4, 8, 16)
+
+
+def thread_counts(cpus):
+    """1, 2, 4, ... up to and including ``cpus``."""
+    counts, count = [], 1
+    while count < cpus:
+        counts.append(count)
+        count *= 2
+    return counts + [cpus]
+
+
+def candidates(args, cpus):
+    """Thread settings to try, one process each."""
+    settings = []
+    if 'keras' in args.backends:
+        for intra in thread_counts(cpus):
+            for inter in sorted({1, min(2, cpus)}):
+                settings.append({'inference_backend': 'keras', 'tf_intra_op_threads': intra,
+                                 'tf_inter_op_threads': inter, 'omp_num_threads': intra})
+    if 'tflite' in args.backends:
+        for threads in thread_counts(cpus):
+            settings.append({'inference_backend': 'tflite', 'tflite_threads': threads})
+    return settings
+
+
+def measure_batch_size(model, batch_size, args):
+    """Throughput and latency of ``args.concurrency`` closed-loop clients."""
+    from scheduler import InferenceScheduler
+
+    frame = as_frame_dtype(np.random.default_rng(0).integers(0, 256, tuple(model.input_shape), dtype=np.uint8),
+                           model.frame_dtype)
+    scheduler = InferenceScheduler(model, max_batch_size=batch_size, max_wait_ms=args.max_wait_ms)
+    scheduler.start()
+    latencies, lock = [], threading.Lock()
+    stop_at = time.perf_counter() + args.duration
+
+    def client(key):
+        done = threading.Event()
+        while time.perf_counter() < stop_at:
+            done.clear()
+            start = time.perf_counter()
+            scheduler.submit(key, frame, lambda prediction, error: done.set())
+            done.wait()
+            with lock:
+                latencies.append((time.perf_counter() - start) * 1000)
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(args.concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    scheduler.stop()
+    return {
+        'batch_max_size': batch_size,
+        'throughput': len(latencies) / elapsed,
+        'p50_ms': float(np.percentile(latencies, 50)),
+        'p99_ms': float(np.percentile(latencies, 99)),
+    }
+
+
+def run_trial(args):
+    """Child process: load the model with one thread setting and try every batch size."""
+    from inference import load_and_warm_up
+
+    settings = json.loads(args.trial)
+    backend = settings['inference_backend']
+    model_path = args.tflite_model if backend == 'tflite' else args.model
+    model, _ = load_and_warm_up(
+        model_path,
+        backend=backend,
+        num_threads=settings.get('tflite_threads'),
+        warmup_batch_sizes=args.batch_sizes,
+        warmup_iterations=3,
+        intra_op_threads=settings.get('tf_intra_op_threads', 0),
+        inter_op_threads=settings.get('tf_inter_op_threads', 0),
+        omp_num_threads=settings.get('omp_num_threads', 0),
+    )
+    results = [dict(settings, **measure_batch_size(model, batch_size, args)) for batch_size in args.batch_sizes]
+    print(json.dumps(results))
+
+
+def trial(settings, args):
+    command = [sys.executable, os.path.abspath(__file__), '--trial', json.dumps(settings),
+               '--model', args.model, '--tflite-model', args.tflite_model,
+               '--concurrency', str(args.concurrency), '--duration', str(args.duration),
+               '--max-wait-ms', str(args.max_wait_ms), '--batch-sizes', *map(str, args.batch_sizes)]
+    # Inherited thread settings would pin every trial to the same pools
+    env = {name: value for name, value in os.environ.items()
+           if name not in ('OMP_NUM_THREADS', 'TF_NUM_INTRAOP_THREADS', 'TF_NUM_INTEROP_THREADS')}
+    process = subprocess.run(command, capture_output=True, text=True, env=env)
+    if process.returncode != 0:
+        print(f"  failed: {process.stderr.strip().splitlines()[-1] if process.stderr.strip() else process.returncode}")
+        return []
+    return json.loads(process.stdout.strip().splitlines()[-1])
+
+
+def best(results, max_p99_ms):
+    within = [result for result in results if max_p99_ms is None or result['p99_ms'] <= max_p99_ms]
+    if within:
+        return max(within, key=lambda result: result['throughput'])
+    return min(results, key=lambda result: result['p99_ms'])
+
+
+def write_config(path, chosen):
+    """Merge the tuned fields into the config file at ``path``."""
+    values = {}
+    if os.path.exists(path):
+        with open(path) as f:
+            values = json.load(f)
+    tuned = {name: chosen[name] for name in asdict(ServerConfig()) if name in chosen}
+    # A tuned backend leaves the other backend's thread settings at their defaults
+    for name in ('tflite_threads', 'tf_intra_op_threads', 'tf_inter_op_threads', 'omp_num_threads'):
+        tuned.setdefault(name, 0)
+    values.update(tuned)
+    with open(path, 'w') as f:
+        json.dump(values, f, indent=2, sort_keys=True)
+        f.write('\n')
+    return tuned
+
+
+def main():
+    config = ServerConfig.from_env()
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--model', default=config.model_path, help="Keras model")
+    parser.add_argument('--tflite-model', default=config.tflite_model_path)
+    parser.add_argument('--backends', nargs='+', choices=('keras', 'tflite'), default=['keras', 'tflite'])
+    parser.add_argument('--concurrency', type=int, default=8, help="Clients waiting on predictions at once")
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=list(BATCH_SIZES))
+    parser.add_argument('--max-wait-ms', type=float, default=config.batch_max_wait_ms)
+    parser.add_argument('--duration', type=float, default=5.0, help="Seconds measured per batch size")
+    parser.add_argument('--max-p99-ms', type=float, help="Latency budget; the fastest setting within it wins")
+    parser.add_argument('--cpus', type=int, default=os.cpu_count(), help="Most threads to try")
+    parser.add_argument('--output', default=os.environ.get('SERVER_CONFIG_FILE') or CONFIG_FILE)
+    parser.add_argument('--dry-run', action='store_true', help="Report the winner without writing it")
+    parser.add_argument('--trial', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.trial:
+        run_trial(args)
+        return
+
+    backends = [backend for backend in args.backends
+                if os.path.exists(args.tflite_model if backend == 'tflite' else args.model)]
+    if not backends:
+        sys.exit("No model found; pass --model or --tflite-model")
+    args.backends = backends
+    settings = candidates(args, args.cpus)
+    print(f"{len(settings)} thread settings x {len(args.batch_sizes)} batch sizes, "
+          f"{args.concurrency} concurrent clients, {args.duration:g} s each")
+
+    results = []
+    for i, setting in enumerate(settings, 1):
+        print(f"[{i}/{len(settings)}] {setting}")
+        for result in trial(setting, args):
+            results.append(result)
+            print(f"  batch {result['batch_max_size']:>3}: {result['throughput']:8.1f} frames/s, "
+                  f"p50 {result['p50_ms']:7.2f} ms, p99 {result['p99_ms']:7.2f} ms")
+    if not results:
+        sys.exit("Every trial failed")
+
+    chosen = best(results, args.max_p99_ms)
+    if args.max_p99_ms is not None and chosen['p99_ms'] > args.max_p99_ms:
+        print(f"\nNo setting meets p99 <= {args.max_p99_ms:g} ms; choosing the lowest p99")
+    print(f"\nbest: {chosen['throughput']:.1f} frames/s, p99 {chosen['p99_ms']:.2f} ms")
+    if args.dry_run:
+        print(json.dumps({name: chosen[name] for name in asdict(ServerConfig()) if name in chosen}, indent=2))
+        return
+    tuned = write_config(args.output, chosen)
+    print(f"Wrote {', '.join(f'{name}={value}' for name, value in sorted(tuned.items()))} to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,139 @@
+"""pytest-benchmark suite for each stage of the detection hot path.
+
+Times the stages ``serving.prepare_frame`` and ``emit_prediction`` run for a
+``detect_sign`` frame, each one in isolation: the data URL split, base64
+decode, PIL decode (with the JPEG draft to the model size), grayscale
+conversion and resize, normalize, the model call, and the argmax and label
+lookup. Frames are fixed fixtures at several resolutions and JPEG qualities,
+built from one dataset image with seeded sensor noise so their sizes are
+close to real webcam frames.
+
+The predict stage loads the configured model (``MODEL_PATH``,
+``INFERENCE_BACKEND``, as the server does) and is skipped when the model file
+or its backend is missing.
+
+Save a baseline once, then compare every later run against it. The run fails
+if any benchmark's median is more than the threshold slower:
+
+    pip install pytest pytest-benchmark
+    python -m pytest benchmarks/bench_hot_path.py --benchmark-save=baseline
+    python -m pytest benchmarks/bench_hot_path.py --benchmark-compare=0001 --benchmark-compare-fail=median:10%
+
+Results are written as JSON under ``.benchmarks/``. Add
+``--benchmark-json=results.json`` to keep a copy elsewhere, and
+``--benchmark-only -k 640x480`` to run a subset.
+"""
+import base64
+import glob
+import io
+import os
+import sys
+
+import numpy as np
+import pytest
+
+pytest.importorskip('pytest_benchmark')
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from config import ServerConfig
+from preprocessing import FramePreprocessor, as_frame_dtype, decode_data_url
+from serving import decode_prediction
+
+RESOLUTIONS = ((160, 120), (320, 240), (640, 480), (1280, 720))
+QUALITIES = (50, 80, 95)
+FIXTURE_IMAGE = os.path.join(ROOT, 'scripts', 'dataset', 'Hi', '0.jpg')
+CLASS_NAMES = sorted(os.path.basename(path) for path in glob.glob(os.path.join(ROOT, 'scripts', 'dataset', '*')))
+
+
+def _fixture_jpeg(size, quality):
+    from PIL import Image
+    source = Image.open(FIXTURE_IMAGE).convert('RGB').resize(size, Image.BICUBIC)
+    # Webcam sensor noise, seeded so every run encodes the same bytes
+    noise = np.random.default_rng(0).normal(0.0, 4.0, (size[1], size[0], 3))
+    pixels = np.clip(np.asarray(source, dtype=np.float32) + noise, 0, 255).astype(np.uint8)
+    buffer = io.BytesIO()
+    Image.fromarray(pixels).save(buffer, format='JPEG', quality=quality)
+    return buffer.getvalue()
+
+
+@pytest.fixture(scope='session', params=[(size, quality) for size in RESOLUTIONS for quality in QUALITIES],
+                ids=lambda param: f'{param[0][0]}x{param[0][1]}-q{param[1]}')
+def frame(request):
+    """One fixture frame as JPEG bytes and as the data URL legacy clients send."""
+    size, quality = request.param
+    jpeg = _fixture_jpeg(size, quality)
+    return {'jpeg': jpeg, 'data_url': 'data:image/jpeg;base64,' + base64.b64encode(jpeg).decode()}
+
+
+@pytest.fixture(scope='session')
+def preprocessor():
+    return FramePreprocessor()
+
+
+@pytest.fixture(scope='session')
+def model():
+    config = ServerConfig.from_env()
+    if not os.path.exists(config.serving_model_path):
+        pytest.skip(f"Model not found at {config.serving_model_path}")
+    try:
+        from inference import load_model
+        return load_model(config.serving_model_path, backend=config.inference_backend,
+                          num_threads=config.tflite_threads)
+    except ImportError as e:
+        pytest.skip(f"{config.inference_backend} backend unavailable: {e}")
+
+
+def test_data_url_split(benchmark, frame):
+    benchmark.group = 'data_url_split'
+    benchmark(str.split, frame['data_url'], ',', 1)
+
+
+def test_base64_decode(benchmark, frame):
+    benchmark.group = 'base64_decode'
+    payload = frame['data_url'].split(',', 1)[1]
+    assert benchmark(base64.b64decode, payload) == frame['jpeg']
+
+
+def test_image_decode(benchmark, frame, preprocessor):
+    benchmark.group = 'image_decode'
+    benchmark(preprocessor.decode, frame['jpeg'])
+
+
+def test_resize(benchmark, frame, preprocessor):
+    benchmark.group = 'resize'
+    decoded = preprocessor.decode(frame['jpeg'])
+    # to_image on a loaded image only converts its color mode and resizes
+    image = benchmark(preprocessor.to_image, decoded)
+    assert image.size == preprocessor.size
+
+
+def test_normalize(benchmark, frame, preprocessor):
+    benchmark.group = 'normalize'
+    resized = preprocessor.to_image(frame['jpeg'])
+    out = np.empty(preprocessor.input_shape, dtype=np.float32)
+    prepared = benchmark(preprocessor.preprocess, resized, out=out)
+    assert prepared.shape == preprocessor.input_shape
+
+
+def test_prepare_frame(benchmark, frame, preprocessor):
+    """Every stage before the model, as the scheduler runs them for one frame."""
+    benchmark.group = 'prepare_frame'
+    prepared = benchmark(lambda: preprocessor(preprocessor.decode(decode_data_url(frame['data_url']))))
+    assert prepared.shape == preprocessor.input_shape
+
+
+@pytest.mark.parametrize('batch_size', (1, ServerConfig().batch_max_size))
+def test_predict(benchmark, model, batch_size):
+    benchmark.group = 'predict'
+    pixels = np.random.default_rng(0).integers(0, 256, (batch_size,) + tuple(model.input_shape)[-3:], dtype=np.uint8)
+    batch = as_frame_dtype(pixels, model.frame_dtype)
+    predictions = benchmark(model, batch)
+    assert len(predictions) == batch_size
+
+
+def test_decode_prediction(benchmark):
+    benchmark.group = 'decode_prediction'
+    prediction = np.random.default_rng(0).dirichlet(np.ones(len(CLASS_NAMES))).astype(np.float32)
+    result = benchmark(decode_prediction, prediction, CLASS_NAMES)
+    assert result['label'] == CLASS_NAMES[int(np.argmax(prediction))]
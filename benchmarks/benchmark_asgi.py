@@ -0,0 +1,228 @@
+"""Connection capacity and signaling latency: eventlet (app.py) vs ASGI (asgi.py).
+
+Starts each server with the stand-in model from
+``benchmark_signaling_latency.py`` (every call blocks its OS thread for
+``--model-ms``): ``app.py`` on eventlet, as under ``gunicorn -k eventlet``,
+and ``asgi.py`` on uvicorn. Against each one it then
+
+1. opens up to ``--idle`` idle Socket.IO connections (raw websockets that
+   only answer pings), stopping once connects keep timing out, and records
+   how many the server accepted and its resident memory per connection;
+2. with those connections held, keeps inference saturated with detection
+   clients and measures the ``create_room`` -> ``room_created`` round trip.
+
+    pip install eventlet uvicorn websocket-client
+    python benchmarks/benchmark_asgi.py --idle 2000 --clients 8
+"""
+import argparse
+import os
+import selectors
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from benchmark_signaling_latency import BlockingModel, detection_client, signaling_latency
+from dataset_frames import load_frames
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SERVERS = ('eventlet', 'asgi')
+
+
+def run_server(args):
+    sys.path.insert(0, ROOT)
+    from preprocessing import DEFAULT_INPUT_SHAPE
+
+    if args.server == 'eventlet':
+        import eventlet
+        eventlet.monkey_patch()
+        import app
+        from preprocessing import FramePreprocessor
+        app.class_names = ['A', 'B']
+        # The unpatched sleep blocks the whole OS thread, like a predict, instead of yielding to the hub
+        app.model = BlockingModel(args.model_ms, len(app.class_names), eventlet.patcher.original('time').sleep)
+        app.preprocessor = FramePreprocessor()
+        app.scheduler.start()
+        app.model_status = 'ready'
+        app.socketio.run(app.app, host='127.0.0.1', port=args.port, log_output=False)
+        return
+
+    import uvicorn
+    import asgi
+    asgi.class_names = ['A', 'B']
+    model = BlockingModel(args.model_ms, len(asgi.class_names), time.sleep)
+    model.input_shape = (None,) + DEFAULT_INPUT_SHAPE
+    # Loaded through the same run_in_executor path as a real model
+    asgi.load_inference_model = lambda config, startup_timings: model
+    uvicorn.run(asgi.app, host='127.0.0.1', port=args.port, log_level='warning', backlog=4096)
+
+
+def start_server(args, server):
+    env = dict(os.environ, MODEL_PATH='/nonexistent', MOTION_THRESHOLD='0', PREDICTION_CACHE_SIZE='0')
+    command = [sys.executable, os.path.abspath(__file__), '--server', server, '--port', str(args.port),
+               '--model-ms', str(args.model_ms)]
+    process = subprocess.Popen(command, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            if urllib.request.urlopen(f'http://127.0.0.1:{args.port}/ready', timeout=1).status == 200:
+                return process
+        except OSError:
+            time.sleep(0.2)
+    process.kill()
+    raise SystemExit(f"{server} server did not become ready")
+
+
+def resident_mb(pid):
+    with open(f'/proc/{pid}/status') as status:
+        for line in status:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) / 1024
+    return float('nan')
+
+
+class IdleConnections:
+    """Engine.IO websocket connections that join the default namespace and
+    then only answer the server's pings, from one selector thread."""
+
+    def __init__(self, port, timeout):
+        self.url = f'ws://127.0.0.1:{port}/socket.io/?EIO=4&transport=websocket'
+        self.timeout = timeout
+        self._selector = selectors.DefaultSelector()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._answer_pings, daemon=True)
+        self._thread.start()
+        self.connections = []
+
+    def open_one(self):
+        import websocket
+        try:
+            ws = websocket.create_connection(self.url, timeout=self.timeout)
+            ws.recv()  # Engine.IO open packet
+            ws.send('40')  # Socket.IO connect to the default namespace
+            if not ws.recv().startswith('40'):
+                ws.close()
+                return False
+        except (OSError, websocket.WebSocketException):
+            return False
+        with self._lock:
+            self.connections.append(ws)
+            self._selector.register(ws.sock, selectors.EVENT_READ, ws)
+        return True
+
+    def open(self, count, workers=32):
+        """Open up to ``count`` connections; give up after ``workers`` failures in a row."""
+        failures = 0
+        with ThreadPoolExecutor(workers) as pool:
+            pending = [pool.submit(self.open_one) for _ in range(min(workers, count))]
+            submitted = len(pending)
+            while pending:
+                ok = pending.pop(0).result()
+                failures = 0 if ok else failures + 1
+                if submitted < count and failures < workers:
+                    pending.append(pool.submit(self.open_one))
+                    submitted += 1
+        return len(self.connections), submitted - len(self.connections)
+
+    def _answer_pings(self):
+        while not self._stop.is_set():
+            with self._lock:
+                if not self._selector.get_map():
+                    ready = []
+                else:
+                    ready = self._selector.select(timeout=0)
+            if not ready:
+                time.sleep(0.05)
+                continue
+            for key, _ in ready:
+                try:
+                    if key.data.recv() == '2':
+                        key.data.send('3')
+                except Exception:
+                    with self._lock:
+                        self._selector.unregister(key.fileobj)
+
+    def close(self):
+        self._stop.set()
+        self._thread.join(5)
+        for ws in self.connections:
+            try:
+                ws.close(timeout=0)
+            except Exception:
+                pass
+
+
+def saturate(url, frames, fps, stop):
+    import socketio
+    try:
+        detection_client(url, frames, fps, stop)
+    except socketio.exceptions.ConnectionError:
+        pass  # the server is out of connections; the signaling client reports it
+
+
+def measure(args, server, frames):
+    process = start_server(args, server)
+    url = f'http://127.0.0.1:{args.port}'
+    idle = IdleConnections(args.port, args.timeout)
+    stop = threading.Event()
+    threads = [threading.Thread(target=saturate, args=(url, frames, args.fps, stop), daemon=True)
+               for _ in range(args.clients)]
+    try:
+        base_mb = resident_mb(process.pid)
+        start = time.perf_counter()
+        connected, failed = idle.open(args.idle)
+        connect_s = time.perf_counter() - start
+        kb_per_connection = (resident_mb(process.pid) - base_mb) * 1024 / max(connected, 1)
+        for thread in threads:
+            thread.start()
+        time.sleep(1.0)  # let the scheduler saturate
+        timings = signaling_latency(url, args.samples, args.interval, args.timeout)
+        return connected, failed, connect_s, kb_per_connection, timings
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join(5)
+        idle.close()
+        process.terminate()
+        process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--idle', type=int, default=2000, help="Idle Socket.IO connections to open")
+    parser.add_argument('--clients', type=int, default=8, help="Detection clients saturating inference")
+    parser.add_argument('--fps', type=float, default=15.0)
+    parser.add_argument('--frame-width', type=int, default=160)
+    parser.add_argument('--frame-height', type=int, default=120)
+    parser.add_argument('--model-ms', type=float, default=50.0)
+    parser.add_argument('--samples', type=int, default=100)
+    parser.add_argument('--interval', type=float, default=0.05, help="Seconds between signaling round trips")
+    parser.add_argument('--timeout', type=float, default=5.0, help="Seconds before a connect or round trip gives up")
+    parser.add_argument('--port', type=int, default=5056)
+    parser.add_argument('--server', choices=SERVERS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.server:
+        run_server(args)
+        return
+
+    frames = load_frames(8, (args.frame_width, args.frame_height))
+    print(f"up to {args.idle} idle connections, {args.clients} detection clients at {args.fps:.0f} fps, "
+          f"{args.model_ms:.0f} ms per model call")
+    print(f"{'server':<10}{'idle':>7}{'failed':>8}{'conn/s':>9}{'KB/conn':>9}{'p50 ms':>9}{'p99 ms':>9}{'max ms':>9}")
+    for server in SERVERS:
+        connected, failed, connect_s, kb_per_connection, timings = measure(args, server, frames)
+        row = f"{server:<10}{connected:>7}{failed:>8}{connected / connect_s:>9.0f}{kb_per_connection:>9.1f}"
+        if timings is None:
+            print(f"{row}{'connect timed out':>27}")
+            continue
+        print(f"{row}{np.percentile(timings, 50):>9.2f}{np.percentile(timings, 99):>9.2f}{timings.max():>9.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""Side-by-side comparison of the keras and tflite inference backends.
+
+Each backend runs in a fresh process so that startup time (interpreter start
+to model ready) and peak RSS are measured in isolation. Per-frame latency is
+measured on the same seeded frames, and the backends' predictions are
+checked for parity.
+
+    python convert_model.py tflite
+    python benchmarks/benchmark_backends.py --iterations 200
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def run_child(args):
+    from inference import load_model
+    from preprocessing import as_frame_dtype
+
+    model = load_model(args.model, backend=args.backend, num_threads=args.threads)
+    ready_at = time.time()
+
+    rng = np.random.default_rng(0)
+    pixels = rng.integers(0, 256, (args.parity_frames,) + model.input_shape, dtype=np.uint8)
+    frames = as_frame_dtype(pixels, model.frame_dtype)
+    frame = frames[:1]
+    for _ in range(args.warmup):
+        model(frame)
+    timings = np.empty(args.iterations)
+    for i in range(args.iterations):
+        start = time.perf_counter()
+        model(frame)
+        timings[i] = time.perf_counter() - start
+
+    predictions = np.concatenate([model(frames[i:i + 1]) for i in range(len(frames))])
+    print(json.dumps({
+        'ready_at': ready_at,
+        'latency_ms': (timings * 1000).tolist(),
+        # ru_maxrss is reported in KiB on Linux
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        'predictions': predictions.tolist(),
+    }))
+
+
+def measure(backend, model_path, args):
+    command = [sys.executable, os.path.abspath(__file__), '--child', backend, '--model', model_path,
+               '--iterations', str(args.iterations), '--warmup', str(args.warmup),
+               '--parity-frames', str(args.parity_frames), '--threads', str(args.threads)]
+    started_at = time.time()
+    output = subprocess.run(command, check=True, capture_output=True, text=True, cwd=os.getcwd()).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    result['startup_s'] = result['ready_at'] - started_at
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--keras-model', default='models/new_sign_language_model.keras')
+    parser.add_argument('--tflite-model', default='models/new_sign_language_model.tflite')
+    parser.add_argument('--threads', type=int, default=0, help="TFLite interpreter threads, 0 for default")
+    parser.add_argument('--iterations', type=int, default=200)
+    parser.add_argument('--warmup', type=int, default=10)
+    parser.add_argument('--parity-frames', type=int, default=32)
+    parser.add_argument('--atol', type=float, default=1e-4)
+    parser.add_argument('--child', choices=('keras', 'tflite'), help=argparse.SUPPRESS)
+    parser.add_argument('--model', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        args.backend = args.child
+        run_child(args)
+        return
+
+    results = {
+        'keras': measure('keras', args.keras_model, args),
+        'tflite': measure('tflite', args.tflite_model, args),
+    }
+
+    print(f"{'backend':<10}{'startup s':>11}{'peak RSS MB':>13}{'mean ms':>10}{'p50 ms':>10}{'p99 ms':>10}")
+    for backend, result in results.items():
+        latency = np.array(result['latency_ms'])
+        print(f"{backend:<10}{result['startup_s']:>11.2f}{result['peak_rss_mb']:>13.1f}{latency.mean():>10.3f}"
+              f"{np.percentile(latency, 50):>10.3f}{np.percentile(latency, 99):>10.3f}")
+
+    keras_predictions = np.array(results['keras']['predictions'])
+    tflite_predictions = np.array(results['tflite']['predictions'])
+    max_diff = np.abs(keras_predictions - tflite_predictions).max()
+    top1 = (keras_predictions.argmax(axis=1) == tflite_predictions.argmax(axis=1)).mean()
+    print(f"Parity: max abs difference {max_diff:.2e}, top-1 agreement {top1:.1%}")
+    if max_diff > args.atol or top1 < 1.0:
+        sys.exit("tflite predictions do not match keras")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""Cost of tracing a frame through the flight recorder, and a correctness check.
+
+Replays ``--frames`` synthetic frames with long-tailed stage timings
+through a ``FlightRecorder`` the way the scheduler and ``prepare_frame`` do.
+Reports the recording cost per frame and checks that the slowest entries
+match the true top ``--size`` totals.
+
+    python benchmarks/benchmark_flight_recorder.py --frames 100000 --size 50
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from flight_recorder import PREDICTED, FlightRecorder
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--frames', type=int, default=100000)
+    parser.add_argument('--size', type=int, default=50)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    # Queue waits in seconds; the recorder measures totals from enqueue time
+    queue_waits = rng.lognormal(np.log(0.005), 1.0, args.frames).tolist()
+    stages = rng.lognormal(np.log(0.001), 0.5, (args.frames, 4)).tolist()
+    recorder = FlightRecorder(size=args.size, max_in_flight=8)
+
+    start = time.perf_counter()
+    for queue_wait, (b64, decode, preprocess, inference) in zip(queue_waits, stages):
+        now = time.monotonic()
+        trace = recorder.begin(now - queue_wait, now)
+        recorder.stage(trace, 'base64_decode', b64)
+        recorder.frame(trace, 40000, 640, 480)
+        recorder.stage(trace, 'image_decode', decode)
+        recorder.stage(trace, 'preprocess', preprocess)
+        recorder.batch(trace, 8, inference)
+        recorder.finish(trace, PREDICTED, 0.0)
+    per_frame_us = (time.perf_counter() - start) * 1e6 / args.frames
+
+    dump = recorder.dump()
+    start = time.perf_counter()
+    recorder.dump()
+    dump_ms = (time.perf_counter() - start) * 1000
+
+    # Totals are measured, so compare against the queue waits that dominate them
+    expected = sorted(np.argsort(queue_waits)[-args.size:])
+    slowest_waits = sorted(round(entry['queue_ms'], 3) for entry in dump['slowest'])
+    true_waits = sorted(round(queue_waits[i] * 1000, 3) for i in expected)
+    print(f"{args.frames} frames, {args.size} recent + {args.size} slowest kept")
+    print(f"recording:  {per_frame_us:.2f} us/frame")
+    print(f"dump:       {dump_ms:.2f} ms")
+    print(f"slowest:    {dump['slowest'][0]['total_ms']:.1f} ms ... {dump['slowest'][-1]['total_ms']:.1f} ms")
+    if slowest_waits != true_waits:
+        sys.exit("Slowest entries do not match the slowest frames")
+
+
+if __name__ == '__main__':
+    main()
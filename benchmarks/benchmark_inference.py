@@ -0,0 +1,79 @@
+"""Per-call latency of model.predict vs model(x, training=False) vs CompiledModel.
+
+Models take the frames they were built for: uint8 pixels for models that
+rescale in their first layer (``scripts/train_model.py``), float frames in
+[0, 1] otherwise. A float model is also timed taking uint8 pixels that
+CompiledModel normalizes in the graph.
+
+Run from the repository root:
+
+    python benchmarks/benchmark_inference.py --batch-size 1 --iterations 200
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import tensorflow as tf
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from inference import CompiledModel
+from preprocessing import as_frame_dtype, model_frame_dtype
+
+
+def time_calls(fn, x, iterations, warmup):
+    for _ in range(warmup):
+        fn(x)
+    timings = np.empty(iterations)
+    for i in range(iterations):
+        start = time.perf_counter()
+        fn(x)
+        timings[i] = time.perf_counter() - start
+    return timings * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--model', default='models/new_sign_language_model.keras')
+    parser.add_argument('--batch-size', type=int, default=1)
+    parser.add_argument('--iterations', type=int, default=200)
+    parser.add_argument('--warmup', type=int, default=10)
+    args = parser.parse_args()
+
+    model = tf.keras.models.load_model(args.model)
+    frame_dtype = model_frame_dtype(model)
+    compiled = CompiledModel(model)  # takes the model's own input dtype
+
+    rng = np.random.default_rng(0)
+    shape = (args.batch_size,) + compiled.input_shape
+    pixels = rng.integers(0, 256, size=shape, dtype=np.uint8)
+    x = as_frame_dtype(pixels, frame_dtype)
+
+    candidates = [
+        ('model.predict', lambda batch: model.predict(batch, verbose=0), x),
+        ('model(x, training=False)', lambda batch: model(batch, training=False).numpy(), x),
+        (f'CompiledModel {frame_dtype}', compiled, x),
+    ]
+    compiled_uint8 = None
+    if frame_dtype != np.uint8:
+        compiled_uint8 = CompiledModel(model, input_dtype='uint8')
+        candidates.append(('CompiledModel uint8 in-graph', compiled_uint8, pixels))
+
+    print(f"Input shape {shape}, {args.iterations} calls each")
+    print(f"{'method':<32}{'mean ms':>10}{'p50 ms':>10}{'p99 ms':>10}")
+    for name, fn, batch in candidates:
+        timings = time_calls(fn, batch, args.iterations, args.warmup)
+        print(f"{name:<32}{timings.mean():>10.3f}{np.percentile(timings, 50):>10.3f}"
+              f"{np.percentile(timings, 99):>10.3f}")
+
+    # All wrappers must agree with Keras on the same input
+    reference = model.predict(x, verbose=0)
+    np.testing.assert_allclose(compiled(x), reference, rtol=1e-5, atol=1e-6)
+    if compiled_uint8 is not None:
+        np.testing.assert_allclose(compiled_uint8(pixels), reference, rtol=1e-5, atol=1e-6)
+    print("CompiledModel predictions match model.predict")
+
+
+if __name__ == '__main__':
+    main()
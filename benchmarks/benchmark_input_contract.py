@@ -0,0 +1,57 @@
+"""Cost of the shared input contract.
+
+CPU time and output bytes per frame for the old 224x224 RGB server pipeline
+vs the model's real input size, single-frame vs batched. That every entry
+point produces the same inputs is checked by ``tests/test_input_contract.py``.
+
+    python benchmarks/benchmark_input_contract.py --frames 100
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from dataset_frames import load_frames
+from preprocessing import DEFAULT_INPUT_SHAPE, FramePreprocessor
+
+
+def cpu_ms_per_frame(contract, jpegs, batch_size):
+    start = time.process_time()
+    if batch_size == 1:
+        for jpeg in jpegs:
+            contract(jpeg)
+    else:
+        for i in range(0, len(jpegs), batch_size):
+            contract.preprocess_batch(jpegs[i:i + batch_size])
+    return (time.process_time() - start) * 1000 / len(jpegs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--frames', type=int, default=100)
+    parser.add_argument('--width', type=int, default=640)
+    parser.add_argument('--height', type=int, default=480)
+    parser.add_argument('--quality', type=int, default=80)
+    parser.add_argument('--batch-size', type=int, default=8)
+    args = parser.parse_args()
+
+    jpegs = load_frames(args.frames, (args.width, args.height), args.quality)
+    preprocessor = FramePreprocessor(DEFAULT_INPUT_SHAPE)
+
+    contracts = {
+        '224x224 RGB': FramePreprocessor((224, 224, 3), grayscale=False),
+        'model input': preprocessor,
+    }
+    print(f"\n{'contract':<14}{'entry point':<14}{'cpu ms/frame':>14}{'output B/frame':>16}")
+    for name, contract in contracts.items():
+        output_bytes = np.empty(contract.input_shape, dtype=contract.dtype).nbytes
+        for entry, batch_size in (('single', 1), (f'batch of {args.batch_size}', args.batch_size)):
+            cpu_ms = cpu_ms_per_frame(contract, jpegs, batch_size)
+            print(f"{name:<14}{entry:<14}{cpu_ms:>14.3f}{output_bytes:>16}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""Cost of metric updates on the detection hot path.
+
+Times ``Histogram.observe`` and ``Counter.inc`` from ``metrics.py`` (one
+shard per OS thread, no lock) against the same histogram guarded by one
+lock, from 1 and ``--threads`` threads at once. Also times a full
+``/metrics`` exposition.
+
+    python benchmarks/benchmark_metrics.py --updates 200000 --threads 4
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from metrics import LATENCY_BUCKETS, MetricsRegistry, ServerMetrics
+from rooms import RoomRegistry
+from scheduler import InferenceScheduler
+
+
+class LockedHistogram:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.total += value
+
+
+def per_update_ns(update, updates, threads):
+    values = [(i % 1000) / 1e5 for i in range(1000)]
+    barrier = threading.Barrier(threads + 1)
+
+    def worker():
+        barrier.wait()
+        for i in range(updates):
+            update(values[i % 1000])
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for thread in workers:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in workers:
+        thread.join()
+    return (time.perf_counter() - start) * 1e9 / (updates * threads)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--updates', type=int, default=200000, help="Updates per thread")
+    parser.add_argument('--threads', type=int, default=4)
+    args = parser.parse_args()
+
+    registry = MetricsRegistry()
+    histogram = registry.histogram('stage_seconds', 'Stage latency.', ('stage',)).labels('inference')
+    counter_value = registry.counter('frames_total', 'Frames.').labels()
+    locked = LockedHistogram()
+    updates = {
+        'no-op (loop overhead)': lambda value: None,
+        'histogram (sharded)': histogram.observe,
+        'histogram (locked)': locked.observe,
+        'counter (sharded)': lambda value: counter_value.inc(),
+    }
+
+    print(f"{'update':<24}{'1 thread ns':>13}{f'{args.threads} threads ns':>15}")
+    for name, update in updates.items():
+        single = per_update_ns(update, args.updates, 1)
+        many = per_update_ns(update, args.updates, args.threads)
+        print(f"{name:<24}{single:>13.0f}{many:>15.0f}")
+
+    expected = args.updates * (1 + args.threads)
+    _, count, _ = histogram.snapshot()
+    if count != expected:
+        sys.exit(f"Sharded histogram counted {count} observations, expected {expected}")
+
+    metrics = ServerMetrics(InferenceScheduler(lambda batch: batch), RoomRegistry())
+    for stage in metrics.stages.values():
+        stage.observe(0.001)
+    start = time.perf_counter()
+    for _ in range(100):
+        text = metrics.expose()
+    print(f"\n/metrics exposition: {(time.perf_counter() - start) * 10:.2f} ms, {len(text)} bytes")
+
+
+if __name__ == '__main__':
+    main()
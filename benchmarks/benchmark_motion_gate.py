@@ -0,0 +1,83 @@
+"""Motion energy distribution and skip rate of the motion gate.
+
+Compares the motion energy the gate computes for three kinds of frame pairs:
+the same pose with sensor noise (should be skipped), consecutive dataset
+images of the same sign, and images of different signs (must pass). Then
+replays held poses through a ``MotionGate`` to report how many inferences it
+skips and the gating cost per frame.
+
+    python benchmarks/benchmark_motion_gate.py --threshold 0.02
+"""
+import argparse
+import os
+import sys
+import time
+from unittest import mock
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from dataset_frames import dataset_paths
+from motion_gate import GRID_SIZE, MotionGate, motion_energy
+from preprocessing import DEFAULT_INPUT_SHAPE, FramePreprocessor, block_average
+
+
+def noisy(frame, noise, rng):
+    jitter = rng.normal(0.0, noise / 255.0, frame.shape).astype(np.float32)
+    return np.clip(frame + jitter, 0.0, 1.0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--frames', type=int, default=200)
+    parser.add_argument('--hold', type=int, default=15, help="Frames sent per held pose")
+    parser.add_argument('--fps', type=float, default=15.0)
+    parser.add_argument('--noise', type=float, default=2.0, help="Per-pixel noise standard deviation, in 0-255 levels")
+    parser.add_argument('--threshold', type=float, default=0.02)
+    parser.add_argument('--max-skip-ms', type=float, default=1000.0)
+    args = parser.parse_args()
+
+    paths = dataset_paths(args.frames)
+    preprocessor = FramePreprocessor(DEFAULT_INPUT_SHAPE)
+    frames = [preprocessor.preprocess_file(path) for path in paths]
+    signs = [os.path.basename(os.path.dirname(path)) for path in paths]
+    grids = [block_average(frame, GRID_SIZE, GRID_SIZE) for frame in frames]
+    rng = np.random.default_rng(0)
+    shuffled = rng.permutation(len(frames))
+
+    pairs = {
+        'same pose + noise': [motion_energy(block_average(noisy(frame, args.noise, rng), GRID_SIZE, GRID_SIZE), grid)
+                              for frame, grid in zip(frames, grids)],
+        'same sign': [motion_energy(a, b) for a, b, sa, sb in zip(grids, grids[1:], signs, signs[1:]) if sa == sb],
+        'different sign': [motion_energy(grids[i], grids[j]) for i, j in enumerate(shuffled) if signs[i] != signs[j]],
+    }
+    print(f"{'pair':<20}{'count':>7}{'p5':>9}{'p50':>9}{'p95':>9}{'passes':>9}")
+    for name, energies in pairs.items():
+        energies = np.array(energies)
+        if not len(energies):
+            continue
+        print(f"{name:<20}{len(energies):>7}{np.percentile(energies, 5):>9.4f}{np.percentile(energies, 50):>9.4f}"
+              f"{np.percentile(energies, 95):>9.4f}{(energies >= args.threshold).mean():>9.1%}")
+
+    stream = [noisy(frame, args.noise, rng) for frame in frames for _ in range(args.hold)]
+    gate = MotionGate(args.threshold, args.max_skip_ms)
+    clock = [0.0]
+    start = time.process_time()
+    # Drive max_skip_ms from the simulated frame clock instead of wall time
+    with mock.patch('motion_gate.time.monotonic', lambda: clock[0]):
+        for i, frame in enumerate(stream):
+            clock[0] = i / args.fps
+            prediction, grid = gate.lookup('client', frame)
+            if prediction is None:
+                gate.store('client', grid, i)
+    gate_us = (time.process_time() - start) * 1e6 / len(stream)
+
+    stats = gate.stats()
+    print(f"\n{len(stream)} frames ({len(frames)} poses x {args.hold}) at {args.fps:.0f} fps, "
+          f"threshold {args.threshold}, max skip {args.max_skip_ms:.0f} ms")
+    print(f"gate cost:  {gate_us:.1f} us/frame")
+    print(f"skip rate:  {stats['skip_rate']:.1%} ({stats['skipped']} inferences skipped)")
+
+
+if __name__ == '__main__':
+    main()
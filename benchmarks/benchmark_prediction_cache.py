@@ -0,0 +1,80 @@
+"""Hit rate and cost of the perceptual-hash prediction cache.
+
+Simulates signers holding each pose: every dataset image is sent
+``--hold`` times with per-frame sensor noise, one image after another, at
+``--fps``. Reports the cache hit rate (the share of model calls saved), the
+hashing cost per frame, and how many hits returned a prediction for a
+different sign, which the distance threshold and TTL must keep low.
+
+    python benchmarks/benchmark_prediction_cache.py --frames 100 --hold 15
+"""
+import argparse
+import os
+import sys
+import time
+from unittest import mock
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from dataset_frames import dataset_paths
+from prediction_cache import PredictionCache, dhash
+from preprocessing import DEFAULT_INPUT_SHAPE, FramePreprocessor
+
+
+def held_poses(frames, labels, hold, noise, seed):
+    rng = np.random.default_rng(seed)
+    for label, frame in zip(labels, frames):
+        for _ in range(hold):
+            jitter = rng.normal(0.0, noise / 255.0, frame.shape).astype(np.float32)
+            yield label, np.clip(frame + jitter, 0.0, 1.0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--frames', type=int, default=100, help="Distinct poses (dataset images)")
+    parser.add_argument('--stride', type=int, default=10, help="Use every n-th dataset image, to mix signs")
+    parser.add_argument('--hold', type=int, default=15, help="Frames sent per pose")
+    parser.add_argument('--fps', type=float, default=15.0)
+    parser.add_argument('--noise', type=float, default=2.0, help="Per-pixel noise standard deviation, in 0-255 levels")
+    parser.add_argument('--max-distance', type=int, default=4)
+    parser.add_argument('--ttl-ms', type=float, default=500.0)
+    parser.add_argument('--entries', type=int, default=8)
+    args = parser.parse_args()
+
+    paths = dataset_paths(args.frames, args.stride)
+    preprocessor = FramePreprocessor(DEFAULT_INPUT_SHAPE)
+    frames = [preprocessor.preprocess_file(path) for path in paths]
+    signs = sorted({os.path.basename(os.path.dirname(path)) for path in paths})
+    labels = [signs.index(os.path.basename(os.path.dirname(path))) for path in paths]
+    stream = list(held_poses(frames, labels, args.hold, args.noise, seed=0))
+
+    start = time.process_time()
+    for _, frame in stream:
+        dhash(frame)
+    hash_us = (time.process_time() - start) * 1e6 / len(stream)
+
+    cache = PredictionCache(args.entries, args.max_distance, args.ttl_ms)
+    wrong_hits = 0
+    clock = [0.0]
+    # Drive the TTL from the simulated frame clock instead of wall time
+    with mock.patch('prediction_cache.time.monotonic', lambda: clock[0]):
+        for i, (label, frame) in enumerate(stream):
+            clock[0] = i / args.fps
+            cached, fingerprint = cache.lookup('client', frame)
+            if cached is None:
+                cache.store('client', fingerprint, np.array([label], dtype=np.float32))
+            elif int(cached[0]) != label:
+                wrong_hits += 1
+
+    stats = cache.stats()
+    print(f"{len(stream)} frames ({len(frames)} poses x {args.hold}) at {args.fps:.0f} fps, "
+          f"noise {args.noise} levels")
+    print(f"dhash cost:       {hash_us:.1f} us/frame")
+    print(f"hit rate:         {stats['hit_rate']:.1%} ({stats['hits']} model calls saved)")
+    print(f"expired entries:  {stats['expired']}")
+    print(f"wrong-sign hits:  {wrong_hits} ({wrong_hits / max(stats['hits'], 1):.1%} of hits)")
+
+
+if __name__ == '__main__':
+    main()
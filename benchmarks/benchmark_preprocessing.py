@@ -0,0 +1,90 @@
+"""Before/after microbenchmark for frame preprocessing.
+
+"before" is the original process_frame pipeline: full-size decode, resize,
+np.array, astype('float32') / 255.0 and expand_dims. "after" is
+preprocessing.FramePreprocessor at the same RGB input size: JPEG draft
+decoding near the target size, one resize and one normalization pass into a
+preallocated buffer.
+
+Reports CPU time per frame, pixels decoded per frame, and the peak bytes that
+numpy allocated per frame (measured with tracemalloc).
+
+    python benchmarks/benchmark_preprocessing.py --frames 100
+"""
+import argparse
+import io
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from dataset_frames import load_frames
+from preprocessing import FramePreprocessor, decode_frame
+# The original pipeline's fixed RGB input size, for a like-for-like comparison
+MODEL_INPUT_SIZE = (224, 224)
+
+
+def before(jpeg):
+    img = Image.open(io.BytesIO(jpeg))
+    img = img.resize(MODEL_INPUT_SIZE)
+    img_array = np.array(img)
+    img_array = img_array.astype('float32') / 255.0
+    return np.expand_dims(img_array, axis=0)
+
+
+def decoded_bytes(jpeg, draft):
+    img = decode_frame(jpeg)
+    if draft:
+        img.draft('RGB', MODEL_INPUT_SIZE)
+    img.load()
+    return img.size[0] * img.size[1] * len(img.getbands())
+
+
+def measure(fn, frames):
+    start = time.process_time()
+    for frame in frames:
+        fn(frame)
+    cpu_ms = (time.process_time() - start) * 1000 / len(frames)
+
+    tracemalloc.start()
+    peaks = []
+    for frame in frames:
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+        fn(frame)
+        peaks.append(tracemalloc.get_traced_memory()[1] - baseline)
+    tracemalloc.stop()
+    return cpu_ms, float(np.mean(peaks))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--frames', type=int, default=100)
+    parser.add_argument('--width', type=int, default=640)
+    parser.add_argument('--height', type=int, default=480)
+    parser.add_argument('--quality', type=int, default=80)
+    args = parser.parse_args()
+
+    frames = load_frames(args.frames, (args.width, args.height), args.quality)
+
+    preprocessor = FramePreprocessor((MODEL_INPUT_SIZE[1], MODEL_INPUT_SIZE[0], 3), grayscale=False)
+    out = np.empty(preprocessor.input_shape, dtype=np.float32)
+    pipelines = [
+        ('before', before, False),
+        ('after', lambda jpeg: preprocessor(jpeg, out=out), True),
+    ]
+
+    print(f"{len(frames)} frames at {args.width}x{args.height}, JPEG quality {args.quality}")
+    print(f"{'pipeline':<10}{'cpu ms/frame':>14}{'decoded B/frame':>17}{'numpy peak B/frame':>20}")
+    for name, fn, draft in pipelines:
+        cpu_ms, numpy_peak = measure(fn, frames)
+        pixels = np.mean([decoded_bytes(frame, draft) for frame in frames])
+        print(f"{name:<10}{cpu_ms:>14.3f}{pixels:>17.0f}{numpy_peak:>20.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+"""Room registry under connection churn, against the old dict-of-lists rooms.
+
+Simulates ``--sids`` clients arriving one after another with at most
+``--live`` connected at once. Each new client joins a room waiting for a
+second peer or creates one. Every ``--recreate-every``-th client instead
+creates ``--recreate-rooms`` rooms that nobody joins and never disconnects
+(a tab left open that clicked "Create Room" repeatedly). Once ``--live``
+other clients are connected, a random one disconnects for each arrival.
+Time advances by ``1 / --rate`` seconds per arrival, so rooms idle for
+``--ttl`` seconds expire.
+
+Reports the disconnect cost and the rooms held for the ``RoomRegistry`` and
+for the scan-every-room disconnect it replaces. The old version runs on the
+first ``--legacy-sids`` clients only, since its disconnects slow down as
+abandoned rooms pile up.
+
+    python benchmarks/benchmark_rooms.py --sids 100000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from unittest import mock
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from rooms import RoomError, RoomRegistry
+
+
+class LegacyRooms:
+    """The rooms dict and handlers as they were in app.py."""
+
+    def __init__(self):
+        self.rooms = {}
+        self._next = 0
+
+    def create(self, sid):
+        room_id = f'{self._next:08x}'
+        self._next += 1
+        self.rooms[room_id] = {'creator': sid, 'peers': [sid]}
+        return room_id
+
+    def join(self, room_id, sid):
+        if room_id not in self.rooms:
+            raise RoomError('Room not found')
+        self.rooms[room_id]['peers'].append(sid)
+
+    def leave_all(self, sid):
+        left = []
+        for room_id in list(self.rooms.keys()):
+            if sid in self.rooms[room_id]['peers']:
+                self.rooms[room_id]['peers'].remove(sid)
+                if not self.rooms[room_id]['peers']:
+                    del self.rooms[room_id]
+                left.append(room_id)
+        return left
+
+    def expire(self):
+        return []
+
+    def __len__(self):
+        return len(self.rooms)
+
+
+def churn(registry, args):
+    rng = random.Random(0)
+    clock = [0.0]
+    live = []
+    waiting = []  # rooms with one peer
+    disconnect_us = []
+    peak_rooms = 0
+    with mock.patch('rooms.time.monotonic', lambda: clock[0]):
+        for i in range(args.sids):
+            clock[0] = i / args.rate
+            sid = f'sid-{i}'
+            registry.expire()
+            if i % args.recreate_every == 0:
+                # Never disconnects, so only expiry removes these rooms
+                for _ in range(args.recreate_rooms):
+                    registry.create(sid)
+            else:
+                while waiting:
+                    try:
+                        registry.join(waiting.pop(), sid)
+                        break
+                    except RoomError:
+                        continue  # expired, or its creator left
+                else:
+                    waiting.append(registry.create(sid))
+                live.append(sid)
+
+            if len(live) > args.live:
+                j = rng.randrange(len(live))
+                live[j], live[-1] = live[-1], live[j]
+                start = time.perf_counter()
+                registry.leave_all(live.pop())
+                disconnect_us.append((time.perf_counter() - start) * 1e6)
+            peak_rooms = max(peak_rooms, len(registry))
+    return np.array(disconnect_us), peak_rooms, len(registry)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sids', type=int, default=100000)
+    parser.add_argument('--legacy-sids', type=int, default=20000)
+    parser.add_argument('--live', type=int, default=2000, help="Clients connected at once")
+    parser.add_argument('--rate', type=float, default=50.0, help="Arrivals per simulated second")
+    parser.add_argument('--ttl', type=float, default=60.0, help="Idle room TTL in seconds")
+    parser.add_argument('--recreate-every', type=int, default=50)
+    parser.add_argument('--recreate-rooms', type=int, default=5)
+    args = parser.parse_args()
+    # Disconnects only start once more than --live clients have arrived
+    if min(args.sids, args.legacy_sids) <= args.live:
+        parser.error("--sids and --legacy-sids must both be larger than --live")
+
+    print(f"{args.live} live clients, {args.rate:.0f} arrivals/s, TTL {args.ttl:.0f} s, "
+          f"every {args.recreate_every}th client creates {args.recreate_rooms} rooms")
+    print(f"{'rooms':<16}{'sids':>8}{'p50 us':>9}{'p99 us':>9}{'max us':>10}"
+          f"{'peak rooms':>12}{'final rooms':>13}")
+    runs = [
+        ('legacy', LegacyRooms(), args.legacy_sids),
+        ('registry', RoomRegistry(max_peers=2, idle_ttl_s=args.ttl), args.sids),
+    ]
+    for name, registry, sids in runs:
+        disconnect_us, peak_rooms, final_rooms = churn(registry, argparse.Namespace(**{**vars(args), 'sids': sids}))
+        print(f"{name:<16}{sids:>8}{np.percentile(disconnect_us, 50):>9.1f}{np.percentile(disconnect_us, 99):>9.1f}"
+              f"{disconnect_us.max():>10.1f}{peak_rooms:>12}{final_rooms:>13}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,190 @@
+"""Signaling latency while inference is saturated, under eventlet.
+
+Starts the app the way production does (eventlet, one worker), with the
+model replaced by a stand-in whose every call blocks its OS thread for
+``--model-ms``, as a TensorFlow predict does. The stand-in sleeps rather than
+spinning so the measurement shows event-loop blocking, not CPU contention,
+even on a single-core machine. Detection clients then keep the scheduler
+saturated while one signaling client measures the ``create_room`` ->
+``room_created`` round trip.
+
+Frames default to 160x120 JPEGs: eventlet unmasks incoming websocket frames
+in pure Python, so full 640x480 frames from many clients load the event loop
+on their own and would hide the effect being measured.
+
+Runs three configurations: no detection load, saturated with model calls on
+the event loop (how the server ran before the inference executor), and
+saturated with the executor. The executor run must keep p99 signaling latency
+within ``--max-p99-ms``. ``tests/test_signaling_latency.py`` runs a shorter
+version of the executor and on-event-loop runs and checks relayed signaling
+order.
+
+    pip install eventlet websocket-client
+    python benchmarks/benchmark_signaling_latency.py --clients 8 --model-ms 50
+"""
+import argparse
+import os
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+
+import numpy as np
+
+from dataset_frames import load_frames
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class BlockingModel:
+    """Stand-in model: each call blocks the calling OS thread for ``model_ms``."""
+
+    def __init__(self, model_ms, num_classes, sleep):
+        self.model_ms = model_ms
+        self.num_classes = num_classes
+        self._sleep = sleep
+
+    def __call__(self, batch):
+        self._sleep(self.model_ms / 1000.0)
+        return np.full((len(batch), self.num_classes), 1.0 / self.num_classes, dtype=np.float32)
+
+
+def run_server(args):
+    import eventlet
+    eventlet.monkey_patch()
+
+    sys.path.insert(0, ROOT)
+    import app
+    from preprocessing import FramePreprocessor
+
+    if args.direct:
+        # Model and decode calls on the event loop, as before the executor
+        app.executor._execute = None
+    app.class_names = ['A', 'B']
+    # The unpatched sleep blocks the whole OS thread, like a predict, instead of yielding to the hub
+    app.model = BlockingModel(args.model_ms, len(app.class_names), eventlet.patcher.original('time').sleep)
+    app.preprocessor = FramePreprocessor()
+    app.scheduler.start()
+    app.model_status = 'ready'
+    app.socketio.run(app.app, host='127.0.0.1', port=args.port, log_output=False)
+
+
+def start_server(args, direct):
+    env = dict(os.environ, MODEL_PATH='/nonexistent', MOTION_THRESHOLD='0', PREDICTION_CACHE_SIZE='0')
+    command = [sys.executable, os.path.abspath(__file__), '--server', '--port', str(args.port),
+               '--model-ms', str(args.model_ms)] + (['--direct'] if direct else [])
+    process = subprocess.Popen(command, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            if urllib.request.urlopen(f'http://127.0.0.1:{args.port}/ready', timeout=1).status == 200:
+                return process
+        except OSError:
+            time.sleep(0.2)
+    process.kill()
+    raise SystemExit("Server did not become ready")
+
+
+def detection_client(url, frames, fps, stop):
+    import socketio
+    sio = socketio.Client()
+    sio.connect(url, transports=['websocket'])
+    i = 0
+    while not stop.is_set():
+        sio.emit('detect_sign', {'image': frames[i % len(frames)], 'ts': time.time() * 1000})
+        i += 1
+        stop.wait(1.0 / fps)
+    sio.disconnect()
+
+
+def signaling_latency(url, samples, interval, timeout):
+    """Round-trip times in ms; a round trip that times out counts as ``timeout``."""
+    import socketio
+    sio = socketio.Client()
+    created = threading.Event()
+    sio.on('room_created', lambda room_id: created.set())
+    try:
+        sio.connect(url, transports=['websocket'], wait_timeout=timeout)
+    except socketio.exceptions.ConnectionError:
+        # The server could not even complete the handshake
+        return None
+    timings = []
+    for _ in range(samples):
+        created.clear()
+        start = time.perf_counter()
+        sio.emit('create_room')
+        created.wait(timeout)
+        timings.append((time.perf_counter() - start) * 1000)
+        time.sleep(interval)
+    sio.disconnect()
+    return np.array(timings)
+
+
+def measure(args, direct, clients, frames):
+    process = start_server(args, direct)
+    url = f'http://127.0.0.1:{args.port}'
+    stop = threading.Event()
+    threads = [threading.Thread(target=detection_client, args=(url, frames, args.fps, stop), daemon=True)
+               for _ in range(clients)]
+    try:
+        for thread in threads:
+            thread.start()
+        time.sleep(1.0)  # let the scheduler saturate
+        return signaling_latency(url, args.samples, args.interval, args.timeout)
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join(5)
+        process.terminate()
+        process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--clients', type=int, default=8, help="Detection clients saturating inference")
+    parser.add_argument('--fps', type=float, default=15.0)
+    parser.add_argument('--frame-width', type=int, default=160)
+    parser.add_argument('--frame-height', type=int, default=120)
+    parser.add_argument('--model-ms', type=float, default=50.0)
+    parser.add_argument('--samples', type=int, default=100)
+    parser.add_argument('--interval', type=float, default=0.05, help="Seconds between signaling round trips")
+    parser.add_argument('--timeout', type=float, default=5.0, help="Seconds before a connect or round trip gives up")
+    parser.add_argument('--max-p99-ms', type=float, default=100.0)
+    parser.add_argument('--port', type=int, default=5055)
+    parser.add_argument('--server', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--direct', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.server:
+        run_server(args)
+        return
+
+    frames = load_frames(8, (args.frame_width, args.frame_height))
+    runs = [
+        ('idle', False, 0),
+        ('saturated, on event loop', True, args.clients),
+        ('saturated, executor', False, args.clients),
+    ]
+    print(f"{args.clients} detection clients at {args.fps:.0f} fps, {args.model_ms:.0f} ms per model call")
+    print(f"{'configuration':<28}{'samples':>9}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    results = {}
+    for name, direct, clients in runs:
+        timings = measure(args, direct, clients, frames)
+        results[name] = timings
+        if timings is None:
+            print(f"{name:<28}{'connect timed out':>39}")
+            continue
+        print(f"{name:<28}{len(timings):>9}{np.percentile(timings, 50):>10.2f}"
+              f"{np.percentile(timings, 99):>10.2f}{timings.max():>10.2f}")
+
+    timings = results['saturated, executor']
+    if timings is None:
+        sys.exit("Signaling client could not connect with the executor")
+    p99 = np.percentile(timings, 99)
+    if p99 > args.max_p99_ms:
+        sys.exit(f"Signaling p99 {p99:.1f} ms exceeds {args.max_p99_ms:.0f} ms with the executor")
+
+
+if __name__ == '__main__':
+    main()
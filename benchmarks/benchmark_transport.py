@@ -0,0 +1,69 @@
+"""Wire size and server CPU time per frame: base64 data URL vs binary attachment.
+
+Encodes dataset images the way the browser does (640x480 JPEG, quality 80),
+wraps them in real Socket.IO ``detect_sign`` packets and times the server
+side decode + preprocess for each transport.
+
+    python benchmarks/benchmark_transport.py --frames 200
+"""
+import argparse
+import base64
+import os
+import sys
+import time
+
+import numpy as np
+from socketio import packet
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from dataset_frames import load_frames
+from preprocessing import FramePreprocessor
+
+preprocessor = FramePreprocessor()
+
+
+def wire_bytes(payload):
+    encoded = packet.Packet(packet.EVENT, data=['detect_sign', payload]).encode()
+    if isinstance(encoded, list):
+        # Binary event: a text header packet followed by the raw attachments
+        return sum(len(part) for part in encoded)
+    return len(encoded.encode('utf-8'))
+
+
+def cpu_ms_per_frame(payloads):
+    start = time.process_time()
+    for payload in payloads:
+        preprocessor(payload['image'], payload.get('shape'))
+    return (time.process_time() - start) * 1000 / len(payloads)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--frames', type=int, default=200)
+    parser.add_argument('--width', type=int, default=640)
+    parser.add_argument('--height', type=int, default=480)
+    parser.add_argument('--quality', type=int, default=80)
+    args = parser.parse_args()
+
+    jpegs = load_frames(args.frames, (args.width, args.height), args.quality)
+    transports = {
+        'data URL (base64)': [
+            {'image': 'data:image/jpeg;base64,' + base64.b64encode(jpeg).decode('ascii')} for jpeg in jpegs
+        ],
+        'binary JPEG': [{'image': jpeg} for jpeg in jpegs],
+    }
+
+    # Same frames, already decoded to uint8 at model input size
+    raw = [preprocessor.pixels(jpeg) for jpeg in jpegs]
+    height, width, channels = preprocessor.input_shape
+    transports[f'binary raw {height}x{width}x{channels}'] = [{'image': pixels.tobytes(), 'shape': pixels.shape} for pixels in raw]
+
+    print(f"{len(jpegs)} frames at {args.width}x{args.height}, JPEG quality {args.quality}")
+    print(f"{'transport':<24}{'bytes/frame':>14}{'cpu ms/frame':>14}")
+    for name, payloads in transports.items():
+        size = np.mean([wire_bytes(payload) for payload in payloads])
+        print(f"{name:<24}{size:>14.0f}{cpu_ms_per_frame(payloads):>14.3f}")
+
+
+if __name__ == '__main__':
+    main()
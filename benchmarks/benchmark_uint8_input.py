@@ -0,0 +1,75 @@
+"""Cost of feeding uint8 frames to a model that rescales them itself.
+
+CPU time per frame of ``FramePreprocessor`` producing float32 frames vs
+uint8 frames (no float conversion or division), and the bytes per frame and
+per ``SharedFrameRing`` that inference workers share with the server. That
+both frame types give the same predictions is checked by
+``tests/test_uint8_input.py``.
+
+    python benchmarks/benchmark_uint8_input.py --frames 100
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from dataset_frames import load_frames
+from preprocessing import FramePreprocessor
+from workers import SharedFrameRing
+
+def time_preprocess(preprocessor, images, iterations):
+    # Decoded images, so only the resize and dtype conversion are timed
+    out = np.empty((len(images),) + preprocessor.input_shape, dtype=preprocessor.dtype)
+    timings = np.empty(iterations)
+    for i in range(iterations):
+        start = time.perf_counter()
+        for j, image in enumerate(images):
+            preprocessor.preprocess(image, out=out[j])
+        timings[i] = (time.perf_counter() - start) / len(images)
+    return timings * 1e6, out
+
+
+def time_ring_writes(ring, frames, iterations):
+    batch = list(frames[:ring.max_batch_size])
+    timings = np.empty(iterations)
+    for i in range(iterations):
+        start = time.perf_counter()
+        np.stack(batch, out=ring.slots[i % ring.num_slots, :len(batch)])
+        timings[i] = time.perf_counter() - start
+    return timings * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--frames', type=int, default=100)
+    parser.add_argument('--iterations', type=int, default=20)
+    parser.add_argument('--workers', type=int, default=2, help="Inference workers the ring is sized for")
+    parser.add_argument('--batch-size', type=int, default=8)
+    args = parser.parse_args()
+
+    float_preprocessor = FramePreprocessor()
+    uint8_preprocessor = FramePreprocessor(dtype='uint8')
+    images = [float_preprocessor.decode(frame) for frame in load_frames(args.frames)]
+    float_us, float_frames = time_preprocess(float_preprocessor, images, args.iterations)
+    uint8_us, uint8_frames = time_preprocess(uint8_preprocessor, images, args.iterations)
+
+    shape = float_preprocessor.input_shape
+    print(f"{len(images)} dataset frames at {shape}, {args.iterations} passes")
+    print(f"{'frames':<10}{'us/frame':>10}{'p99 us':>10}{'bytes/frame':>13}{'ring bytes':>12}{'ring write us':>15}")
+    for dtype, timings, frames in (('float32', float_us, float_frames), ('uint8', uint8_us, uint8_frames)):
+        ring = SharedFrameRing(2 * args.workers, args.batch_size, shape, dtype)
+        try:
+            ring_us = time_ring_writes(ring, frames, args.iterations * 10)
+            ring_bytes = ring.slots.nbytes
+        finally:
+            ring.close()
+        print(f"{dtype:<10}{timings.mean():>10.1f}{np.percentile(timings, 99):>10.1f}"
+              f"{frames[0].nbytes:>13}{ring_bytes:>12}{ring_us.mean():>15.2f}")
+
+
+if __name__ == '__main__':
+    main()
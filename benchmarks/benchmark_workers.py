@@ -0,0 +1,68 @@
+"""Throughput of the shared-memory inference pool as the worker count grows.
+
+For each worker count, as many client threads as workers keep submitting
+full batches for a fixed duration, the same way the scheduler's dispatch
+threads do in app.py.
+
+    python benchmarks/benchmark_workers.py --workers 1 2 4 --batch-size 8
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from preprocessing import as_frame_dtype
+from workers import InferencePool
+
+
+def measure(model_path, num_workers, batch_size, duration):
+    pool = InferencePool(model_path, num_workers, batch_size)
+    pool.start()
+    try:
+        frames = [as_frame_dtype(np.random.default_rng(i).integers(0, 256, pool.input_shape, dtype=np.uint8),
+                                 pool.frame_dtype) for i in range(batch_size)]
+        pool(frames)  # first call per worker attaches the ring
+
+        completed = [0] * num_workers
+        stop_at = time.monotonic() + duration
+
+        def client(index):
+            while time.monotonic() < stop_at:
+                pool(frames)
+                completed[index] += batch_size
+
+        threads = [threading.Thread(target=client, args=(i,)) for i in range(num_workers)]
+        start = time.monotonic()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return sum(completed) / (time.monotonic() - start)
+    finally:
+        pool.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--model', default='models/new_sign_language_model.keras')
+    parser.add_argument('--workers', type=int, nargs='+',
+                        default=sorted({1, 2, max(1, (os.cpu_count() or 1) // 2), os.cpu_count() or 1}))
+    parser.add_argument('--batch-size', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=10.0)
+    args = parser.parse_args()
+
+    print(f"{os.cpu_count()} CPUs, batch size {args.batch_size}, {args.duration:.0f}s per run")
+    print(f"{'workers':>8}{'frames/s':>12}{'speedup':>10}")
+    baseline = None
+    for num_workers in args.workers:
+        throughput = measure(args.model, num_workers, args.batch_size, args.duration)
+        baseline = baseline or throughput
+        print(f"{num_workers:>8}{throughput:>12.1f}{throughput / baseline:>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,35 @@
+"""Dataset images for the benchmarks.
+
+Paths are resolved from the repository root, so the benchmarks run from any
+working directory. Benchmarks import this as a sibling module, the way
+``replay_traffic.py`` imports ``load_test``.
+"""
+import glob
+import io
+import os
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATASET_GLOB = os.path.join(ROOT, 'scripts', 'dataset', '*', '*.jpg')
+
+
+def dataset_paths(count=None, stride=1):
+    """Every ``stride``-th dataset JPEG path, sorted, at most ``count`` of them."""
+    paths = sorted(glob.glob(DATASET_GLOB))[::stride][:count]
+    if not paths:
+        raise SystemExit(f"No images found matching {DATASET_GLOB}")
+    return paths
+
+
+def load_frames(count=None, size=None, quality=80, stride=1):
+    """Dataset JPEGs as bytes, re-encoded at ``size`` (width, height) if given."""
+    frames = []
+    for path in dataset_paths(count, stride):
+        if size is None:
+            with open(path, 'rb') as f:
+                frames.append(f.read())
+            continue
+        from PIL import Image
+        buffer = io.BytesIO()
+        Image.open(path).convert('RGB').resize(size).save(buffer, format='JPEG', quality=quality)
+        frames.append(buffer.getvalue())
+    return frames
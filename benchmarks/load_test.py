@@ -0,0 +1,327 @@
+"""Synthetic Socket.IO load against a running server.
+
+Starts ``--clients`` simulated users against ``--url`` (``app.py`` or
+``asgi.py``), connecting over ``--ramp`` seconds. Clients work in pairs like
+a video call: one emits ``create_room``, the other joins the room, then they
+exchange a fake ``offer``, ``answer`` and ``--ice`` ``ice_candidate``
+messages each. With an odd count the last client detects alone. Every client
+then sends ``detect_sign`` frames with its room id at ``--fps`` for
+``--duration`` seconds, each one a JPEG picked at random from
+``scripts/dataset``.
+
+Reports:
+
+* signaling: the ``create_room`` -> ``room_created`` and ``join_room`` ->
+  ``room_joined`` round trips, and the time for each relayed message to
+  reach the peer;
+* detection: frames sent, results, errors and unanswered frames,
+  throughput, the error rate, and p50/p95/p99 latency from emit to
+  ``detection_result``. Latency comes from the ``ts`` the server echoes, on
+  the sending client's clock, so it holds against a remote server too.
+
+Frames the server answers without a result are counted as unanswered: the
+scheduler keeps only each client's newest frame, and by default the emission
+policy sends a result only when the label or confidence changes. To time
+every frame, run the server with ``EMIT_HEARTBEAT_MS=0``, and with
+``MOTION_THRESHOLD=0 PREDICTION_CACHE_SIZE=0`` to send every frame to the
+model.
+
+``--max-p99-ms`` and ``--max-error-rate`` make the run exit with an error
+when exceeded, for catching regressions.
+
+    pip install "python-socketio[client]" websocket-client
+    python app.py &
+    python benchmarks/load_test.py --url http://localhost:5000 --clients 20 --fps 10 --duration 30
+"""
+import argparse
+import random
+import sys
+import threading
+import time
+import urllib.request
+from collections import Counter, defaultdict
+
+import numpy as np
+
+from dataset_frames import load_frames
+
+SIGNALING_EVENTS = ('create_room', 'join_room', 'offer', 'answer', 'ice_candidate')
+FAKE_SDP = 'v=0\r\no=- 0 0 IN IP4 127.0.0.1\r\ns=-\r\nt=0 0\r\nm=video 9 UDP/TLS/RTP/SAVPF 96\r\n'
+
+
+class Stats:
+    """Measurements shared by every client thread."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.signaling = defaultdict(list)  # event -> ms
+        self.latencies = []  # ms from emit to detection_result
+        self.errors = Counter()  # message -> count
+        self.sent = 0
+        self.connected = 0
+        self.failed = Counter()  # stage -> clients that gave up there
+
+    def signal(self, event, ms):
+        with self._lock:
+            self.signaling[event].append(ms)
+
+    def connect(self):
+        with self._lock:
+            self.connected += 1
+
+    def fail(self, stage):
+        with self._lock:
+            self.failed[stage] += 1
+
+    def add(self, sent, latencies, errors):
+        with self._lock:
+            self.sent += sent
+            self.latencies += latencies
+            self.errors.update(errors)
+
+
+class SimulatedClient:
+    """One user: connects, sets up a call with its peer, then streams frames.
+
+    The host creates the room and hands its id to the guest through
+    ``room``, a one-item list guarded by ``room_ready``.
+    """
+
+    def __init__(self, args, frames, stats, role, room, room_ready, seed):
+        import socketio
+        self.args = args
+        self.frames = frames
+        self.stats = stats
+        self.role = role  # 'host', 'guest' or 'solo'
+        self.room = room
+        self.room_ready = room_ready
+        self.rng = random.Random(seed)
+        self.room_id = None
+        self.sio = socketio.Client(reconnection=False)
+        self._replies = {}  # event -> threading.Event
+        self._reply_value = {}
+        self._pending = {}  # ts of frames awaiting a result -> None
+        self._latencies = []
+        self._errors = Counter()
+        self._lock = threading.Lock()
+
+        for event in ('room_created', 'room_joined', 'error'):
+            self._replies[event] = threading.Event()
+            self.sio.on(event, self._reply_handler(event))
+        for event in ('offer', 'answer', 'ice_candidate'):
+            self.sio.on(event, self._relay_handler(event))
+        self.sio.on('detection_result', self._on_result)
+        self.sio.on('detection_error', self._on_error)
+
+    def _reply_handler(self, event):
+        def handler(value=None):
+            self._reply_value[event] = value
+            self._replies[event].set()
+        return handler
+
+    def _relay_handler(self, event):
+        def handler(message):
+            # Relayed payloads carry their send time; both peers share this process's clock
+            if isinstance(message, dict) and 'sent' in message:
+                self.stats.signal(event, (time.perf_counter() - message['sent']) * 1000)
+            # The host answers the guest's offer; each peer then sends its candidates
+            if event == 'offer':
+                self._send_signal('answer', {'type': 'answer', 'sdp': FAKE_SDP})
+            if event in ('offer', 'answer'):
+                self._send_candidates()
+        return handler
+
+    def _on_result(self, result):
+        ts = result.get('ts')
+        received = time.time() * 1000
+        with self._lock:
+            # Results go to the whole room; time only this client's own frames
+            if ts in self._pending:
+                del self._pending[ts]
+                self._latencies.append(received - ts)
+
+    def _on_error(self, error):
+        with self._lock:
+            self._errors[error.get('error', 'unknown')] += 1
+
+    def _request(self, event, reply, *args):
+        """Emit ``event`` and return the value of ``reply``, or raise on timeout or error."""
+        self._replies[reply].clear()
+        self._replies['error'].clear()
+        start = time.perf_counter()
+        self.sio.emit(event, *args)
+        deadline = start + self.args.timeout
+        while not self._replies[reply].is_set():
+            if self._replies['error'].is_set():
+                raise RuntimeError(self._reply_value['error'].get('message', 'error'))
+            if time.perf_counter() > deadline:
+                raise TimeoutError(f"No {reply} within {self.args.timeout:.0f} s")
+            self._replies[reply].wait(0.01)
+        self.stats.signal(event, (time.perf_counter() - start) * 1000)
+        return self._reply_value[reply]
+
+    def _send_signal(self, event, payload):
+        key = 'candidate' if event == 'ice_candidate' else event
+        self.sio.emit(event, {'roomId': self.room_id, key: dict(payload, sent=time.perf_counter())})
+
+    def _setup_call(self):
+        if self.role == 'host':
+            self.room_id = self._request('create_room', 'room_created')
+            self.room.append(self.room_id)
+            self.room_ready.set()
+        elif self.role == 'guest':
+            if not self.room_ready.wait(self.args.timeout * 2) or not self.room:
+                raise RuntimeError("Host has no room")
+            self._request('join_room', 'room_joined', self.room[0])
+            self.room_id = self.room[0]
+            # Both peers are in the room once the guest has joined
+            self._send_signal('offer', {'type': 'offer', 'sdp': FAKE_SDP})
+
+    def _send_candidates(self):
+        for i in range(self.args.ice):
+            self._send_signal('ice_candidate', {
+                'candidate': f'candidate:{i} 1 udp 2122260223 127.0.0.1 {50000 + i} typ host',
+                'sdpMid': '0', 'sdpMLineIndex': 0})
+
+    def _stream(self, until):
+        interval = 1.0 / self.args.fps
+        next_frame = time.perf_counter()
+        sent = 0
+        while time.perf_counter() < until:
+            ts = time.time() * 1000
+            with self._lock:
+                self._pending[ts] = None
+            frame = {'image': self.rng.choice(self.frames), 'ts': ts}
+            if self.room_id:
+                frame['roomId'] = self.room_id
+            self.sio.emit('detect_sign', frame)
+            sent += 1
+            next_frame += interval
+            time.sleep(max(0.0, next_frame - time.perf_counter()))
+        return sent
+
+    def run(self, start_at, until):
+        time.sleep(max(0.0, start_at - time.perf_counter()))
+        try:
+            self.sio.connect(self.args.url, transports=['websocket'], wait_timeout=self.args.timeout)
+        except Exception:
+            self.stats.fail('connect')
+            self.room_ready.set()  # don't leave a guest waiting
+            return
+        self.stats.connect()
+        sent = 0
+        try:
+            try:
+                self._setup_call()
+            except (RuntimeError, TimeoutError):
+                # Still stream frames, with results sent back to this client only
+                self.stats.fail('signaling')
+                self.room_ready.set()
+                self.room_id = None
+            sent = self._stream(until)
+            time.sleep(self.args.drain)  # let the last results arrive
+        finally:
+            with self._lock:
+                latencies, errors = list(self._latencies), Counter(self._errors)
+            self.stats.add(sent, latencies, errors)
+            self.sio.disconnect()
+
+
+def wait_ready(url, timeout):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if urllib.request.urlopen(f'{url}/ready', timeout=1).status == 200:
+                return
+        except OSError:
+            time.sleep(0.5)
+    raise SystemExit(f"{url}/ready did not report ready within {timeout:.0f} s")
+
+
+def percentiles(values):
+    if not values:
+        return '-', '-', '-', '-'
+    values = np.asarray(values)
+    return tuple(f'{v:.1f}' for v in (*np.percentile(values, [50, 95, 99]), values.max()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', default='http://localhost:5000')
+    parser.add_argument('--clients', type=int, default=10)
+    parser.add_argument('--fps', type=float, default=10.0, help="detect_sign frames per second per client")
+    parser.add_argument('--duration', type=float, default=30.0, help="Seconds each client streams frames")
+    parser.add_argument('--ramp', type=float, default=5.0, help="Seconds over which clients connect")
+    parser.add_argument('--ice', type=int, default=3, help="ice_candidate messages per client")
+    parser.add_argument('--frame-size', help="Re-encode frames at WIDTHxHEIGHT instead of sending them as-is")
+    parser.add_argument('--timeout', type=float, default=10.0, help="Seconds before a connect or reply gives up")
+    parser.add_argument('--drain', type=float, default=2.0, help="Seconds to wait for results after the last frame")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--max-p99-ms', type=float, help="Fail if detection p99 latency exceeds this")
+    parser.add_argument('--max-error-rate', type=float, help="Fail if the fraction of frames answered with an error exceeds this")
+    args = parser.parse_args()
+    if args.clients < 1 or args.fps <= 0:
+        parser.error("--clients and --fps must be positive")
+
+    size = tuple(int(v) for v in args.frame_size.lower().split('x')) if args.frame_size else None
+    frames = load_frames(size=size)
+    wait_ready(args.url, args.timeout * 6)
+
+    stats = Stats()
+    clients = []
+    for pair in range(0, args.clients, 2):
+        room, room_ready = [], threading.Event()
+        roles = ('host', 'guest') if pair + 1 < args.clients else ('solo',)
+        for offset, role in enumerate(roles):
+            clients.append(SimulatedClient(args, frames, stats, role, room, room_ready,
+                                           seed=args.seed * 100003 + pair + offset))
+
+    start = time.perf_counter()
+    # Every client streams for --duration once connected, so the last to connect finishes last
+    step = args.ramp / len(clients)
+    threads = [threading.Thread(target=client.run, daemon=True,
+                                args=(start + i * step, start + i * step + args.duration))
+               for i, client in enumerate(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start - args.drain
+
+    mean_kb = sum(len(frame) for frame in frames) / len(frames) / 1024
+    print(f"{args.clients} clients ({stats.connected} connected) at {args.fps:g} fps for {args.duration:g} s, "
+          f"{len(frames)} frames of {mean_kb:.0f} KB on average")
+    if stats.failed:
+        print("failed clients: " + ', '.join(f"{stage} {count}" for stage, count in stats.failed.items()))
+
+    print(f"\n{'signaling':<16}{'count':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for event in SIGNALING_EVENTS:
+        timings = stats.signaling.get(event, [])
+        print(f"{event:<16}{len(timings):>8}" + ''.join(f'{v:>10}' for v in percentiles(timings)))
+
+    results = len(stats.latencies)
+    errors = sum(stats.errors.values())
+    unanswered = max(0, stats.sent - results - errors)
+    error_rate = errors / stats.sent if stats.sent else 0.0
+    print(f"\ndetection: {stats.sent} frames sent, {results} results, {errors} errors, "
+          f"{unanswered} unanswered (dropped by the scheduler or suppressed by the emission policy)")
+    print(f"throughput: {stats.sent / elapsed:.1f} frames/s sent, {results / elapsed:.1f} results/s")
+    print(f"error rate: {error_rate:.2%}")
+    for message, count in stats.errors.most_common(5):
+        print(f"  {count:>6}  {message}")
+    p50, p95, p99, worst = percentiles(stats.latencies)
+    print(f"latency:    p50 {p50} ms, p95 {p95} ms, p99 {p99} ms, max {worst} ms")
+
+    failures = []
+    if args.max_p99_ms is not None and (not results or np.percentile(stats.latencies, 99) > args.max_p99_ms):
+        failures.append(f"detection p99 exceeds {args.max_p99_ms:g} ms" if results else "no detection results")
+    if args.max_error_rate is not None and error_rate > args.max_error_rate:
+        failures.append(f"error rate {error_rate:.2%} exceeds {args.max_error_rate:.2%}")
+    if stats.failed:
+        failures.append(f"{sum(stats.failed.values())} clients failed")
+    if failures and (args.max_p99_ms is not None or args.max_error_rate is not None):
+        sys.exit('; '.join(failures))
+
+
+if __name__ == '__main__':
+    main()
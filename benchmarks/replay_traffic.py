@@ -0,0 +1,256 @@
+"""Replay recorded Socket.IO traffic against a test server.
+
+Re-issues a recording made with ``TRAFFIC_RECORD_PATH`` (see
+``traffic_recorder.py``) against ``--url``: one Socket.IO client per recorded
+sid, connecting, signaling, sending its frames and disconnecting at the
+recorded times divided by ``--speed``. Room ids are mapped to the ones the
+test server hands out, so rooms fill and empty as they did in production.
+Events in rooms whose creator was not recorded are sent without a room.
+Each frame is sent with a fresh ``ts``, so the server's stale-frame check
+and the echoed latency refer to the replay.
+
+Reports how far behind schedule events went out, the detection results,
+errors and unanswered frames, and p50/p95/p99 latency from emit to
+``detection_result``. As with ``load_test.py``, run the server with
+``EMIT_HEARTBEAT_MS=0`` to get a result for every frame that is predicted.
+
+    python benchmarks/replay_traffic.py traffic.bin --url http://localhost:5000 --speed 2
+    python benchmarks/replay_traffic.py traffic.bin --summary
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+from load_test import percentiles, wait_ready
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from traffic_recorder import EVENTS, read_traffic
+
+
+class ReplayClient:
+    """The replay of one recorded sid."""
+
+    def __init__(self, replay):
+        import socketio
+        self.replay = replay
+        self.sio = socketio.Client(reconnection=False)
+        self.connected = False
+        self._created = []  # recorded ids of rooms awaiting room_created, oldest first
+        self._lock = threading.Lock()
+        self._pending = {}  # ts of frames awaiting a result -> None
+        self.latencies = []
+        self.errors = Counter()
+        self.sio.on('room_created', self._on_room_created)
+        self.sio.on('detection_result', self._on_result)
+        self.sio.on('detection_error', self._on_error)
+
+    def _on_room_created(self, room_id):
+        with self._lock:
+            recorded = self._created.pop(0) if self._created else None
+        if recorded is not None:
+            self.replay.map_room(recorded, room_id)
+
+    def _on_result(self, result):
+        ts = result.get('ts')
+        received = time.time() * 1000
+        with self._lock:
+            if ts in self._pending:
+                del self._pending[ts]
+                self.latencies.append(received - ts)
+
+    def _on_error(self, error):
+        with self._lock:
+            self.errors[error.get('error', 'unknown')] += 1
+
+    def connect(self):
+        try:
+            self.sio.connect(self.replay.url, transports=['websocket'], wait_timeout=self.replay.timeout)
+            self.connected = True
+        except Exception:
+            self.replay.failed['connect'] += 1
+
+    def create_room(self, recorded_room):
+        with self._lock:
+            self._created.append(recorded_room)
+        self.sio.emit('create_room')
+
+    def detect_sign(self, data):
+        data = dict(data, ts=time.time() * 1000)
+        with self._lock:
+            self._pending[data['ts']] = None
+        self.sio.emit('detect_sign', data)
+
+
+class Replay:
+    def __init__(self, url, speed, timeout):
+        self.url = url
+        self.speed = speed
+        self.timeout = timeout
+        self.clients = {}  # recorded sid -> ReplayClient
+        self.finished = []
+        self.rooms = {}  # recorded room id -> test server room id
+        self._creating = set()  # recorded room ids whose create_room has been replayed
+        self._room_ready = {}  # recorded room id -> threading.Event
+        self._lock = threading.Lock()
+        self.lag_ms = []
+        self.sent = Counter()
+        self.failed = Counter()
+
+    def _room_event(self, recorded):
+        with self._lock:
+            return self._room_ready.setdefault(recorded, threading.Event())
+
+    def map_room(self, recorded, room_id):
+        self.rooms[recorded] = room_id
+        self._room_event(recorded).set()
+
+    def room(self, recorded):
+        """The test server's id for a recorded room, waiting for its room_created."""
+        if recorded is None:
+            return None
+        if recorded not in self._creating:
+            # Created before the recording started, or by a client that was not sampled
+            self.failed['unrecorded room'] += 1
+            return None
+        if recorded not in self.rooms and not self._room_event(recorded).wait(self.timeout):
+            self.failed['unmapped room'] += 1
+            return None
+        return self.rooms.get(recorded)
+
+    def _client(self, sid):
+        client = self.clients.get(sid)
+        if client is None:
+            # The recording started after this sid connected
+            client = self.clients[sid] = ReplayClient(self)
+            client.connect()
+        return client
+
+    def dispatch(self, event):
+        if event.event == 'connect':
+            self._client(event.sid)
+            return
+        client = self._client(event.sid)
+        if not client.connected:
+            return
+        if event.event == 'disconnect':
+            client.sio.disconnect()
+            self.finished.append(self.clients.pop(event.sid))
+        elif event.event == 'create_room':
+            self._creating.add(event.room)
+            client.create_room(event.room)
+        elif event.event == 'join_room':
+            client.sio.emit('join_room', self.room(event.room))
+        elif event.event == 'detect_sign':
+            data = event.data if isinstance(event.data, dict) else {}
+            if data.get('roomId'):
+                data['roomId'] = self.room(data['roomId'])
+            client.detect_sign(data)
+        else:
+            data = dict(event.data or {}, roomId=self.room(event.room))
+            client.sio.emit(event.event, data)
+        self.sent[event.event] += 1
+
+    def run(self, events, duration=None):
+        started = recorded_start = None
+        for event in events:
+            if recorded_start is None:
+                recorded_start, started = event.time, time.perf_counter()
+            offset = (event.time - recorded_start) / self.speed
+            if duration is not None and offset > duration:
+                break
+            delay = started + offset - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                self.lag_ms.append(-delay * 1000)
+            self.dispatch(event)
+        return time.perf_counter() - started if started is not None else 0.0
+
+    def close(self, drain):
+        time.sleep(drain)  # let the last results arrive
+        for client in self.clients.values():
+            if client.connected:
+                client.sio.disconnect()
+        self.finished += self.clients.values()
+        self.clients = {}
+
+
+def summary(path):
+    events, sids, rooms, image_bytes = Counter(), set(), set(), 0
+    first = last = None
+    for event in read_traffic(path):
+        first = event.time if first is None else first
+        last = event.time
+        events[event.event] += 1
+        sids.add(event.sid)
+        if event.room:
+            rooms.add(event.room)
+        if event.event == 'detect_sign' and event.data:
+            image_bytes += len(event.data.get('image', b''))
+    if first is None:
+        raise SystemExit(f"{path} holds no events")
+    print(f"{path}: {last - first:.1f} s, {len(sids)} sids, {len(rooms)} rooms, "
+          f"{os.path.getsize(path) / 1024 / 1024:.1f} MB")
+    for name in EVENTS:
+        print(f"{name:<16}{events[name]:>10}")
+    if events['detect_sign']:
+        print(f"mean frame:     {image_bytes / events['detect_sign'] / 1024:.1f} KB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('recording', help="File written through TRAFFIC_RECORD_PATH")
+    parser.add_argument('--url', default='http://localhost:5000')
+    parser.add_argument('--speed', type=float, default=1.0, help="Replay speed; 2 replays twice as fast")
+    parser.add_argument('--duration', type=float, help="Stop after this many seconds of replay")
+    parser.add_argument('--timeout', type=float, default=10.0, help="Seconds before a connect or room mapping gives up")
+    parser.add_argument('--drain', type=float, default=2.0, help="Seconds to wait for results after the last event")
+    parser.add_argument('--summary', action='store_true', help="Describe the recording instead of replaying it")
+    args = parser.parse_args()
+    if args.speed <= 0:
+        parser.error("--speed must be positive")
+
+    if args.summary:
+        summary(args.recording)
+        return
+
+    wait_ready(args.url, args.timeout * 6)
+    replay = Replay(args.url, args.speed, args.timeout)
+    try:
+        elapsed = replay.run(read_traffic(args.recording), args.duration)
+    finally:
+        replay.close(args.drain)
+
+    clients = replay.finished
+    latencies = [ms for client in clients for ms in client.latencies]
+    errors = Counter()
+    for client in clients:
+        errors.update(client.errors)
+    frames = replay.sent['detect_sign']
+    results, error_count = len(latencies), sum(errors.values())
+
+    print(f"replayed {sum(replay.sent.values())} events from {len(clients)} clients "
+          f"in {elapsed:.1f} s at {args.speed:g}x")
+    print(', '.join(f"{name} {replay.sent[name]}" for name in EVENTS[2:]))
+    if replay.failed:
+        print("failures: " + ', '.join(f"{name} {count}" for name, count in replay.failed.items()))
+    late = len(replay.lag_ms)
+    p50, p95, p99, worst = percentiles(replay.lag_ms)
+    print(f"schedule:   {late} events late; p50 {p50} ms, p99 {p99} ms, max {worst} ms behind")
+
+    print(f"\ndetection: {frames} frames sent, {results} results, {error_count} errors, "
+          f"{max(0, frames - results - error_count)} unanswered")
+    if elapsed:
+        print(f"throughput: {frames / elapsed:.1f} frames/s sent, {results / elapsed:.1f} results/s")
+    print(f"error rate: {error_count / frames if frames else 0.0:.2%}")
+    for message, count in errors.most_common(5):
+        print(f"  {count:>6}  {message}")
+    p50, p95, p99, worst = percentiles(latencies)
+    print(f"latency:    p50 {p50} ms, p95 {p95} ms, p99 {p99} ms, max {worst} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,155 @@
+import json
+import os
+from dataclasses import dataclass, fields
+
+# Settings written by autotune.py, applied under any environment overrides
+CONFIG_FILE = 'server_config.json'
+
+
+def _env_int(name, default):
+    value = os.environ.get(name)
+    return int(value) if value not in (None, '') else default
+
+
+def _env_float(name, default):
+    value = os.environ.get(name)
+    return float(value) if value not in (None, '') else default
+
+
+def _env_str(name, default):
+    value = os.environ.get(name)
+    return value if value not in (None, '') else default
+
+
+@dataclass
+class ServerConfig:
+    """Tunable settings for the detection server.
+
+    Every field can be overridden with the upper-cased environment variable
+    of the same name, e.g. ``BATCH_MAX_SIZE=16``. Fields set in the JSON file
+    named by ``SERVER_CONFIG_FILE`` (``server_config.json`` by default, if it
+    exists) replace the defaults below, and the environment overrides both.
+    """
+    model_path: str = 'models/new_sign_language_model.keras'
+    classes_dir: str = 'processed_dataset'
+
+    # 'keras' (traced tf.function) or 'tflite' (interpreter on the exported
+    # .tflite model, see convert_model.py).
+    inference_backend: str = 'keras'
+    tflite_model_path: str = 'models/new_sign_language_model.tflite'
+    # Interpreter threads for the tflite backend; 0 lets TFLite decide.
+    tflite_threads: int = 0
+    # TensorFlow's intra-op and inter-op thread pools and OpenMP threads for
+    # the keras backend; 0 lets TensorFlow decide.
+    tf_intra_op_threads: int = 0
+    tf_inter_op_threads: int = 0
+    omp_num_threads: int = 0
+
+    # Micro-batching: a batch is dispatched once it holds batch_max_size
+    # frames or its oldest frame has waited batch_max_wait_ms.
+    batch_max_size: int = 8
+    batch_max_wait_ms: float = 10.0
+
+    # Unprocessed frames kept per client; newer frames replace older ones.
+    frame_queue_depth: int = 1
+    # Frames captured longer ago than this are dropped (0 disables).
+    max_frame_age_ms: float = 1000.0
+
+    # Dummy inferences run at every batch size before the server reports ready.
+    warmup_iterations: int = 3
+
+    # Inference processes fed through shared memory; 0 runs the model in the
+    # server process.
+    inference_workers: int = 0
+
+    # Per-client cache of recent predictions keyed by a perceptual hash of the
+    # prepared frame (0 entries disables it). Frames whose hash differs in at
+    # most prediction_cache_distance of 64 bits reuse a prediction younger
+    # than prediction_cache_ttl_ms.
+    prediction_cache_size: int = 8
+    prediction_cache_distance: int = 4
+    prediction_cache_ttl_ms: float = 500.0
+
+    # Motion gating: frames whose mean absolute difference from the client's
+    # last predicted frame (on a 16x16 grayscale grid, 0-1 scale) is below
+    # motion_threshold reuse its prediction, for at most motion_max_skip_ms
+    # (0 threshold disables).
+    motion_threshold: float = 0.02
+    motion_max_skip_ms: float = 1000.0
+
+    # detection_result is only emitted when a client's label changes, its
+    # confidence moves by more than emit_confidence_delta, or emit_heartbeat_ms
+    # has passed since the last emit (0 heartbeat emits every result).
+    emit_confidence_delta: float = 0.1
+    emit_heartbeat_ms: float = 1000.0
+
+    # Signaling rooms: at most room_max_peers sids per room (0 for no limit),
+    # and rooms with no activity for room_idle_ttl_s are dropped (0 keeps them).
+    room_max_peers: int = 2
+    room_idle_ttl_s: float = 3600.0
+
+    # Frames kept by the flight recorder, both most recent and slowest (0
+    # disables it).
+    flight_recorder_size: int = 50
+
+    # Bearer token for the /admin endpoints; they answer 403 while it is unset.
+    admin_token: str = ''
+    # TensorFlow profiler traces requested through /admin/tf-trace go here.
+    profile_dir: str = 'logs/profile'
+
+    # Incoming Socket.IO traffic of traffic_record_sample of the clients is
+    # appended to traffic_record_path for benchmarks/replay_traffic.py (unset
+    # disables it), until the file holds traffic_record_max_mb.
+    traffic_record_path: str = ''
+    traffic_record_sample: float = 1.0
+    traffic_record_max_mb: float = 1024.0
+
+    @classmethod
+    def from_file(cls, path):
+        with open(path) as f:
+            values = json.load(f)
+        unknown = set(values) - {field.name for field in fields(cls)}
+        if unknown:
+            raise ValueError(f"Unknown settings in {path}: {', '.join(sorted(unknown))}")
+        return cls(**values)
+
+    @classmethod
+    def from_env(cls):
+        path = _env_str('SERVER_CONFIG_FILE', CONFIG_FILE)
+        defaults = cls.from_file(path) if os.path.exists(path) else cls()
+        return cls(
+            model_path=_env_str('MODEL_PATH', defaults.model_path),
+            classes_dir=_env_str('CLASSES_DIR', defaults.classes_dir),
+            inference_backend=_env_str('INFERENCE_BACKEND', defaults.inference_backend),
+            tflite_model_path=_env_str('TFLITE_MODEL_PATH', defaults.tflite_model_path),
+            tflite_threads=_env_int('TFLITE_THREADS', defaults.tflite_threads),
+            tf_intra_op_threads=_env_int('TF_INTRA_OP_THREADS', defaults.tf_intra_op_threads),
+            tf_inter_op_threads=_env_int('TF_INTER_OP_THREADS', defaults.tf_inter_op_threads),
+            omp_num_threads=_env_int('OMP_NUM_THREADS', defaults.omp_num_threads),
+            batch_max_size=_env_int('BATCH_MAX_SIZE', defaults.batch_max_size),
+            batch_max_wait_ms=_env_float('BATCH_MAX_WAIT_MS', defaults.batch_max_wait_ms),
+            frame_queue_depth=_env_int('FRAME_QUEUE_DEPTH', defaults.frame_queue_depth),
+            max_frame_age_ms=_env_float('MAX_FRAME_AGE_MS', defaults.max_frame_age_ms),
+            warmup_iterations=_env_int('WARMUP_ITERATIONS', defaults.warmup_iterations),
+            inference_workers=_env_int('INFERENCE_WORKERS', defaults.inference_workers),
+            prediction_cache_size=_env_int('PREDICTION_CACHE_SIZE', defaults.prediction_cache_size),
+            prediction_cache_distance=_env_int('PREDICTION_CACHE_DISTANCE', defaults.prediction_cache_distance),
+            prediction_cache_ttl_ms=_env_float('PREDICTION_CACHE_TTL_MS', defaults.prediction_cache_ttl_ms),
+            motion_threshold=_env_float('MOTION_THRESHOLD', defaults.motion_threshold),
+            motion_max_skip_ms=_env_float('MOTION_MAX_SKIP_MS', defaults.motion_max_skip_ms),
+            emit_confidence_delta=_env_float('EMIT_CONFIDENCE_DELTA', defaults.emit_confidence_delta),
+            emit_heartbeat_ms=_env_float('EMIT_HEARTBEAT_MS', defaults.emit_heartbeat_ms),
+            room_max_peers=_env_int('ROOM_MAX_PEERS', defaults.room_max_peers),
+            room_idle_ttl_s=_env_float('ROOM_IDLE_TTL_S', defaults.room_idle_ttl_s),
+            flight_recorder_size=_env_int('FLIGHT_RECORDER_SIZE', defaults.flight_recorder_size),
+            admin_token=_env_str('ADMIN_TOKEN', defaults.admin_token),
+            profile_dir=_env_str('PROFILE_DIR', defaults.profile_dir),
+            traffic_record_path=_env_str('TRAFFIC_RECORD_PATH', defaults.traffic_record_path),
+            traffic_record_sample=_env_float('TRAFFIC_RECORD_SAMPLE', defaults.traffic_record_sample),
+            traffic_record_max_mb=_env_float('TRAFFIC_RECORD_MAX_MB', defaults.traffic_record_max_mb),
+        )
+
+    @property
+    def serving_model_path(self):
+        """Model file loaded by the configured inference backend."""
+        return self.tflite_model_path if self.inference_backend == 'tflite' else self.model_path
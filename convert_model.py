@@ -1,12 +1,201 @@
-import tensorflow as tf
+import argparse
+import json
 import os
+import random
+import time
+
+import numpy as np
+import tensorflow as tf
+
+from inference import TFLiteModel
+from preprocessing import FramePreprocessor, model_frame_dtype
+
+QUANTIZATION_VARIANTS = ("float32", "dynamic", "float16", "int8")
+
+
+def convert_tfjs(args):
+    # Load the Keras model
+    model = tf.keras.models.load_model(args.model)
+
+    # Create directory for the converted model
+    os.makedirs(args.output, exist_ok=True)
+
+    # Convert and save the model for TensorFlow.js
+    saved_model_dir = os.path.join(args.output, "tmp")
+    tf.saved_model.save(model, saved_model_dir)
+    os.system(f"tensorflowjs_converter --input_format=tf_saved_model --output_format=tfjs_graph_model "
+              f"{saved_model_dir} {args.output}")
+
+
+def convert_tflite(args):
+    # Export the Keras model as a TensorFlow Lite flatbuffer for the tflite inference backend
+    model = tf.keras.models.load_model(args.model)
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    tflite_model = converter.convert()
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "wb") as f:
+        f.write(tflite_model)
+    print(f"Saved TFLite model ({len(tflite_model) / 1024:.1f} KiB) to: {args.output}")
+
+
+def uint8_input_model(model):
+    # Same weights behind a uint8 input and a Rescaling layer, so servers send raw pixels
+    inputs = tf.keras.Input(shape=model.input_shape[1:], dtype="uint8")
+    x = tf.keras.layers.Rescaling(1.0 / 255)(inputs)
+    return tf.keras.Model(inputs, model(x), name=f"{model.name}_uint8")
+
+
+def convert_uint8(args):
+    model = tf.keras.models.load_model(args.model)
+    if model_frame_dtype(model) == np.uint8:
+        raise SystemExit(f"{args.model} already takes uint8 input")
+    wrapped = uint8_input_model(model)
+
+    # The wrapped model must predict exactly what the float model does on normalized pixels
+    pixels = np.random.default_rng(0).integers(0, 256, (args.samples,) + model.input_shape[1:], dtype=np.uint8)
+    expected = model.predict(pixels.astype(np.float32) / 255.0, verbose=0)
+    actual = wrapped.predict(pixels, verbose=0)
+    max_diff = float(np.abs(expected - actual).max())
+    if max_diff > args.atol or (expected.argmax(axis=1) != actual.argmax(axis=1)).any():
+        raise SystemExit(f"uint8 model does not match {args.model}: max abs diff {max_diff:.2e}")
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    wrapped.save(args.output)
+    print(f"Saved uint8-input model to: {args.output} (max abs diff {max_diff:.2e} over {args.samples} frames)")
+
+
+def load_dataset_sample(dataset_dir, count, input_shape, seed, dtype="float32"):
+    # Preprocess exactly like training and serving, via the shared input contract
+    paths = sorted(
+        os.path.join(root, name)
+        for root, _, files in os.walk(dataset_dir)
+        for name in files
+        if name.lower().endswith((".png", ".jpg", ".jpeg"))
+    )
+    if not paths:
+        raise SystemExit(f"No images found in {dataset_dir}")
+    paths = random.Random(seed).sample(paths, min(count, len(paths)))
+
+    preprocessor = FramePreprocessor(input_shape, dtype=dtype)
+    frames = np.empty((len(paths),) + tuple(input_shape), dtype=preprocessor.dtype)
+    for i, path in enumerate(paths):
+        preprocessor.preprocess_file(path, out=frames[i])
+    return frames
+
+
+def quantized_tflite_model(model, variant, representative_frames):
+    uint8_input = model_frame_dtype(model) == np.uint8
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    if variant == "dynamic":
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    elif variant == "float16":
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.target_spec.supported_types = [tf.float16]
+    elif variant == "int8":
+        # Full-integer: calibrate activation ranges on real frames, int8 out (and in, for float models)
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.representative_dataset = lambda: ([frame[np.newaxis]] for frame in representative_frames)
+        if uint8_input:
+            # Raw pixels stay the input; only the cast feeding the Rescaling layer runs in float
+            converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8,
+                                                   tf.lite.OpsSet.TFLITE_BUILTINS]
+        else:
+            converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+            converter.inference_input_type = tf.int8
+        converter.inference_output_type = tf.int8
+    return converter.convert()
+
+
+def cpu_latency_ms(model_path, frames, iterations, threads):
+    model = TFLiteModel(model_path, num_threads=threads)
+    frame = frames[:1]
+    for _ in range(10):
+        model(frame)
+    timings = np.empty(iterations)
+    for i in range(iterations):
+        start = time.perf_counter()
+        model(frame)
+        timings[i] = time.perf_counter() - start
+    return timings * 1000, model
+
+
+def quantize(args):
+    model = tf.keras.models.load_model(args.model)
+    input_shape = model.input_shape[1:]
+    dtype = model_frame_dtype(model)
+    representative = load_dataset_sample(args.dataset, args.calibration_samples, input_shape, seed=0, dtype=dtype)
+    evaluation = load_dataset_sample(args.dataset, args.eval_samples, input_shape, seed=1, dtype=dtype)
+    reference = model.predict(evaluation, verbose=0).argmax(axis=1)
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    base_name = os.path.splitext(os.path.basename(args.model))[0]
+    report = {"model": args.model, "eval_samples": len(evaluation), "variants": {}}
+    for variant in args.variants:
+        output_path = os.path.join(args.output_dir, f"{base_name}_{variant}.tflite")
+        with open(output_path, "wb") as f:
+            f.write(quantized_tflite_model(model, variant, representative))
+
+        timings, interpreter = cpu_latency_ms(output_path, evaluation, args.iterations, args.threads)
+        predictions = np.concatenate([interpreter(evaluation[i:i + 1]) for i in range(len(evaluation))])
+        report["variants"][variant] = {
+            "path": output_path,
+            "size_bytes": os.path.getsize(output_path),
+            "latency_ms_mean": float(timings.mean()),
+            "latency_ms_p99": float(np.percentile(timings, 99)),
+            "top1_agreement": float((predictions.argmax(axis=1) == reference).mean()),
+        }
+
+    with open(args.report, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print(f"{'variant':<10}{'size KiB':>10}{'mean ms':>10}{'p99 ms':>10}{'top-1 agree':>13}")
+    for variant, result in report["variants"].items():
+        print(f"{variant:<10}{result['size_bytes'] / 1024:>10.1f}{result['latency_ms_mean']:>10.3f}"
+              f"{result['latency_ms_p99']:>10.3f}{result['top1_agreement']:>13.1%}")
+    print(f"\nReport saved to: {args.report}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert the trained sign language model for serving.")
+    subparsers = parser.add_subparsers(dest="command")
+
+    tfjs = subparsers.add_parser("tfjs", help="TensorFlow.js graph model for the browser (default)")
+    tfjs.add_argument("--model", default="models/sign_language_model.keras")
+    tfjs.add_argument("--output", default="static/model")
+    tfjs.set_defaults(func=convert_tfjs)
+
+    tflite = subparsers.add_parser("tflite", help="TensorFlow Lite model for INFERENCE_BACKEND=tflite")
+    tflite.add_argument("--model", default="models/new_sign_language_model.keras")
+    tflite.add_argument("--output", default="models/new_sign_language_model.tflite")
+    tflite.set_defaults(func=convert_tflite)
+
+    uint8 = subparsers.add_parser("uint8", help="Serving model that takes uint8 pixels and rescales them itself")
+    uint8.add_argument("--model", default="models/new_sign_language_model.keras", help="Float-input Keras model")
+    uint8.add_argument("--output", default="models/new_sign_language_model_uint8.keras")
+    uint8.add_argument("--samples", type=int, default=64, help="Random frames the parity check runs")
+    uint8.add_argument("--atol", type=float, default=1e-5, help="Largest allowed prediction difference")
+    uint8.set_defaults(func=convert_uint8)
+
+    quant = subparsers.add_parser("quantize", help="Quantized TFLite variants plus a size/latency/accuracy report")
+    quant.add_argument("--model", default="models/new_sign_language_model.keras")
+    quant.add_argument("--dataset", default="processed_dataset")
+    quant.add_argument("--output-dir", default="models")
+    quant.add_argument("--report", default="models/quantization_report.json")
+    quant.add_argument("--variants", nargs="+", choices=QUANTIZATION_VARIANTS, default=list(QUANTIZATION_VARIANTS))
+    quant.add_argument("--calibration-samples", type=int, default=200,
+                       help="Images from the dataset used to calibrate the int8 variant")
+    quant.add_argument("--eval-samples", type=int, default=300)
+    quant.add_argument("--iterations", type=int, default=200)
+    quant.add_argument("--threads", type=int, default=0)
+    quant.set_defaults(func=quantize)
 
-# Load the Keras model
-model = tf.keras.models.load_model("models/sign_language_model.keras")
+    args = parser.parse_args()
+    if args.command is None:
+        # Running without a subcommand keeps the original TensorFlow.js conversion
+        args = parser.parse_args(["tfjs"])
+    args.func(args)
 
-# Create directory for the converted model
-os.makedirs("static/model", exist_ok=True)
 
-# Convert and save the model for TensorFlow.js
-tf.saved_model.save(model, "static/model/tmp")
-os.system("tensorflowjs_converter --input_format=tf_saved_model --output_format=tfjs_graph_model static/model/tmp static/model")
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Emission policy for detection results.
+
+Most frames from a signer produce the same label as the previous one, and
+re-sending it to the whole room on every frame costs an outbound Socket.IO
+message (plus a log line) per frame. ``EmissionPolicy`` lets a result through
+only when its label differs from the last one emitted for that client, when
+its confidence has moved by more than ``confidence_delta``, or when
+``heartbeat_ms`` has passed since the last emit, so clients still see that
+detection is alive.
+"""
+import threading
+import time
+from collections import Counter
+
+REASONS = ('label', 'confidence', 'heartbeat')
+
+
+class _LastEmit:
+    __slots__ = ('label', 'confidence', 'emitted_at')
+
+    def __init__(self, label, confidence, emitted_at):
+        self.label = label
+        self.confidence = confidence
+        self.emitted_at = emitted_at
+
+
+class EmissionPolicy:
+    def __init__(self, confidence_delta=0.1, heartbeat_ms=1000.0):
+        self.confidence_delta = confidence_delta
+        self.heartbeat = heartbeat_ms / 1000.0
+
+        self._lock = threading.Lock()
+        self._clients = {}
+        self._counts = Counter()
+
+    def reason_to_emit(self, key, label, confidence):
+        """Why this result should be emitted ('label', 'confidence' or
+        'heartbeat'), or None to suppress it."""
+        now = time.monotonic()
+        with self._lock:
+            last = self._clients.get(key)
+            if last is None or label != last.label:
+                reason = 'label'
+            elif abs(confidence - last.confidence) > self.confidence_delta:
+                reason = 'confidence'
+            elif now - last.emitted_at >= self.heartbeat:
+                reason = 'heartbeat'
+            else:
+                self._counts['suppressed'] += 1
+                return None
+
+            if last is None:
+                self._clients[key] = _LastEmit(label, confidence, now)
+            else:
+                last.label, last.confidence, last.emitted_at = label, confidence, now
+            self._counts[reason] += 1
+            return reason
+
+    def remove_client(self, key):
+        with self._lock:
+            self._clients.pop(key, None)
+
+    def stats(self):
+        """Emitted results by reason and suppressed results."""
+        with self._lock:
+            counts = dict(self._counts)
+            clients = len(self._clients)
+        emitted = {reason: counts.get(reason, 0) for reason in REASONS}
+        suppressed = counts.get('suppressed', 0)
+        total = sum(emitted.values()) + suppressed
+        return {
+            'confidence_delta': self.confidence_delta,
+            'heartbeat_ms': self.heartbeat * 1000,
+            'emitted': emitted,
+            'suppressed': suppressed,
+            'suppression_rate': suppressed / total if total else 0.0,
+            'clients': clients,
+        }
@@ -0,0 +1,68 @@
+"""Keeps blocking model work off the Socket.IO event loop.
+
+Production runs under ``gunicorn -k eventlet``, which monkey-patches
+``threading`` so the scheduler's threads are green threads sharing one OS
+thread (the hub) with every Socket.IO connection. A TensorFlow predict or a
+PIL decode called from one of them holds that thread, and every connected
+client, including WebRTC signaling, freezes until it returns.
+
+``InferenceExecutor.run`` hands such calls to eventlet's pool of native OS
+threads (``eventlet.tpool``) when the server runs on eventlet. Only the
+calling green thread waits; the hub keeps serving other clients and wakes
+the caller when the call completes. Without eventlet the scheduler's threads
+are already OS threads, so calls run directly.
+
+Functions passed to ``run`` run on a native thread and must not use green
+primitives (patched locks, queues, sockets). Socket.IO emits stay on the
+green side.
+"""
+import logging
+import sys
+
+logger = logging.getLogger(__name__)
+
+
+def detect_async_mode():
+    """Socket.IO async mode matching the server the app was loaded by.
+
+    The gunicorn eventlet worker monkey-patches the standard library before
+    importing the app, so a patched ``socket`` module means eventlet is
+    serving; otherwise (``python app.py``) the app runs on plain threads.
+    """
+    if 'eventlet' in sys.modules:
+        from eventlet import patcher
+        if patcher.is_monkey_patched('socket'):
+            return 'eventlet'
+    return 'threading'
+
+
+def native_lock():
+    """A lock on OS threads, even when eventlet has patched ``threading``.
+
+    For short critical sections shared between green threads and the native
+    threads ``InferenceExecutor.run`` calls into; a green lock must not be
+    waited on from a native thread.
+    """
+    if 'eventlet' in sys.modules:
+        from eventlet import patcher
+        return patcher.original('threading').Lock()
+    import threading
+    return threading.Lock()
+
+
+class InferenceExecutor:
+    def __init__(self, async_mode=None):
+        self.async_mode = async_mode or detect_async_mode()
+        if self.async_mode == 'eventlet':
+            from eventlet import tpool
+            self._execute = tpool.execute
+        else:
+            self._execute = None
+        logger.info(f"Inference executor: {'eventlet native thread pool' if self._execute else 'direct calls'} "
+                    f"(async_mode={self.async_mode})")
+
+    def run(self, fn, *args, **kwargs):
+        """Call ``fn`` on a native OS thread and return its result (or raise its exception)."""
+        if self._execute is None:
+            return fn(*args, **kwargs)
+        return self._execute(fn, *args, **kwargs)
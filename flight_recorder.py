@@ -0,0 +1,135 @@
+"""Flight recorder for slow detections.
+
+Keeps the ``size`` most recent and the ``size`` slowest frames with a
+breakdown of where each one spent its time: queueing, base64 and image
+decode, resize and normalize, the model call for its batch, and the emit.
+Each entry also holds the payload size and source image dimensions, so a p99
+spike can be traced to huge frames, a backed-up queue or the model without
+turning on debug logging.
+
+Every frame the scheduler dispatches gets a trace slot, a row of a
+preallocated float64 array that the scheduler and ``prepare_fn`` fill in
+place. When the frame completes, its row is copied into the recent ring and,
+if it is slow enough, over the fastest of the slowest rows. No dict or list
+is built per frame; entries become dicts only when the recorder is dumped.
+"""
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+# Columns of every row
+FIELDS = ('time', 'total_ms', 'queue_ms', 'base64_decode_ms', 'image_decode_ms', 'preprocess_ms',
+          'inference_ms', 'emit_ms', 'payload_bytes', 'width', 'height', 'batch_size', 'outcome')
+(TIME, TOTAL, QUEUE, BASE64_DECODE, IMAGE_DECODE, PREPROCESS,
+ INFERENCE, EMIT, PAYLOAD_BYTES, WIDTH, HEIGHT, BATCH_SIZE, OUTCOME) = range(len(FIELDS))
+STAGES = {'base64_decode': BASE64_DECODE, 'image_decode': IMAGE_DECODE, 'preprocess': PREPROCESS}
+OUTCOMES = ('predicted', 'cached', 'error')
+PREDICTED, CACHED, ERROR = range(len(OUTCOMES))
+_INTEGER_FIELDS = {PAYLOAD_BYTES, WIDTH, HEIGHT, BATCH_SIZE}
+
+
+class FlightRecorder:
+    def __init__(self, size=50, max_in_flight=64):
+        """``max_in_flight`` bounds the frames traced at once; frames
+        dispatched beyond it are simply not recorded."""
+        if size < 1:
+            raise ValueError("size must be at least 1")
+        self.size = size
+        self._lock = threading.Lock()
+        self._traces = np.zeros((max_in_flight, len(FIELDS)))
+        self._started_at = np.zeros(max_in_flight)  # monotonic enqueue time
+        self._free = deque(range(max_in_flight))
+
+        self._recent = np.zeros((size, len(FIELDS)))
+        self._recent_next = 0
+        self._recent_count = 0
+        self._slowest = np.zeros((size, len(FIELDS)))
+        self._slowest_count = 0
+        self._slowest_min = 0  # row of the fastest entry among the slowest
+        self._recorded = 0
+        self._untraced = 0
+
+    def begin(self, enqueued_at, now):
+        """Trace slot for a frame queued at ``enqueued_at`` (monotonic), or None if all are in use."""
+        with self._lock:
+            if not self._free:
+                self._untraced += 1
+                return None
+            trace = self._free.popleft()
+        row = self._traces[trace]
+        row.fill(0.0)
+        row[QUEUE] = (now - enqueued_at) * 1000
+        self._started_at[trace] = enqueued_at
+        return trace
+
+    def stage(self, trace, name, seconds):
+        self._traces[trace, STAGES[name]] = seconds * 1000
+
+    def frame(self, trace, payload_bytes, width, height):
+        row = self._traces[trace]
+        row[PAYLOAD_BYTES] = payload_bytes
+        row[WIDTH] = width
+        row[HEIGHT] = height
+
+    def batch(self, trace, batch_size, inference_seconds):
+        row = self._traces[trace]
+        row[BATCH_SIZE] = batch_size
+        row[INFERENCE] = inference_seconds * 1000
+
+    def finish(self, trace, outcome, emit_seconds):
+        """Record the completed frame and release its slot."""
+        row = self._traces[trace]
+        row[OUTCOME] = outcome
+        row[EMIT] = emit_seconds * 1000
+        row[TIME] = time.time()
+        total = (time.monotonic() - self._started_at[trace]) * 1000
+        row[TOTAL] = total
+        with self._lock:
+            self._recent[self._recent_next] = row
+            self._recent_next = (self._recent_next + 1) % self.size
+            self._recent_count = min(self._recent_count + 1, self.size)
+
+            if self._slowest_count < self.size:
+                self._slowest[self._slowest_count] = row
+                self._slowest_count += 1
+                if self._slowest_count == self.size:
+                    self._slowest_min = int(self._slowest[:, TOTAL].argmin())
+            elif total > self._slowest[self._slowest_min, TOTAL]:
+                self._slowest[self._slowest_min] = row
+                self._slowest_min = int(self._slowest[:, TOTAL].argmin())
+            self._recorded += 1
+            self._free.append(trace)
+
+    @staticmethod
+    def _entries(rows):
+        entries = []
+        for row in rows:
+            entry = {}
+            for column, field in enumerate(FIELDS):
+                value = row[column]
+                if column == OUTCOME:
+                    entry[field] = OUTCOMES[int(value)]
+                elif column in _INTEGER_FIELDS:
+                    entry[field] = int(value)
+                else:
+                    entry[field] = round(float(value), 3)
+            entries.append(entry)
+        return entries
+
+    def dump(self):
+        """The recent frames (newest first) and the slowest ones (slowest first)."""
+        with self._lock:
+            order = [(self._recent_next - 1 - i) % self.size for i in range(self._recent_count)]
+            recent = self._recent[order].copy()
+            slowest = self._slowest[:self._slowest_count].copy()
+            recorded, untraced = self._recorded, self._untraced
+        slowest = slowest[np.argsort(-slowest[:, TOTAL], kind='stable')]
+        return {
+            'size': self.size,
+            'recorded': recorded,
+            'untraced': untraced,
+            'recent': self._entries(recent),
+            'slowest': self._entries(slowest),
+        }
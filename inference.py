@@ -0,0 +1,225 @@
+"""Shared inference backends for the sign language model.
+
+``model.predict`` builds a data adapter and runs the callback machinery on
+every call, which costs milliseconds when all we want is one frame (or one
+small batch). ``CompiledModel`` traces the Keras model once into a
+``tf.function`` with a fixed input signature and reuses that graph for
+every call.
+
+``TFLiteModel`` runs the exported ``.tflite`` model (see
+``convert_model.py tflite``) in a TensorFlow Lite interpreter. It prefers the
+standalone ``tflite_runtime`` package, so the process never loads the full
+TensorFlow runtime.
+
+TensorFlow is imported lazily, only by the backend that needs it.
+"""
+import logging
+import os
+import threading
+import time
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ('keras', 'tflite')
+
+
+class CompiledModel:
+    """A Keras model traced once into a ``tf.function`` for one input dtype.
+
+    ``input_dtype`` defaults to the model's own. Models exported with a
+    uint8 input and a ``Rescaling`` layer (``scripts/train_model.py``,
+    ``convert_model.py uint8``) take raw pixels as they are; asking for uint8
+    frames on an older float model casts and normalizes them in the graph.
+    """
+
+    def __init__(self, model, input_dtype=None):
+        import tensorflow as tf
+
+        self.model = model
+        self.input_shape = tuple(model.input_shape[1:])
+        model_dtype = tf.as_dtype(model.inputs[0].dtype)
+        self.input_dtype = tf.as_dtype(input_dtype or model_dtype)
+        if self.input_dtype not in (tf.float32, tf.uint8):
+            raise ValueError(f"Unsupported input dtype: {input_dtype}")
+        self._normalize = self.input_dtype == tf.uint8 and model_dtype != tf.uint8
+        self._numpy_dtype = self.input_dtype.as_numpy_dtype
+        self.frame_dtype = np.dtype(self._numpy_dtype)
+        self._constant = tf.constant
+
+        # Batch size stays dynamic so the scheduler can reuse one graph for every batch
+        signature = tf.TensorSpec(shape=(None,) + self.input_shape, dtype=self.input_dtype)
+        self._forward = tf.function(self._call_model, input_signature=[signature]).get_concrete_function()
+
+    def _call_model(self, x):
+        import tensorflow as tf
+
+        if self._normalize:
+            # Raw pixels for a float model: normalize inside the graph instead of in numpy
+            x = tf.cast(x, tf.float32) / 255.0
+        return self.model(x, training=False)
+
+    def __call__(self, batch):
+        """Run the model on one frame (H, W, C), a batch (N, H, W, C) or a list of frames."""
+        x = np.asarray(batch, dtype=self._numpy_dtype)
+        if x.ndim == len(self.input_shape):
+            x = x[np.newaxis]
+        return self._forward(self._constant(x)).numpy()
+
+
+def _tflite_interpreter_class():
+    try:
+        from tflite_runtime.interpreter import Interpreter
+    except ImportError:
+        import tensorflow as tf
+        Interpreter = tf.lite.Interpreter
+    return Interpreter
+
+
+class TFLiteModel:
+    """TensorFlow Lite interpreters with input buffers preallocated per batch size.
+
+    Each batch size gets its own interpreter, allocated once, so a scheduler
+    that alternates between batch sizes never re-plans tensor arenas.
+    """
+
+    def __init__(self, model_path, num_threads=None):
+        self._interpreter_class = _tflite_interpreter_class()
+        self._num_threads = num_threads or None
+        with open(model_path, 'rb') as f:
+            self._model_content = f.read()
+
+        interpreter = self._new_interpreter()
+        input_details = interpreter.get_input_details()[0]
+        output_details = interpreter.get_output_details()[0]
+        self._input_index = input_details['index']
+        self._output_index = output_details['index']
+        self.input_shape = tuple(int(dim) for dim in input_details['shape'][1:])
+        self.input_dtype = np.dtype(input_details['dtype'])
+
+        # Full-integer models (convert_model.py quantize) take and return
+        # quantized tensors; float frames are mapped through (scale, zero_point).
+        self._input_quantization = self._quantization(input_details)
+        self._output_quantization = self._quantization(output_details)
+        # Raw uint8 pixels for models that rescale in-graph, else float frames
+        self.frame_dtype = np.dtype(np.uint8 if self.input_dtype == np.uint8 and self._input_quantization is None
+                                    else np.float32)
+
+        # batch size -> (interpreter, preallocated input buffer)
+        self._slots = {int(input_details['shape'][0]): (interpreter, self._new_buffer(input_details['shape'][0]))}
+        # Interpreters are not thread-safe and own their tensors
+        self._lock = threading.Lock()
+
+    def _new_interpreter(self, input_shape=None):
+        interpreter = self._interpreter_class(model_content=self._model_content, num_threads=self._num_threads)
+        if input_shape is not None:
+            interpreter.resize_tensor_input(self._input_index, input_shape)
+        interpreter.allocate_tensors()
+        return interpreter
+
+    def _new_buffer(self, batch_size):
+        return np.empty((int(batch_size),) + self.input_shape, dtype=self.input_dtype)
+
+    @staticmethod
+    def _quantization(details):
+        scale, zero_point = details['quantization']
+        if not scale or not np.issubdtype(details['dtype'], np.integer):
+            return None
+        return scale, zero_point
+
+    def _quantize(self, frame):
+        frame = np.asarray(frame)
+        if self._input_quantization is None or frame.dtype == self.input_dtype:
+            return frame
+        scale, zero_point = self._input_quantization
+        limits = np.iinfo(self.input_dtype)
+        return np.clip(np.round(frame / scale + zero_point), limits.min, limits.max)
+
+    def _slot(self, batch_size):
+        slot = self._slots.get(batch_size)
+        if slot is None:
+            buffer = self._new_buffer(batch_size)
+            slot = self._slots[batch_size] = (self._new_interpreter(buffer.shape), buffer)
+        return slot
+
+    def __call__(self, batch):
+        """Run the model on one frame (H, W, C), a batch (N, H, W, C) or a list of frames."""
+        if isinstance(batch, np.ndarray) and batch.ndim == len(self.input_shape):
+            batch = batch[np.newaxis]
+        with self._lock:
+            interpreter, buffer = self._slot(len(batch))
+            for i, frame in enumerate(batch):
+                buffer[i] = self._quantize(frame)
+            interpreter.set_tensor(self._input_index, buffer)
+            interpreter.invoke()
+            output = interpreter.get_tensor(self._output_index)
+        if self._output_quantization is not None:
+            scale, zero_point = self._output_quantization
+            output = (output.astype(np.float32) - zero_point) * scale
+        return output
+
+
+def warm_up(model, batch_sizes, iterations):
+    """Run dummy batches of every size so graph tracing, kernel selection and
+    memory-arena growth happen before the first real frame."""
+    for batch_size in batch_sizes:
+        dummy = np.zeros((batch_size,) + tuple(model.input_shape), dtype=getattr(model, 'frame_dtype', np.float32))
+        for _ in range(iterations):
+            model(dummy)
+
+
+def import_backend(backend, intra_op_threads=0, inter_op_threads=0, omp_num_threads=0):
+    """Import the runtime behind ``backend``, usually the slowest part of a cold start.
+
+    For keras, the thread settings (0 leaves TensorFlow's choice) only take
+    effect before TensorFlow runs its first op.
+    """
+    if backend == 'keras':
+        if omp_num_threads:
+            # OpenMP reads this once, when TensorFlow's kernels load
+            os.environ['OMP_NUM_THREADS'] = str(omp_num_threads)
+        import tensorflow as tf
+        try:
+            if intra_op_threads:
+                tf.config.threading.set_intra_op_parallelism_threads(intra_op_threads)
+            if inter_op_threads:
+                tf.config.threading.set_inter_op_parallelism_threads(inter_op_threads)
+        except RuntimeError as e:
+            logger.warning(f"TensorFlow thread settings ignored: {e}")
+    elif backend == 'tflite':
+        _tflite_interpreter_class()
+    else:
+        raise ValueError(f"Unknown inference backend: {backend}")
+
+
+def load_model(model_path, backend='keras', input_dtype=None, num_threads=None):
+    """Load the model behind one of ``BACKENDS``, ready to be called on frames.
+
+    Frames are given as the model's ``frame_dtype`` (see ``FramePreprocessor.for_model``).
+    """
+    if backend == 'keras':
+        import tensorflow as tf
+        return CompiledModel(tf.keras.models.load_model(model_path), input_dtype=input_dtype)
+    if backend == 'tflite':
+        return TFLiteModel(model_path, num_threads=num_threads)
+    raise ValueError(f"Unknown inference backend: {backend}")
+
+
+def load_and_warm_up(model_path, backend='keras', input_dtype=None, num_threads=None,
+                     warmup_batch_sizes=(), warmup_iterations=0, intra_op_threads=0, inter_op_threads=0,
+                     omp_num_threads=0):
+    """Load and warm up a model, returning it with per-phase timings in seconds."""
+    timings = {}
+    start = time.perf_counter()
+    import_backend(backend, intra_op_threads, inter_op_threads, omp_num_threads)
+    timings['import_s'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    model = load_model(model_path, backend=backend, input_dtype=input_dtype, num_threads=num_threads)
+    timings['load_s'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    warm_up(model, warmup_batch_sizes, warmup_iterations)
+    timings['warmup_s'] = time.perf_counter() - start
+    return model, timings
@@ -0,0 +1,325 @@
+"""Counters, gauges and histograms in the Prometheus text exposition format.
+
+Updates sit on the detection hot path, so they take no lock. Every metric
+keeps one shard per OS thread (``threading.get_native_id``) and only that
+thread writes to it. Under eventlet all green threads share the hub's OS
+thread and switch only at I/O, and under asyncio every coroutine shares the
+loop's thread, so a shard is never written concurrently. A scrape sums the
+shards. A lock is taken only the first time a thread touches a metric; it
+is an OS-level lock, since eventlet's native pool threads update metrics too.
+
+Values the server already tracks (scheduler drops, gate hits, rooms) are read
+through callbacks at scrape time instead of being counted twice.
+"""
+import asyncio
+import threading
+import time
+from bisect import bisect_left
+
+from executor import native_lock
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Seconds, from 100 us (a cached frame) to 5 s (a stalled model call)
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+DETECTION_EVENTS = ('detection_result', 'detection_error')
+
+_thread_id = threading.get_native_id
+
+
+class _Shards:
+    """Per-OS-thread lists of ``size`` numbers."""
+
+    def __init__(self, size):
+        self._size = size
+        self._shards = {}
+        self._lock = native_lock()
+
+    def local(self):
+        thread_id = _thread_id()
+        try:
+            return self._shards[thread_id]
+        except KeyError:
+            with self._lock:
+                return self._shards.setdefault(thread_id, [0] * self._size)
+
+    def totals(self):
+        with self._lock:
+            shards = list(self._shards.values())
+        return [sum(values) for values in zip(*shards)] if shards else [0] * self._size
+
+
+class _Value:
+    def __init__(self):
+        self._shards = _Shards(1)
+
+    def inc(self, amount=1):
+        self._shards.local()[0] += amount
+
+    def dec(self, amount=1):
+        self._shards.local()[0] -= amount
+
+    def value(self):
+        return self._shards.totals()[0]
+
+
+class _Timer:
+    __slots__ = ('_histogram', '_start')
+
+    def __init__(self, histogram):
+        self._histogram = histogram
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._histogram.observe(time.perf_counter() - self._start)
+
+
+class _HistogramValue:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        # Per-bucket counts (the last one is +Inf), then the sum
+        self._shards = _Shards(len(buckets) + 2)
+
+    def observe(self, value):
+        shard = self._shards.local()
+        shard[bisect_left(self.buckets, value)] += 1
+        shard[-1] += value
+
+    def time(self):
+        """Context manager observing the seconds spent in its block."""
+        return _Timer(self)
+
+    def snapshot(self):
+        """Cumulative bucket counts, the total count and the sum."""
+        totals = self._shards.totals()
+        cumulative, running = [], 0
+        for count in totals[:-1]:
+            running += count
+            cumulative.append(running)
+        return cumulative, running, totals[-1]
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labelnames, values, extra=()):
+    pairs = list(zip(labelnames, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    type = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = native_lock()
+
+    def labels(self, *values, **kwargs):
+        if kwargs:
+            values = tuple(kwargs[name] for name in self.labelnames)
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} takes labels {self.labelnames}")
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def _samples(self):
+        raise NotImplementedError
+
+    def expose(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.type}']
+        lines += [f'{name}{labels} {_format_value(value)}' for name, labels, value in self._samples()]
+        return '\n'.join(lines)
+
+
+class Counter(_Metric):
+    type = 'counter'
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount=1):
+        self.labels().inc(amount)
+
+    def _samples(self):
+        for values, child in list(self._children.items()):
+            yield self.name, _format_labels(self.labelnames, values), child.value()
+
+
+class Gauge(Counter):
+    type = 'gauge'
+
+    def dec(self, amount=1):
+        self.labels().dec(amount)
+
+
+class Histogram(_Metric):
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value):
+        self.labels().observe(value)
+
+    def time(self):
+        return self.labels().time()
+
+    def _samples(self):
+        bounds = [_format_value(float(bound)) for bound in self.buckets] + ['+Inf']
+        for values, child in list(self._children.items()):
+            cumulative, count, total = child.snapshot()
+            for bound, bucket_count in zip(bounds, cumulative):
+                yield f'{self.name}_bucket', _format_labels(self.labelnames, values, [('le', bound)]), bucket_count
+            yield f'{self.name}_sum', _format_labels(self.labelnames, values), total
+            yield f'{self.name}_count', _format_labels(self.labelnames, values), count
+
+
+class CallbackMetric(_Metric):
+    """A counter or gauge whose samples are read from ``fn`` at scrape time.
+
+    ``fn`` returns ``{label_values_tuple: value}``.
+    """
+
+    def __init__(self, name, documentation, type, fn, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self.type = type
+        self._fn = fn
+
+    def _samples(self):
+        for values, value in self._fn().items():
+            yield self.name, _format_labels(self.labelnames, values), value
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def callback(self, name, documentation, type, fn, labelnames=()):
+        return self.register(CallbackMetric(name, documentation, type, fn, labelnames))
+
+    def expose(self):
+        """Every metric in the text exposition format."""
+        return '\n'.join(metric.expose() for metric in self._metrics) + '\n'
+
+
+class ServerMetrics:
+    """The detection server's metrics.
+
+    ``stage_seconds`` is labelled with the detection stage: ``base64_decode``,
+    ``image_decode``, ``preprocess`` (resize and normalize), ``inference``
+    (one model call for a whole batch) and ``emit``.
+    """
+
+    def __init__(self, scheduler, rooms, motion_gate=None, prediction_cache=None):
+        self.registry = MetricsRegistry()
+        self.stage_seconds = self.registry.histogram(
+            'detection_stage_seconds', 'Time spent in each detection stage.', ('stage',))
+        self.frames_received = self.registry.counter(
+            'frames_received_total', 'detect_sign frames received.')
+        self.frames_errored = self.registry.counter(
+            'frames_errored_total', 'Frames that failed to decode or predict.', ('stage',))
+        self.emitted = self.registry.counter(
+            'socketio_emitted_total', 'Socket.IO events emitted, by event.', ('event',))
+        self.connected = self.registry.gauge(
+            'connected_sids', 'Connected Socket.IO clients.')
+        self.registry.callback(
+            'frames_dropped_total', 'Frames dropped by the scheduler before inference.', 'counter',
+            lambda: self._dropped(scheduler), ('reason',))
+        self.registry.callback(
+            'frames_cached_total', 'Frames answered without running the model, by gate.', 'counter',
+            lambda: self._cached(motion_gate, prediction_cache), ('gate',))
+        self.registry.callback(
+            'active_rooms', 'Signaling rooms.', 'gauge', lambda: {(): len(rooms)})
+        self.registry.callback(
+            'inference_queue_depth', 'Frames waiting for the scheduler.', 'gauge',
+            lambda: {(): scheduler.pending()})
+        # Bind the children once so the hot path skips the label lookup
+        self.stages = {stage: self.stage_seconds.labels(stage)
+                       for stage in ('base64_decode', 'image_decode', 'preprocess', 'inference', 'emit')}
+        # Unlabelled series are exposed as 0 before their first update
+        self.frames_received.labels()
+        self.connected.labels()
+
+    @staticmethod
+    def _dropped(scheduler):
+        return {(reason,): count for reason, count in scheduler.dropped().items()}
+
+    @staticmethod
+    def _cached(motion_gate, prediction_cache):
+        cached = {}
+        if motion_gate is not None:
+            cached[('motion_gate',)] = motion_gate.stats()['skipped']
+        if prediction_cache is not None:
+            cached[('prediction_cache',)] = prediction_cache.stats()['hits']
+        return cached
+
+    def instrument_emits(self, server):
+        """Count every event ``server`` emits and time detection emits.
+
+        Works for both ``socketio.Server`` and ``socketio.AsyncServer``.
+        """
+        emit = server.emit
+        emitted, emit_seconds = self.emitted, self.stages['emit']
+
+        if asyncio.iscoroutinefunction(emit):
+            async def counted_emit(event, *args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return await emit(event, *args, **kwargs)
+                finally:
+                    emitted.labels(event).inc()
+                    if event in DETECTION_EVENTS:
+                        emit_seconds.observe(time.perf_counter() - start)
+        else:
+            def counted_emit(event, *args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return emit(event, *args, **kwargs)
+                finally:
+                    emitted.labels(event).inc()
+                    if event in DETECTION_EVENTS:
+                        emit_seconds.observe(time.perf_counter() - start)
+        server.emit = counted_emit
+
+    def expose(self):
+        return self.registry.expose()
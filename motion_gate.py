@@ -0,0 +1,93 @@
+"""Per-client motion gating for sign detection.
+
+Each prepared frame is averaged down to a small grayscale grid, and its
+motion energy is the mean absolute difference from the grid of the frame the
+client's last prediction was made on. Below ``threshold`` the signer is
+treated as static and the last prediction is reused without running the
+model, until ``max_skip_ms`` has passed since that prediction. Comparing
+against the last predicted frame rather than the previous one means slow
+drift still adds up to motion.
+"""
+import threading
+import time
+from collections import Counter
+
+import numpy as np
+
+from preprocessing import block_average
+
+GRID_SIZE = 16
+
+
+class _ClientMotion:
+    __slots__ = ('reference', 'prediction', 'predicted_at')
+
+    def __init__(self, reference, prediction, predicted_at):
+        self.reference = reference
+        self.prediction = prediction
+        self.predicted_at = predicted_at
+
+
+def motion_energy(grid, reference):
+    """Mean absolute difference between two downscaled frames, in [0, 1] for normalized input."""
+    return float(np.abs(grid - reference).mean())
+
+
+class MotionGate:
+    def __init__(self, threshold=0.02, max_skip_ms=1000.0, grid_size=GRID_SIZE):
+        self.threshold = threshold
+        self.max_skip = max_skip_ms / 1000.0
+        self.grid_size = grid_size
+
+        self._lock = threading.Lock()
+        self._clients = {}
+        self._counts = Counter()
+
+    def lookup(self, key, frame):
+        """Return ``(prediction, grid)`` for one prepared frame.
+
+        ``prediction`` is the client's last prediction if the frame has not
+        moved enough to need a new one, or None. Pass ``grid`` to ``store``
+        once the frame has been predicted.
+        """
+        grid = block_average(frame, self.grid_size, self.grid_size)
+        if frame.dtype == np.uint8:
+            # Raw pixels for models that normalize in their first layer
+            grid /= 255.0
+        now = time.monotonic()
+        with self._lock:
+            state = self._clients.get(key)
+            if (state is not None and now - state.predicted_at < self.max_skip
+                    and motion_energy(grid, state.reference) < self.threshold):
+                self._counts['skipped'] += 1
+                return state.prediction, grid
+            self._counts['passed'] += 1
+        return None, grid
+
+    def store(self, key, grid, prediction):
+        now = time.monotonic()
+        with self._lock:
+            state = self._clients.get(key)
+            if state is None:
+                self._clients[key] = _ClientMotion(grid, prediction, now)
+            else:
+                state.reference, state.prediction, state.predicted_at = grid, prediction, now
+
+    def remove_client(self, key):
+        with self._lock:
+            self._clients.pop(key, None)
+
+    def stats(self):
+        """How many inferences were skipped because the signer was static."""
+        with self._lock:
+            counts = dict(self._counts)
+            clients = len(self._clients)
+        skipped, passed = counts.get('skipped', 0), counts.get('passed', 0)
+        return {
+            'threshold': self.threshold,
+            'max_skip_ms': self.max_skip * 1000,
+            'skipped': skipped,
+            'passed': passed,
+            'skip_rate': skipped / (skipped + passed) if skipped + passed else 0.0,
+            'clients': clients,
+        }
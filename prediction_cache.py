@@ -0,0 +1,105 @@
+"""Per-client prediction cache for near-identical frames.
+
+A signer holding a pose sends many almost identical frames. Each prepared
+frame is reduced to a 64-bit difference hash (dHash): the frame is averaged
+down to a 9x8 grayscale grid and every bit records whether a cell is brighter
+than its left neighbour. Frames whose hashes differ in at most
+``max_distance`` bits are treated as the same pose, so the previous
+prediction is returned instead of running the model again, as long as that
+prediction is younger than ``ttl_ms``.
+
+Each client keeps its ``max_entries`` most recently used hashes, evicted in
+LRU order, and the whole client is dropped on disconnect.
+"""
+import threading
+import time
+from collections import Counter, OrderedDict
+
+import numpy as np
+
+from preprocessing import block_average
+
+HASH_SIZE = 8
+
+
+def dhash(frame, hash_size=HASH_SIZE):
+    """64-bit difference hash of a (H, W[, C]) frame as an int."""
+    cells = block_average(frame, hash_size, hash_size + 1)
+    bits = cells[:, 1:] > cells[:, :-1]
+    return int.from_bytes(np.packbits(bits).tobytes(), 'big')
+
+
+def hamming_distance(a, b):
+    return bin(a ^ b).count('1')
+
+
+class PredictionCache:
+    def __init__(self, max_entries=8, max_distance=4, ttl_ms=500.0):
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+        self.max_entries = max_entries
+        self.max_distance = max_distance
+        self.ttl = ttl_ms / 1000.0
+
+        self._lock = threading.Lock()
+        self._clients = {}  # key -> OrderedDict(hash -> (prediction, stored_at)), oldest first
+        self._counts = Counter()
+
+    def lookup(self, key, frame):
+        """Return ``(prediction, fingerprint)`` for one prepared frame.
+
+        ``prediction`` is the cached model output for a near-identical frame,
+        or None on a miss. Pass ``fingerprint`` to ``store`` once the frame
+        has been predicted.
+        """
+        fingerprint = dhash(frame)
+        now = time.monotonic()
+        with self._lock:
+            entries = self._clients.get(key)
+            if entries:
+                for cached_hash, (prediction, stored_at) in list(entries.items()):
+                    if now - stored_at > self.ttl:
+                        del entries[cached_hash]
+                        self._counts['expired'] += 1
+                    elif hamming_distance(cached_hash, fingerprint) <= self.max_distance:
+                        entries.move_to_end(cached_hash)
+                        self._counts['hits'] += 1
+                        return prediction, fingerprint
+            self._counts['misses'] += 1
+        return None, fingerprint
+
+    def store(self, key, fingerprint, prediction):
+        now = time.monotonic()
+        with self._lock:
+            entries = self._clients.get(key)
+            if entries is None:
+                entries = self._clients[key] = OrderedDict()
+            entries[fingerprint] = (np.array(prediction, copy=True), now)
+            entries.move_to_end(fingerprint)
+            while len(entries) > self.max_entries:
+                entries.popitem(last=False)
+                self._counts['evicted'] += 1
+
+    def remove_client(self, key):
+        with self._lock:
+            self._clients.pop(key, None)
+
+    def stats(self):
+        """Hit/miss counters, so the inference work saved is measurable."""
+        with self._lock:
+            counts = dict(self._counts)
+            entries = sum(len(client) for client in self._clients.values())
+            clients = len(self._clients)
+        hits, misses = counts.get('hits', 0), counts.get('misses', 0)
+        return {
+            'max_entries': self.max_entries,
+            'max_distance': self.max_distance,
+            'ttl_ms': self.ttl * 1000,
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': hits / (hits + misses) if hits + misses else 0.0,
+            'expired': counts.get('expired', 0),
+            'evicted': counts.get('evicted', 0),
+            'entries': entries,
+            'clients': clients,
+        }
@@ -0,0 +1,283 @@
+"""Shared input contract for the sign language model.
+
+Every code path that feeds the model goes through ``FramePreprocessor``, so
+frames are resized, color-converted and normalized the same way everywhere.
+The input size and channel count are read from the loaded model
+(``for_model``) rather than hard-coded; ``DEFAULT_INPUT_SHAPE`` is only used
+to build a new model.
+
+Encoded images take the same decode on every path: ``detect_sign`` payloads
+in the server, image files in ``scripts/test_model.py``, the dataset writer
+``scripts/preprocess.py`` and training (``preprocess_directory``, used by
+``scripts/train_model.py``). They produce bit-identical model inputs. Already
+decoded arrays (webcam crops in ``scripts/real_time_detect.py``, raw pixel
+payloads) skip JPEG draft decoding, which downscales in the DCT domain, so
+they differ from the encoded paths by about one grey level on average.
+``tests/test_input_contract.py`` checks both.
+
+``processed_dataset`` is grayscale (see ``scripts/preprocess.py``), so frames
+are converted to grayscale and replicated into the model's channels.
+
+``detect_sign`` accepts three payload forms for ``data['image']``:
+
+* ``bytes``: an encoded JPEG/WebP/PNG sent as a Socket.IO binary attachment.
+* ``bytes`` plus ``data['shape']``: a raw uint8 pixel buffer of that
+  (height, width[, channels]) shape, sent as a binary attachment.
+* ``str``: a ``data:image/...;base64,`` URL (legacy clients).
+
+The binary forms skip base64 and every string copy that comes with it.
+
+Models trained by ``scripts/train_model.py`` (or exported with
+``convert_model.py uint8``) take uint8 pixels and scale them in their first
+layer, a ``Rescaling(1/255)``. For those, ``FramePreprocessor`` hands the
+resized uint8 pixels straight to the model, with no float conversion or
+division in numpy, and batches are a quarter of the size of float32 ones.
+Older float models still get float32 frames normalized to [0, 1].
+"""
+import base64
+import binascii
+import functools
+import io
+import os
+
+import numpy as np
+from PIL import Image
+
+# (height, width, channels) used by scripts/train_model.py to build the model
+DEFAULT_INPUT_SHAPE = (64, 64, 3)
+# processed_dataset holds grayscale images
+GRAYSCALE = True
+# Resampling filter for every resize
+RESAMPLE = 'bicubic'
+
+_RESAMPLE_FILTERS = {'nearest': Image.NEAREST, 'bilinear': Image.BILINEAR, 'bicubic': Image.BICUBIC}
+_RAW_MODES = {1: 'L', 3: 'RGB', 4: 'RGBA'}
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+# Frame dtypes a model can take: raw pixels, or pixels normalized to [0, 1]
+FRAME_DTYPES = (np.dtype(np.uint8), np.dtype(np.float32))
+
+
+class FrameDecodeError(ValueError):
+    pass
+
+
+def decode_data_url(data_url):
+    try:
+        return base64.b64decode(data_url.split(',', 1)[1])
+    except (IndexError, binascii.Error) as e:
+        raise FrameDecodeError(f"Invalid data URL: {e}") from e
+
+
+def decode_raw_pixels(buffer, shape):
+    """Wrap a raw uint8 buffer as an image without copying the bytes."""
+    try:
+        shape = tuple(int(dim) for dim in shape)
+    except (TypeError, ValueError) as e:
+        raise FrameDecodeError(f"Invalid raw frame shape: {shape!r}") from e
+    if len(shape) == 2:
+        shape += (1,)
+    if len(shape) != 3 or shape[2] not in _RAW_MODES:
+        raise FrameDecodeError(f"Unsupported raw frame shape: {shape}")
+    pixels = np.frombuffer(buffer, dtype=np.uint8)
+    if pixels.size != shape[0] * shape[1] * shape[2]:
+        raise FrameDecodeError(f"Raw frame has {pixels.size} bytes, expected shape {shape}")
+    pixels = pixels.reshape(shape)
+    if shape[2] == 1:
+        pixels = pixels[:, :, 0]
+    return Image.fromarray(pixels, _RAW_MODES[shape[2]])
+
+
+def decode_frame(image, shape=None):
+    """Turn any supported ``detect_sign`` payload into a PIL image."""
+    if isinstance(image, str):
+        image = decode_data_url(image)
+    elif not isinstance(image, (bytes, bytearray, memoryview)):
+        raise FrameDecodeError(f"Unsupported frame payload type: {type(image).__name__}")
+    elif shape is not None:
+        return decode_raw_pixels(image, shape)
+
+    try:
+        return Image.open(io.BytesIO(image))
+    except Exception as e:
+        raise FrameDecodeError(f"Could not decode image: {e}") from e
+
+
+def normalize(pixels, out=None):
+    """Scale uint8 pixels to [0, 1] float32 in a single pass."""
+    if out is None:
+        out = np.empty(pixels.shape, dtype=np.float32)
+    return np.multiply(pixels, np.float32(1.0 / 255.0), out=out)
+
+
+def as_frame_dtype(pixels, dtype):
+    """uint8 pixels as frames of ``dtype``: unchanged for uint8, else normalized."""
+    return pixels if np.dtype(dtype) == np.uint8 else normalize(pixels)
+
+
+def model_frame_dtype(model):
+    """uint8 for a model that takes raw pixels and normalizes them itself, else float32.
+
+    Inference backends report ``frame_dtype``; for a plain Keras model it is
+    read from the input layer.
+    """
+    dtype = getattr(model, 'frame_dtype', None)
+    if dtype is None:
+        inputs = getattr(model, 'inputs', None)
+        dtype = inputs[0].dtype if inputs else np.float32
+    dtype = np.dtype(getattr(dtype, 'as_numpy_dtype', dtype))
+    return dtype if dtype == np.uint8 else np.dtype(np.float32)
+
+
+@functools.lru_cache(maxsize=16)
+def _pooling_matrices(height, width, channels, rows, cols):
+    """Matrices that average a (H, W * C) frame into a (rows, cols) grid."""
+    row_weights = np.zeros((rows, height), dtype=np.float32)
+    for i, (start, stop) in enumerate(_blocks(height, rows)):
+        row_weights[i, start:stop] = 1.0 / (stop - start)
+    col_weights = np.zeros((width, cols), dtype=np.float32)
+    for i, (start, stop) in enumerate(_blocks(width, cols)):
+        col_weights[start:stop, i] = 1.0 / ((stop - start) * channels)
+    # Interleaved channels of one pixel all land in that pixel's column block
+    return row_weights, np.repeat(col_weights, channels, axis=0)
+
+
+def _blocks(length, count):
+    edges = np.linspace(0, length, count + 1).astype(np.intp)
+    return zip(edges[:-1], edges[1:])
+
+
+def block_average(frame, rows, cols):
+    """Average a (H, W[, C]) frame down to a (rows, cols) grayscale grid.
+
+    Two small matrix products, much cheaper than reducing over strided axes.
+    """
+    frame = np.asarray(frame, dtype=np.float32)
+    height, width = frame.shape[:2]
+    channels = frame.shape[2] if frame.ndim == 3 else 1
+    row_weights, col_weights = _pooling_matrices(height, width, channels, rows, cols)
+    return row_weights @ frame.reshape(height, width * channels) @ col_weights
+
+
+class FramePreprocessor:
+    """Resize, color-convert and normalize frames for one model input shape.
+
+    Frames may be ``detect_sign`` payloads (see ``decode_frame``), PIL images
+    or uint8 numpy arrays in ``channel_order`` ('RGB', or 'BGR' for OpenCV).
+    With ``dtype='uint8'`` the model normalizes, so frames are left as pixels.
+    """
+
+    def __init__(self, input_shape=DEFAULT_INPUT_SHAPE, grayscale=GRAYSCALE, resample=RESAMPLE, dtype='float32'):
+        self.dtype = np.dtype(dtype)
+        if self.dtype not in FRAME_DTYPES:
+            raise ValueError(f"Unsupported frame dtype: {self.dtype}")
+        self.input_shape = tuple(int(dim) for dim in input_shape)
+        self.height, self.width, self.channels = self.input_shape
+        if self.channels not in (1, 3):
+            raise ValueError(f"Unsupported model input channels: {self.channels}")
+        self.size = (self.width, self.height)
+        # Single-channel models always take grayscale
+        self.mode = 'L' if grayscale or self.channels == 1 else 'RGB'
+        self.resample = _RESAMPLE_FILTERS[resample]
+
+    @classmethod
+    def for_model(cls, model, **kwargs):
+        """Match the input shape and dtype of a loaded Keras model or inference backend."""
+        kwargs.setdefault('dtype', model_frame_dtype(model))
+        return cls(tuple(model.input_shape)[-3:], **kwargs)
+
+    def open(self, image, shape=None, channel_order='RGB'):
+        """Open ``image`` as a PIL image without decoding its pixels yet."""
+        if isinstance(image, Image.Image):
+            return image
+        if isinstance(image, np.ndarray):
+            if image.ndim == 3 and channel_order == 'BGR':
+                image = image[:, :, 2::-1]
+            return Image.fromarray(np.ascontiguousarray(image))
+        return decode_frame(image, shape)
+
+    def decode(self, image, shape=None, channel_order='RGB'):
+        """Decode ``image`` into a loaded PIL image, not yet resized."""
+        img = self.open(image, shape, channel_order)
+        try:
+            if img.format == 'JPEG':
+                # Decode straight to the smallest DCT scale (1/2, 1/4, 1/8) that
+                # still covers the model size, and to grayscale if that is all we need
+                img.draft(self.mode, self.size)
+            img.load()
+        except (OSError, SyntaxError) as e:
+            raise FrameDecodeError(f"Could not decode image: {e}") from e
+        return img
+
+    def to_image(self, image, shape=None, channel_order='RGB'):
+        """Decode ``image`` into a PIL image of the model's size and color mode."""
+        img = self.decode(image, shape, channel_order)
+        try:
+            if img.mode in ('I;16', 'I', 'F'):
+                img = img.convert('L')
+            if img.mode != self.mode:
+                # RGBA drops its alpha (canvas frames are opaque); palette,
+                # CMYK and YCbCr are mapped through RGB
+                img = img.convert(self.mode)
+            if img.size != self.size:
+                # reducing_gap lets non-JPEG inputs box-reduce before the resampling pass
+                img = img.resize(self.size, self.resample, reducing_gap=3.0)
+        except (OSError, SyntaxError) as e:
+            raise FrameDecodeError(f"Could not decode image: {e}") from e
+        return img
+
+    def pixels(self, image, shape=None, channel_order='RGB', out=None):
+        """uint8 (H, W, C) pixels, with grayscale replicated into every channel."""
+        resized = np.asarray(self.to_image(image, shape, channel_order))
+        if out is None:
+            out = np.empty(self.input_shape, dtype=np.uint8)
+        out[...] = resized[:, :, np.newaxis] if resized.ndim == 2 else resized
+        return out
+
+    def preprocess(self, image, shape=None, channel_order='RGB', out=None):
+        """Model-ready (H, W, C) array for one frame: uint8 pixels, or float32 in [0, 1]."""
+        if self.dtype == np.uint8:
+            return self.pixels(image, shape, channel_order, out=out)
+        resized = np.asarray(self.to_image(image, shape, channel_order))
+        if resized.ndim == 2:
+            resized = resized[:, :, np.newaxis]
+        if out is None:
+            out = np.empty(self.input_shape, dtype=np.float32)
+        # Broadcasting replicates grayscale into every channel while normalizing
+        return np.multiply(resized, np.float32(1.0 / 255.0), out=out)
+
+    __call__ = preprocess
+
+    def preprocess_batch(self, images, shapes=None, channel_order='RGB', out=None):
+        """Model-ready (N, H, W, C) batch of ``dtype``.
+
+        Frames are resized into one uint8 buffer and, for float models,
+        normalized together in a single vectorized pass.
+        """
+        shapes = shapes if shapes is not None else [None] * len(images)
+        pixels = out if self.dtype == np.uint8 and out is not None else \
+            np.empty((len(images),) + self.input_shape, dtype=np.uint8)
+        for i, (image, shape) in enumerate(zip(images, shapes)):
+            self.pixels(image, shape, channel_order, out=pixels[i])
+        return pixels if self.dtype == np.uint8 else normalize(pixels, out=out)
+
+    def preprocess_file(self, path, out=None):
+        with open(path, 'rb') as f:
+            return self.preprocess(f.read(), out=out)
+
+    def preprocess_directory(self, directory):
+        """Every image under ``directory/<class name>/`` as ``(frames, labels, class_names)``.
+
+        Classes are the sorted subdirectory names and ``labels`` their indices.
+        Files are decoded exactly as the server decodes frames.
+        """
+        class_names = sorted(name for name in os.listdir(directory) if os.path.isdir(os.path.join(directory, name)))
+        paths, labels = [], []
+        for label, name in enumerate(class_names):
+            for file_name in sorted(os.listdir(os.path.join(directory, name))):
+                if file_name.lower().endswith(IMAGE_EXTENSIONS):
+                    paths.append(os.path.join(directory, name, file_name))
+                    labels.append(label)
+        frames = np.empty((len(paths),) + self.input_shape, dtype=self.dtype)
+        for i, path in enumerate(paths):
+            self.preprocess_file(path, out=frames[i])
+        return frames, np.array(labels, dtype=np.int64), class_names
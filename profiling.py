@@ -0,0 +1,215 @@
+"""On-demand CPU profiling of the running server.
+
+Three kinds of session, one at a time:
+
+* ``sample``: a sampling profiler that reads every thread's stack
+  (``sys._current_frames``) every ``interval_ms`` for ``seconds`` and
+  returns collapsed stacks (``thread;outer;...;inner count`` lines), the
+  input format of flamegraph.pl and speedscope. It covers Socket.IO handler
+  threads, the eventlet hub (shown as the green thread running when
+  sampled), the scheduler and eventlet's native thread pool, and costs
+  nothing outside a session.
+* ``cprofile``: deterministic cProfile of every decode and model call routed
+  through ``Profiler.call`` for ``seconds``, one ``cProfile.Profile`` per OS
+  thread merged into a single pstats file (``python -m pstats``, snakeviz).
+* TensorFlow trace: ``tf.profiler`` records the next ``calls`` in-process
+  model calls into a log directory for TensorBoard's profile plugin. A trace
+  that has not seen its calls after ``timeout_s`` is stopped when the next
+  session starts, and ``cancel_tf_trace`` stops one early.
+
+Sessions block the calling thread, so the server runs them through its
+executor (or ``run_in_executor``) rather than on the event loop.
+"""
+import cProfile
+import logging
+import marshal
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+
+from executor import native_lock
+
+logger = logging.getLogger(__name__)
+
+# Longest sample or cprofile session an admin may request
+MAX_SECONDS = 120.0
+# A TensorFlow trace still waiting for model calls after this long gives way to the next session
+TF_TRACE_TIMEOUT_S = 300.0
+
+
+class ProfilerError(Exception):
+    pass
+
+
+class ProfilerBusyError(ProfilerError):
+    def __init__(self):
+        super().__init__('A profiling session is already running')
+
+
+def _native_sleep():
+    """``time.sleep`` that blocks the OS thread even when eventlet has patched it."""
+    if 'eventlet' in sys.modules:
+        from eventlet import patcher
+        return patcher.original('time').sleep
+    import time
+    return time.sleep
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})'
+
+
+class Profiler:
+    def __init__(self):
+        # Model calls run on native threads under eventlet
+        self._lock = native_lock()
+        self._busy = False
+        self._profiles = None  # OS thread id -> cProfile.Profile while a cprofile session runs
+        self._active = set()  # OS threads currently inside a profiled call
+        self._tf_calls_left = 0
+        self._tf_logdir = None
+        self._tf_deadline = None
+
+    def _acquire(self):
+        with self._lock:
+            if self._tf_calls_left and time.monotonic() > self._tf_deadline:
+                logger.warning(f"TensorFlow trace into {self._tf_logdir} timed out with "
+                               f"{self._tf_calls_left} calls left")
+                self._stop_tf_trace()
+            if self._busy:
+                raise ProfilerBusyError()
+            self._busy = True
+
+    def _release(self):
+        with self._lock:
+            self._busy = False
+
+    @staticmethod
+    def _check_seconds(seconds):
+        if not 0 < seconds <= MAX_SECONDS:
+            raise ProfilerError(f"seconds must be in (0, {MAX_SECONDS:.0f}]")
+
+    def sample(self, seconds, interval_ms=5.0):
+        """Collapsed stacks of every thread, sampled for ``seconds``."""
+        self._check_seconds(seconds)
+        if interval_ms <= 0:
+            raise ProfilerError("interval_ms must be positive")
+        self._acquire()
+        try:
+            sleep = _native_sleep()
+            stacks = Counter()
+            for _ in range(max(1, int(seconds * 1000 / interval_ms))):
+                names = {thread.ident: thread.name for thread in threading.enumerate()}
+                here = sys._getframe()
+                for ident, frame in sys._current_frames().items():
+                    if frame is here:
+                        continue  # the sampler itself
+                    labels = []
+                    while frame is not None:
+                        labels.append(_frame_label(frame))
+                        frame = frame.f_back
+                    labels.append(names.get(ident, f'thread-{ident}'))
+                    stacks[';'.join(reversed(labels))] += 1
+                sleep(interval_ms / 1000.0)
+        finally:
+            self._release()
+        return ''.join(f'{stack} {count}\n' for stack, count in stacks.most_common())
+
+    def cprofile(self, seconds):
+        """pstats data (as ``pstats.Stats.dump_stats`` writes it) for the calls
+        made through ``call`` during the next ``seconds``."""
+        self._check_seconds(seconds)
+        self._acquire()
+        sleep = _native_sleep()
+        try:
+            self._profiles = {}
+            sleep(seconds)
+        finally:
+            profiles, self._profiles = self._profiles, None
+            # Let calls still in flight disable their own profiles
+            for _ in range(1000):
+                if not self._active:
+                    break
+                sleep(0.01)
+            self._release()
+        stats = pstats.Stats()
+        for profile in list(profiles.values()):
+            profile.create_stats()
+            if profile.stats:
+                stats.add(profile)
+        return marshal.dumps(stats.stats)
+
+    def call(self, fn, *args, **kwargs):
+        """Call ``fn``, under cProfile while a cprofile session runs."""
+        profiles = self._profiles
+        thread_id = threading.get_native_id()
+        if profiles is None or thread_id in self._active:
+            return fn(*args, **kwargs)
+        profile = profiles.get(thread_id)
+        if profile is None:
+            profile = profiles.setdefault(thread_id, cProfile.Profile())
+        self._active.add(thread_id)
+        profile.enable()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            profile.disable()
+            self._active.discard(thread_id)
+
+    def start_tf_trace(self, logdir, calls, timeout_s=TF_TRACE_TIMEOUT_S):
+        """Trace the next ``calls`` model calls made through ``inference``."""
+        if calls < 1:
+            raise ProfilerError("calls must be at least 1")
+        try:
+            import tensorflow as tf
+        except ImportError as e:
+            raise ProfilerError("TensorFlow is not installed") from e
+        try:
+            os.makedirs(logdir, exist_ok=True)
+        except OSError as e:
+            raise ProfilerError(f"Cannot create {logdir}: {e}") from e
+        self._acquire()
+        try:
+            tf.profiler.experimental.start(logdir)
+        except Exception as e:
+            self._release()
+            raise ProfilerError(f"TensorFlow profiler failed to start: {e}") from e
+        with self._lock:
+            self._tf_logdir = logdir
+            self._tf_deadline = time.monotonic() + timeout_s
+            self._tf_calls_left = calls
+
+    def cancel_tf_trace(self):
+        """Stop a pending TensorFlow trace, keeping what it recorded. False if none is running."""
+        with self._lock:
+            if not self._tf_calls_left:
+                return False
+            self._stop_tf_trace()
+            return True
+
+    def _stop_tf_trace(self):
+        # Called with the lock held
+        import tensorflow as tf
+        self._tf_calls_left = 0
+        try:
+            tf.profiler.experimental.stop()
+        except Exception as e:
+            logger.warning(f"TensorFlow profiler failed to stop: {e}")
+        self._busy = False
+
+    def inference(self, fn, *args, **kwargs):
+        """Call the model ``fn``; part of a TensorFlow trace while one is pending."""
+        if not self._tf_calls_left:
+            return self.call(fn, *args, **kwargs)
+        try:
+            return self.call(fn, *args, **kwargs)
+        finally:
+            with self._lock:
+                if self._tf_calls_left > 0:
+                    self._tf_calls_left -= 1
+                    if not self._tf_calls_left:
+                        self._stop_tf_trace()
@@ -0,0 +1,156 @@
+"""Registry of WebRTC signaling rooms.
+
+Socket.IO handlers run concurrently (green threads under eventlet, OS threads
+with ``python app.py``, tasks under ``asgi.py``), so every operation takes
+one lock. Each room keeps its peers in a set, and a reverse index maps each
+sid to the rooms it is in, so a disconnect only visits that sid's rooms.
+
+Rooms are kept in least-recently-active order. ``expire`` drops rooms with no
+activity (create, join, forwarded signaling, detection results) for
+``idle_ttl_s``, oldest first, so rooms held by clients that never leave
+cannot accumulate.
+"""
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+
+class RoomError(Exception):
+    """A sid could not join a room; the message is sent to the client."""
+
+
+class RoomNotFoundError(RoomError):
+    def __init__(self):
+        super().__init__('Room not found')
+
+
+class RoomFullError(RoomError):
+    def __init__(self):
+        super().__init__('Room is full')
+
+
+class _Room:
+    __slots__ = ('creator', 'peers', 'active_at')
+
+    def __init__(self, creator, active_at):
+        self.creator = creator
+        self.peers = {creator}
+        self.active_at = active_at
+
+
+class RoomRegistry:
+    def __init__(self, max_peers=2, idle_ttl_s=3600.0):
+        if max_peers < 0:
+            raise ValueError("max_peers must be non-negative")
+        self.max_peers = max_peers  # 0 for no limit
+        self.idle_ttl = idle_ttl_s  # 0 never expires rooms
+
+        self._lock = threading.Lock()
+        self._rooms = OrderedDict()  # least recently active first
+        self._sid_rooms = {}
+        self._created = 0
+        self._expired = 0
+        self._rejected = 0
+
+    def __contains__(self, room_id):
+        with self._lock:
+            return room_id in self._rooms
+
+    def __len__(self):
+        with self._lock:
+            return len(self._rooms)
+
+    def create(self, sid):
+        """Create a room with ``sid`` as its first peer and return its id."""
+        now = time.monotonic()
+        with self._lock:
+            room_id = str(uuid.uuid4())[:8]
+            while room_id in self._rooms:
+                room_id = str(uuid.uuid4())[:8]
+            self._rooms[room_id] = _Room(sid, now)
+            self._sid_rooms.setdefault(sid, set()).add(room_id)
+            self._created += 1
+            return room_id
+
+    def join(self, room_id, sid):
+        """Add ``sid`` to the room, raising a ``RoomError`` if it is missing or full."""
+        now = time.monotonic()
+        with self._lock:
+            room = self._rooms.get(room_id)
+            if room is None:
+                raise RoomNotFoundError()
+            if sid not in room.peers and self.max_peers and len(room.peers) >= self.max_peers:
+                self._rejected += 1
+                raise RoomFullError()
+            room.peers.add(sid)
+            self._sid_rooms.setdefault(sid, set()).add(room_id)
+            self._touch(room_id, room, now)
+
+    def touch(self, room_id):
+        """Record activity in the room; False if there is no such room."""
+        now = time.monotonic()
+        with self._lock:
+            room = self._rooms.get(room_id)
+            if room is None:
+                return False
+            self._touch(room_id, room, now)
+            return True
+
+    def _touch(self, room_id, room, now):
+        room.active_at = now
+        self._rooms.move_to_end(room_id)
+
+    def leave_all(self, sid):
+        """Remove ``sid`` from every room it is in.
+
+        Returns ``(room_id, remaining)`` pairs, where ``remaining`` is the
+        number of peers left; rooms left empty are deleted.
+        """
+        with self._lock:
+            left = []
+            for room_id in self._sid_rooms.pop(sid, ()):
+                room = self._rooms[room_id]
+                room.peers.discard(sid)
+                if not room.peers:
+                    del self._rooms[room_id]
+                left.append((room_id, len(room.peers)))
+            return left
+
+    def expire(self):
+        """Delete rooms idle for longer than ``idle_ttl_s`` and return their ids."""
+        if not self.idle_ttl:
+            return []
+        cutoff = time.monotonic() - self.idle_ttl
+        expired = []
+        with self._lock:
+            while self._rooms:
+                room_id, room = next(iter(self._rooms.items()))
+                if room.active_at > cutoff:
+                    break
+                del self._rooms[room_id]
+                for sid in room.peers:
+                    rooms = self._sid_rooms[sid]
+                    rooms.discard(room_id)
+                    if not rooms:
+                        del self._sid_rooms[sid]
+                expired.append(room_id)
+            self._expired += len(expired)
+        return expired
+
+    def peers(self, room_id):
+        with self._lock:
+            room = self._rooms.get(room_id)
+            return set(room.peers) if room else set()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'rooms': len(self._rooms),
+                'sids': len(self._sid_rooms),
+                'max_peers': self.max_peers,
+                'idle_ttl_s': self.idle_ttl,
+                'created': self._created,
+                'expired': self._expired,
+                'rejected_full': self._rejected,
+            }
@@ -0,0 +1,355 @@
+"""Micro-batching scheduler for sign detection.
+
+Frames submitted by any Socket.IO handler are queued per client. A
+background thread drains the clients round-robin and runs the model on a
+whole batch at once, either when ``max_batch_size`` frames are waiting or
+when the oldest waiting frame has been queued for ``max_wait_ms``. With
+``concurrency`` above one, that many batches can be in flight at once, which
+is what lets a pool of inference processes stay busy.
+
+Each client keeps at most ``queue_depth`` unprocessed frames: a new frame
+replaces the oldest pending one, so under overload clients get results for
+their latest frame instead of a growing backlog. Frames whose client-side
+capture timestamp is older than ``max_frame_age_ms`` are dropped, both on
+arrival and again right before they would be decoded. Ages are measured
+against the smallest clock offset the client showed within the last one to
+two ``clock_window_ms``, so a client clock that steps backwards or drifts
+stops making its frames look stale once the window has moved on.
+
+``gates`` (see ``motion_gate.MotionGate`` and
+``prediction_cache.PredictionCache``) are consulted in order for every
+prepared frame. The first gate that can answer it from an earlier prediction
+does, and the frame never reaches the model. Once a client is removed,
+frames of it still in flight neither store gate state nor reach their
+callback, so gates and callback-side state stay bounded under connection
+churn.
+
+With a ``recorder`` (see ``flight_recorder.FlightRecorder``), every
+dispatched frame is traced: its queue wait, the model call for its batch,
+the time spent in its callback, and whatever ``prepare_fn`` adds.
+"""
+import logging
+import threading
+import time
+from collections import Counter, OrderedDict, deque, namedtuple
+
+from flight_recorder import CACHED, ERROR, PREDICTED
+
+logger = logging.getLogger(__name__)
+
+_PendingFrame = namedtuple('_PendingFrame', ['key', 'payload', 'callback', 'enqueued_at', 'captured_at'])
+
+
+class _Client:
+    __slots__ = ('frames', 'window_offset', 'previous_offset', 'window_start', 'replaced', 'stale')
+
+    def __init__(self):
+        self.frames = deque()
+        # Smallest (server clock - client clock) seen in the current and the
+        # previous clock window, in ms. Ages are measured relative to the
+        # smaller of the two so client clock skew cancels out.
+        self.window_offset = None
+        self.previous_offset = None
+        self.window_start = None
+        self.replaced = 0
+        self.stale = 0
+
+
+class InferenceScheduler:
+    def __init__(self, predict_fn, prepare_fn=None, max_batch_size=8, max_wait_ms=10.0,
+                 queue_depth=1, max_frame_age_ms=0, clock_window_ms=5000.0, concurrency=1, gates=(),
+                 recorder=None):
+        """``predict_fn`` takes a list of prepared frames and returns one
+        prediction row per frame. ``prepare_fn(payload, trace)`` gets the
+        frame's recorder trace slot, or None when it is not traced.
+
+        Each gate provides ``lookup(key, frame) -> (prediction or None, token)``,
+        ``store(key, token, prediction)`` and ``remove_client(key)``.
+        """
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        if queue_depth < 1:
+            raise ValueError("queue_depth must be at least 1")
+        if clock_window_ms <= 0:
+            raise ValueError("clock_window_ms must be positive")
+        if concurrency < 1:
+            raise ValueError("concurrency must be at least 1")
+        self._predict_fn = predict_fn
+        self._prepare_fn = prepare_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.queue_depth = queue_depth
+        self.max_frame_age = max_frame_age_ms / 1000.0
+        self.clock_window = clock_window_ms / 1000.0
+        self.concurrency = concurrency
+        self.gates = tuple(gates)
+        self.recorder = recorder
+
+        self._cond = threading.Condition()
+        self._clients = {}
+        self._ready = OrderedDict()  # clients with pending frames, in service order
+        self._pending_count = 0
+        self._batch_sizes = Counter()
+        self._dropped = Counter()
+        self._running = False
+        self._threads = []
+
+    def start(self):
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+        self._threads = [
+            threading.Thread(target=self._run, name=f'inference-scheduler-{i}', daemon=True)
+            for i in range(self.concurrency)
+        ]
+        for thread in self._threads:
+            thread.start()
+        logger.info(f"Inference scheduler started (max_batch_size={self.max_batch_size}, "
+                    f"max_wait_ms={self.max_wait * 1000:.1f}, queue_depth={self.queue_depth}, "
+                    f"concurrency={self.concurrency})")
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        logger.info(f"Inference scheduler stopped, batch sizes: {self.stats()['distribution']}")
+
+    def submit(self, key, payload, callback, client_ts=None):
+        """Queue one frame for client ``key``.
+
+        ``payload`` is passed through ``prepare_fn`` on the scheduler thread
+        to produce the model input (without batch dimension).
+        ``callback(prediction, error)`` is invoked from the scheduler thread
+        with either the model output row for this frame or the exception
+        raised while preparing or predicting it. ``client_ts`` is the
+        client's capture time in milliseconds since the epoch.
+
+        Returns False if the frame was dropped as stale on arrival.
+        """
+        now = time.monotonic()
+        with self._cond:
+            client = self._clients.get(key)
+            if client is None:
+                client = self._clients[key] = _Client()
+
+            captured_at = self._captured_at(client, client_ts, now)
+            frame = _PendingFrame(key, payload, callback, now, captured_at)
+            if self._is_stale(frame, now):
+                client.stale += 1
+                self._dropped['stale'] += 1
+                return False
+
+            if len(client.frames) >= self.queue_depth:
+                # Latest frame wins; the client keeps its place in line
+                client.frames.popleft()
+                client.replaced += 1
+                self._dropped['replaced'] += 1
+                self._pending_count -= 1
+            client.frames.append(frame)
+            self._pending_count += 1
+            if key not in self._ready:
+                self._ready[key] = client
+
+            if self._pending_count >= self.max_batch_size or self._pending_count == 1:
+                self._cond.notify()
+            return True
+
+    def remove_client(self, key):
+        """Forget a disconnected client and discard its pending frames."""
+        with self._cond:
+            client = self._clients.pop(key, None)
+            self._ready.pop(key, None)
+            if client is not None:
+                self._pending_count -= len(client.frames)
+        for gate in self.gates:
+            gate.remove_client(key)
+
+    def _captured_at(self, client, client_ts, now):
+        if client_ts is None:
+            return None
+        offset = time.time() * 1000 - client_ts
+        if client.window_start is None or now - client.window_start >= self.clock_window:
+            # Offsets from before a clock step age out after at most two windows
+            fresh = client.window_start is not None and now - client.window_start < 2 * self.clock_window
+            client.previous_offset = client.window_offset if fresh else None
+            client.window_offset = None
+            client.window_start = now
+        if client.window_offset is None or offset < client.window_offset:
+            client.window_offset = offset
+        baseline = client.window_offset
+        if client.previous_offset is not None:
+            baseline = min(baseline, client.previous_offset)
+        return now - (offset - baseline) / 1000.0
+
+    def _is_stale(self, frame, now):
+        return (self.max_frame_age > 0 and frame.captured_at is not None
+                and now - frame.captured_at > self.max_frame_age)
+
+    def _next_batch(self):
+        with self._cond:
+            while self._running and not self._pending_count:
+                self._cond.wait()
+            if not self._running:
+                return None
+
+            # Hold the batch open until it is full or the oldest frame is due
+            deadline = min(client.frames[0].enqueued_at for client in self._ready.values()) + self.max_wait
+            while self._running and self._pending_count < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+
+            # Round-robin over clients so one client's backlog can't fill a batch
+            batch = []
+            while self._ready and len(batch) < self.max_batch_size:
+                key, client = self._ready.popitem(last=False)
+                batch.append(client.frames.popleft())
+                if client.frames:
+                    self._ready[key] = client
+            self._pending_count -= len(batch)
+            return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            self._dispatch(batch)
+
+    def _drop_stale(self, batch):
+        now = time.monotonic()
+        fresh = []
+        with self._cond:
+            for frame in batch:
+                if self._is_stale(frame, now):
+                    client = self._clients.get(frame.key)
+                    if client is not None:
+                        client.stale += 1
+                    self._dropped['stale'] += 1
+                else:
+                    fresh.append(frame)
+        return fresh
+
+    def _dispatch(self, batch):
+        # Stale frames are dropped before paying for their decode
+        frames, inputs, gate_tokens, traces = [], [], [], []
+        now = time.monotonic()
+        for frame in self._drop_stale(batch):
+            trace = self.recorder.begin(frame.enqueued_at, now) if self.recorder is not None else None
+            try:
+                prepared = frame.payload if self._prepare_fn is None else self._prepare_fn(frame.payload, trace)
+                answer, tokens = self._check_gates(frame.key, prepared)
+            except Exception as e:
+                self._complete(frame, trace, None, e)
+                continue
+            if answer is not None:
+                self._complete(frame, trace, answer, None, cached=True)
+                continue
+            inputs.append(prepared)
+            frames.append(frame)
+            gate_tokens.append(tokens)
+            traces.append(trace)
+        if not frames:
+            return
+
+        start = time.perf_counter()
+        try:
+            predictions = self._predict_fn(inputs)
+        except Exception as e:
+            logger.error(f"Batch inference failed ({len(frames)} frames): {e}")
+            for frame, trace in zip(frames, traces):
+                self._complete(frame, trace, None, e)
+            return
+        inference_seconds = time.perf_counter() - start
+
+        with self._cond:
+            self._batch_sizes[len(frames)] += 1
+        for frame, tokens, prediction in zip(frames, gate_tokens, predictions):
+            self._store_gates(frame.key, tokens, prediction)
+        for frame, trace, prediction in zip(frames, traces, predictions):
+            if trace is not None:
+                self.recorder.batch(trace, len(frames), inference_seconds)
+            self._complete(frame, trace, prediction, None)
+
+    def _is_connected(self, key):
+        with self._cond:
+            return key in self._clients
+
+    def _complete(self, frame, trace, prediction, error, cached=False):
+        # A removed client's callback would only re-create its per-client state downstream
+        connected = self._is_connected(frame.key)
+        if trace is None:
+            if connected:
+                self._safe_callback(frame.callback, prediction, error)
+            return
+        start = time.perf_counter()
+        if connected:
+            self._safe_callback(frame.callback, prediction, error)
+        outcome = ERROR if error is not None else CACHED if cached else PREDICTED
+        self.recorder.finish(trace, outcome, time.perf_counter() - start)
+
+    def _check_gates(self, key, prepared):
+        tokens = []
+        for gate in self.gates:
+            answer, token = gate.lookup(key, prepared)
+            if answer is not None:
+                # Gates checked before this one learn the answer as if it were predicted
+                self._store_gates(key, tokens, answer)
+                return answer, tokens
+            tokens.append(token)
+        return None, tokens
+
+    def _store_gates(self, key, tokens, prediction):
+        # Under the lock, so remove_client either sees the stored state or prevents it
+        with self._cond:
+            if key not in self._clients:
+                return
+            for gate, token in zip(self.gates, tokens):
+                gate.store(key, token, prediction)
+
+    @staticmethod
+    def _safe_callback(callback, prediction, error):
+        try:
+            callback(prediction, error)
+        except Exception as e:
+            logger.error(f"Error in inference callback: {e}")
+
+    def pending(self):
+        """Frames queued and not yet taken into a batch."""
+        with self._cond:
+            return self._pending_count
+
+    def dropped(self):
+        """Frames dropped so far, by reason ('replaced' or 'stale')."""
+        with self._cond:
+            return {reason: self._dropped.get(reason, 0) for reason in ('replaced', 'stale')}
+
+    def stats(self):
+        """Batch-size distribution achieved so far and per-client frame drops."""
+        with self._cond:
+            distribution = dict(sorted(self._batch_sizes.items()))
+            dropped = dict(self._dropped)
+            clients = {
+                key: {'pending': len(client.frames), 'replaced': client.replaced, 'stale': client.stale}
+                for key, client in self._clients.items()
+            }
+            queue_depth = self._pending_count
+        batches = sum(distribution.values())
+        frames = sum(size * count for size, count in distribution.items())
+        return {
+            'max_batch_size': self.max_batch_size,
+            'max_wait_ms': self.max_wait * 1000,
+            'batches': batches,
+            'frames': frames,
+            'mean_batch_size': frames / batches if batches else 0.0,
+            'distribution': distribution,
+            'queue_depth': queue_depth,
+            'dropped_replaced': dropped.get('replaced', 0),
+            'dropped_stale': dropped.get('stale', 0),
+            'clients': clients,
+        }
@@ -1,10 +1,15 @@
-import cv2
 import os
-import numpy as np
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from preprocessing import DEFAULT_INPUT_SHAPE, FramePreprocessor
 
 DATASET_PATH = "dataset"
 PROCESSED_PATH = "processed_dataset/"
 
+# Same resize and grayscale conversion the server and training use
+preprocessor = FramePreprocessor(DEFAULT_INPUT_SHAPE)
+
 os.makedirs(PROCESSED_PATH, exist_ok=True)
 
 for gesture in os.listdir(DATASET_PATH):
@@ -14,11 +19,8 @@ for gesture in os.listdir(DATASET_PATH):
 
     for img_name in os.listdir(input_folder):
         img_path = os.path.join(input_folder, img_name)
-        img = cv2.imread(img_path, cv2.IMREAD_GRAYSCALE)  # Convert to grayscale
-        img = cv2.resize(img, (64, 64))  # Resize to 64x64
-
-        # Normalize
-        img = img / 255.0
+        with open(img_path, "rb") as f:
+            img = preprocessor.to_image(f.read())  # Grayscale at the model input size
 
         save_path = os.path.join(output_folder, img_name)
-        cv2.imwrite(save_path, (img * 255).astype(np.uint8))  # Convert to uint8 before saving
+        img.save(save_path)
@@ -1,14 +1,21 @@
 import cv2
 import numpy as np
-import tensorflow as tf
 import os
+import sys
 
-# Load model
-MODEL_PATH = "models/new_sign_language_model.keras"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import ServerConfig
+from inference import load_model
+from preprocessing import FramePreprocessor
+
+# Load model with the same backend settings as the server (INFERENCE_BACKEND, TFLITE_THREADS)
+config = ServerConfig.from_env()
+MODEL_PATH = config.serving_model_path
 if not os.path.exists(MODEL_PATH):
     raise FileNotFoundError(f"Model file not found at {MODEL_PATH}. Please make sure the model is trained and saved correctly.")
 
-model = tf.keras.models.load_model(MODEL_PATH)
+model = load_model(MODEL_PATH, backend=config.inference_backend, num_threads=config.tflite_threads)
+preprocessor = FramePreprocessor.for_model(model)
 
 # Get classes from processed dataset to ensure consistency
 CLASSES = sorted(os.listdir("processed_dataset"))
@@ -35,14 +42,12 @@ while True:
     y = h//2 - roi_size//2
     cv2.rectangle(frame, (x, y), (x + roi_size, y + roi_size), (255, 0, 0), 2)
     
-    # Extract and preprocess hand region
+    # Extract and preprocess hand region (OpenCV frames are BGR)
     hand = frame[y:y+roi_size, x:x+roi_size]
-    hand = cv2.resize(hand, (64, 64))
-    hand = cv2.cvtColor(hand, cv2.COLOR_BGR2RGB)  # Convert to RGB
-    hand = np.expand_dims(hand, axis=0) / 255.0
+    hand = preprocessor.preprocess_batch([hand], channel_order='BGR')
 
     # Predict
-    prediction = model.predict(hand, verbose=0)  # Disable verbose output
+    prediction = model(hand)
     pred_idx = np.argmax(prediction)
     confidence = np.max(prediction) * 100
     
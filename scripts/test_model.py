@@ -1,12 +1,17 @@
 import cv2
 import numpy as np
-import tensorflow as tf
 import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from inference import load_model
+from preprocessing import FramePreprocessor
 
 # Load trained model
 MODEL_PATH = "models/new_sign_language_model.keras"  # Updated model path
 print(f"Loading model from: {MODEL_PATH}")
-model = tf.keras.models.load_model(MODEL_PATH)
+model = load_model(MODEL_PATH)
+preprocessor = FramePreprocessor.for_model(model)
 
 # Get class labels from the processed dataset directory
 CLASSES = sorted(os.listdir("processed_dataset"))
@@ -18,23 +23,9 @@ os.makedirs(TEST_IMAGE_DIR, exist_ok=True)  # Create directory if it doesn't exi
 
 # Function to preprocess image
 def preprocess_image(image_path):
-    img = cv2.imread(image_path)  # Read in RGB
-    if img is None:
-        raise ValueError(f"Could not read image: {image_path}")
-    
-    # Resize to match training input size
-    img = cv2.resize(img, (64, 64))
-    
-    # Convert to RGB (model expects RGB)
-    img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-    
-    # Normalize pixel values
-    img = img / 255.0
-    
-    # Add batch dimension
-    img = np.expand_dims(img, axis=0)
-    
-    return img
+    # Decode the encoded file exactly like the server decodes a detect_sign frame
+    with open(image_path, "rb") as f:
+        return preprocessor.preprocess_batch([f.read()])
 
 def test_single_image(image_path):
     try:
@@ -42,7 +33,7 @@ def test_single_image(image_path):
         processed_img = preprocess_image(image_path)
         
         # Make prediction
-        prediction = model.predict(processed_img, verbose=0)
+        prediction = model(processed_img)
         predicted_class = np.argmax(prediction[0])
         confidence = float(prediction[0][predicted_class] * 100)
         
@@ -1,19 +1,35 @@
 import tensorflow as tf
 from tensorflow.keras.preprocessing.image import ImageDataGenerator
 from tensorflow.keras.models import Sequential
-from tensorflow.keras.layers import Conv2D, MaxPooling2D, Dense, Flatten, Dropout
+from tensorflow.keras.layers import Input, Rescaling, Conv2D, MaxPooling2D, Dense, Flatten, Dropout
 from tensorflow.keras.callbacks import EarlyStopping, ModelCheckpoint
+from tensorflow.keras.utils import to_categorical
+import numpy as np
 import os
+import sys
 
-# Constants
-IMG_SIZE = 64
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from preprocessing import DEFAULT_INPUT_SHAPE, FramePreprocessor
+
+# Constants (input contract shared with the server, see preprocessing.py)
 BATCH_SIZE = 32
 EPOCHS = 20
+VALIDATION_SPLIT = 0.2
 MODEL_PATH = "models/new_sign_language_model.keras"
 
-# Create data generators with augmentation
+# Decode the dataset exactly as the server decodes frames, into uint8 pixels
+preprocessor = FramePreprocessor(DEFAULT_INPUT_SHAPE, dtype='uint8')
+frames, labels, class_names = preprocessor.preprocess_directory('processed_dataset')
+print(f"Loaded {len(frames)} images of {len(class_names)} classes")
+
+# Images are grouped by class on disk; shuffle so the validation split covers every class
+order = np.random.default_rng(0).permutation(len(frames))
+frames, labels = frames[order], to_categorical(labels[order], len(class_names))
+
+# Create data generators with augmentation. Batches stay uint8 pixels, as the
+# server sends them; the model's Rescaling layer normalizes them.
 train_datagen = ImageDataGenerator(
-    rescale=1./255,
+    dtype='uint8',
     rotation_range=20,
     width_shift_range=0.2,
     height_shift_range=0.2,
@@ -21,30 +37,20 @@ train_datagen = ImageDataGenerator(
     zoom_range=0.2,
     horizontal_flip=True,
     fill_mode='nearest',
-    validation_split=0.2
+    validation_split=VALIDATION_SPLIT
 )
 
-# Load and preprocess the data
-train_generator = train_datagen.flow_from_directory(
-    'processed_dataset',
-    target_size=(IMG_SIZE, IMG_SIZE),
-    batch_size=BATCH_SIZE,
-    class_mode='categorical',
-    subset='training'
-)
-
-validation_generator = train_datagen.flow_from_directory(
-    'processed_dataset',
-    target_size=(IMG_SIZE, IMG_SIZE),
-    batch_size=BATCH_SIZE,
-    class_mode='categorical',
-    subset='validation'
-)
+train_generator = train_datagen.flow(frames, labels, batch_size=BATCH_SIZE, subset='training')
+validation_generator = train_datagen.flow(frames, labels, batch_size=BATCH_SIZE, subset='validation')
 
 # Build the model with dropout
 model = Sequential([
+    # Raw uint8 pixels in, normalized to [0, 1] inside the graph
+    Input(shape=DEFAULT_INPUT_SHAPE, dtype='uint8'),
+    Rescaling(1.0 / 255),
+
     # First Convolutional Block
-    Conv2D(32, (3, 3), activation='relu', input_shape=(IMG_SIZE, IMG_SIZE, 3)),
+    Conv2D(32, (3, 3), activation='relu'),
     MaxPooling2D(2, 2),
     Dropout(0.25),
     
@@ -62,7 +68,7 @@ model = Sequential([
     Flatten(),
     Dense(512, activation='relu'),
     Dropout(0.5),
-    Dense(len(train_generator.class_indices), activation='softmax')
+    Dense(len(class_names), activation='softmax')
 ])
 
 # Compile the model
@@ -112,4 +118,4 @@ print(f"Training Loss: {final_train_loss:.4f}")
 print(f"Validation Loss: {final_val_loss:.4f}")
 
 print(f"\nModel saved to: {MODEL_PATH}")
-print("Available classes:", list(train_generator.class_indices.keys()))
+print("Available classes:", class_names)
@@ -0,0 +1,190 @@
+"""Model loading and the per-client serving pipeline, shared by both servers.
+
+``app.py`` (Flask-SocketIO, threading or eventlet) and ``asgi.py``
+(python-socketio on asyncio) build the same pipeline from ``ServerConfig``:
+the model or worker pool, the motion gate and prediction cache consulted by
+the scheduler, the emission policy for ``detection_result``, and the
+flight and traffic recorders.
+"""
+import atexit
+import hmac
+import logging
+import os
+import time
+
+import numpy as np
+
+from emission import EmissionPolicy
+from flight_recorder import FlightRecorder
+from motion_gate import MotionGate
+from prediction_cache import PredictionCache
+from preprocessing import decode_data_url
+from traffic_recorder import TrafficRecorder
+from workers import InferencePool
+
+logger = logging.getLogger(__name__)
+
+
+def load_class_names(classes_dir):
+    try:
+        class_names = sorted(os.listdir(classes_dir)) if os.path.exists(classes_dir) else []
+        logger.info(f"Loaded {len(class_names)} classes: {class_names}")
+        return class_names
+    except Exception as e:
+        logger.error(f"Error loading classes: {e}")
+        return []
+
+
+def load_inference_model(config, startup_timings, executor=None):
+    """Load the model, either in this process or in a pool of inference workers.
+
+    Per-phase timings are recorded in ``startup_timings``. Returns None if
+    the model could not be loaded. ``executor`` (see executor.py) runs the
+    blocking parts off an eventlet hub.
+    """
+    model_path = config.serving_model_path
+    if not os.path.exists(model_path):
+        logger.error(f"Model not found at: {model_path}")
+        return None
+    try:
+        if config.inference_workers > 0:
+            pool = InferencePool(model_path, config.inference_workers, config.batch_max_size,
+                                 backend=config.inference_backend, num_threads=config.tflite_threads,
+                                 warmup_iterations=config.warmup_iterations, executor=executor,
+                                 **thread_settings(config))
+            start = time.perf_counter()
+            pool.start()
+            startup_timings['workers_s'] = time.perf_counter() - start
+            startup_timings['workers'] = pool.worker_timings
+            logger.info(f"Model loaded and warmed up in {config.inference_workers} inference workers")
+            return pool
+
+        # Only the in-process backends import TensorFlow (or TFLite) into the server.
+        # Warm-up pays for tracing and kernel selection at every batch size the scheduler can produce.
+        from inference import load_and_warm_up
+        run = executor.run if executor is not None else (lambda fn, *args, **kwargs: fn(*args, **kwargs))
+        loaded, timings = run(
+            load_and_warm_up,
+            model_path,
+            backend=config.inference_backend,
+            num_threads=config.tflite_threads,
+            warmup_batch_sizes=range(1, config.batch_max_size + 1),
+            warmup_iterations=config.warmup_iterations,
+            **thread_settings(config),
+        )
+        startup_timings.update(timings)
+        logger.info(f"Model loaded successfully ({config.inference_backend} backend): "
+                    f"import {timings['import_s']:.2f}s, load {timings['load_s']:.2f}s, "
+                    f"warm-up {timings['warmup_s']:.2f}s")
+        return loaded
+    except Exception as e:
+        logger.error(f"Error loading model: {e}")
+        return None
+
+
+def thread_settings(config):
+    """TensorFlow and OpenMP thread counts for ``inference.load_and_warm_up``."""
+    return {
+        'intra_op_threads': config.tf_intra_op_threads,
+        'inter_op_threads': config.tf_inter_op_threads,
+        'omp_num_threads': config.omp_num_threads,
+    }
+
+
+def build_gates(config):
+    """The motion gate and prediction cache enabled in ``config`` (either may be None)."""
+    # Static signers reuse their last prediction until they move or max_skip_ms passes
+    motion_gate = None
+    if config.motion_threshold > 0:
+        motion_gate = MotionGate(threshold=config.motion_threshold, max_skip_ms=config.motion_max_skip_ms)
+
+    # Near-identical frames from a client held in one pose reuse its last prediction
+    prediction_cache = None
+    if config.prediction_cache_size > 0:
+        prediction_cache = PredictionCache(
+            max_entries=config.prediction_cache_size,
+            max_distance=config.prediction_cache_distance,
+            ttl_ms=config.prediction_cache_ttl_ms,
+        )
+    return motion_gate, prediction_cache
+
+
+def build_emission_policy(config):
+    # Only label changes, confidence swings and heartbeats are sent to the room
+    if config.emit_heartbeat_ms <= 0:
+        return None
+    return EmissionPolicy(confidence_delta=config.emit_confidence_delta, heartbeat_ms=config.emit_heartbeat_ms)
+
+
+def build_flight_recorder(config):
+    if config.flight_recorder_size <= 0:
+        return None
+    # Every frame of every batch in flight can hold a trace slot at once
+    max_in_flight = config.batch_max_size * max(1, config.inference_workers)
+    return FlightRecorder(size=config.flight_recorder_size, max_in_flight=max_in_flight)
+
+
+def build_traffic_recorder(config):
+    if not config.traffic_record_path:
+        return None
+    directory = os.path.dirname(config.traffic_record_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    recorder = TrafficRecorder(config.traffic_record_path, sample_rate=config.traffic_record_sample,
+                               max_bytes=int(config.traffic_record_max_mb * 1024 * 1024))
+    atexit.register(recorder.close)
+    logger.info(f"Recording {config.traffic_record_sample:.0%} of clients' traffic to {config.traffic_record_path}")
+    return recorder
+
+
+def admin_authorized(config, authorization):
+    """Whether an ``Authorization`` header carries ``Bearer <ADMIN_TOKEN>``.
+
+    Always False while no admin token is configured.
+    """
+    if not config.admin_token or not authorization:
+        return False
+    scheme, _, token = authorization.partition(' ')
+    return scheme.lower() == 'bearer' and hmac.compare_digest(token.strip().encode(), config.admin_token.encode())
+
+
+def prepare_frame(preprocessor, data, metrics, recorder=None, trace=None):
+    """Model input for one ``detect_sign`` payload.
+
+    Each stage is timed into ``metrics`` and, for a traced frame, into its
+    flight recorder slot along with the payload size and image dimensions.
+    """
+    image = data['image']
+    start = time.perf_counter()
+    if isinstance(image, str):
+        image = decode_data_url(image)
+        start = _end_stage(metrics, recorder, trace, 'base64_decode', start)
+    img = preprocessor.open(image, data.get('shape'))
+    if trace is not None:
+        recorder.frame(trace, len(image), img.width, img.height)
+    img = preprocessor.decode(img)
+    start = _end_stage(metrics, recorder, trace, 'image_decode', start)
+    prepared = preprocessor(img)
+    _end_stage(metrics, recorder, trace, 'preprocess', start)
+    return prepared
+
+
+def _end_stage(metrics, recorder, trace, stage, start):
+    end = time.perf_counter()
+    metrics.stages[stage].observe(end - start)
+    if trace is not None:
+        recorder.stage(trace, stage, end - start)
+    return end
+
+
+def decode_prediction(prediction, class_names):
+    predicted_class_index = np.argmax(prediction)
+    confidence = float(prediction[predicted_class_index])
+
+    # Get the class label
+    predicted_class = class_names[predicted_class_index]
+
+    return {
+        'label': predicted_class,
+        'confidence': confidence
+    }
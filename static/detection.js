@@ -96,6 +96,12 @@ socket.on('detection_result', (data) => {
     addToHistory(data);
 });
 
+socket.on('frame_dropped', (data) => {
+    // Frames arrived too late to be worth detecting (slow network or client clock step)
+    console.warn('Frame dropped:', data.reason);
+    showError('Frames are arriving too late to detect');
+});
+
 socket.on('detection_error', (data) => {
     console.error('Detection error:', data.error);
     showError(data.error);
@@ -148,18 +154,30 @@ function enableControls(enabled) {
 }
 
 // Frame capture and detection
+// Resolves to the JPEG bytes as an ArrayBuffer, which Socket.IO sends as a
+// binary attachment. Falls back to a base64 data URL without canvas.toBlob.
 function captureFrame() {
-    if (!localVideo || !localVideo.videoWidth) return null;
+    if (!localVideo || !localVideo.videoWidth) return Promise.resolve(null);
 
     try {
         // Draw the current frame
         captureCtx.drawImage(localVideo, 0, 0, captureCanvas.width, captureCanvas.height);
         
-        // Convert to base64
-        return captureCanvas.toDataURL('image/jpeg', 0.8);
+        if (!captureCanvas.toBlob) {
+            return Promise.resolve(captureCanvas.toDataURL('image/jpeg', 0.8));
+        }
+        return new Promise((resolve) => {
+            captureCanvas.toBlob((blob) => {
+                if (!blob) {
+                    resolve(null);
+                    return;
+                }
+                blob.arrayBuffer().then(resolve, () => resolve(null));
+            }, 'image/jpeg', 0.8);
+        });
     } catch (error) {
         console.error('Error capturing frame:', error);
-        return null;
+        return Promise.resolve(null);
     }
 }
 
@@ -171,10 +189,12 @@ function startDetection() {
     updateDetectionStatus(true);
     enableControls(true);
     
-    detectionInterval = setInterval(() => {
-        const frame = captureFrame();
-        if (frame) {
-            socket.emit('detect_sign', { image: frame });
+    detectionInterval = setInterval(async () => {
+        // Capture time lets the server drop frames that went stale in its queue
+        const ts = Date.now();
+        const frame = await captureFrame();
+        if (frame && isDetecting) {
+            socket.emit('detect_sign', { image: frame, ts: ts });
         }
     }, 1000 / FPS);
 }
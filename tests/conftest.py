@@ -0,0 +1,20 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+# Dataset frames come from the same helper as the benchmarks
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+
+@pytest.fixture(scope='session')
+def webcam_jpegs():
+    """Dataset images re-encoded as 640x480 JPEGs, the size browsers send."""
+    from dataset_frames import load_frames
+
+    try:
+        return load_frames(size=(640, 480), stride=10)
+    except SystemExit as e:
+        pytest.skip(str(e))
@@ -0,0 +1,99 @@
+"""Every entry point into the model produces the same inputs.
+
+Encoded images (the server's payload forms, image files and the training
+set) must match exactly. Already decoded arrays skip JPEG draft decoding, so
+they must match each other exactly and the encoded paths closely.
+"""
+import base64
+import io
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from preprocessing import DEFAULT_INPUT_SHAPE, FrameDecodeError, FramePreprocessor
+
+# Decoded arrays vs JPEG draft decoding, in grey levels
+MAX_MEAN_DIFFERENCE = 2.0
+MAX_PIXEL_DIFFERENCE = 32
+
+
+@pytest.fixture(params=['float32', 'uint8'])
+def preprocessor(request):
+    return FramePreprocessor(DEFAULT_INPUT_SHAPE, dtype=request.param)
+
+
+@pytest.fixture
+def server_inputs(preprocessor, webcam_jpegs):
+    """What the server feeds the model for each frame sent as a binary attachment."""
+    return np.stack([preprocessor(jpeg) for jpeg in webcam_jpegs])
+
+
+def _decoded(jpegs):
+    return [np.asarray(Image.open(io.BytesIO(jpeg)).convert('RGB')) for jpeg in jpegs]
+
+
+def test_data_url_matches_binary_payload(preprocessor, webcam_jpegs, server_inputs):
+    urls = ['data:image/jpeg;base64,' + base64.b64encode(jpeg).decode('ascii') for jpeg in webcam_jpegs]
+    np.testing.assert_array_equal(np.stack([preprocessor(url) for url in urls]), server_inputs)
+
+
+def test_batch_matches_single_frames(preprocessor, webcam_jpegs, server_inputs):
+    np.testing.assert_array_equal(preprocessor.preprocess_batch(webcam_jpegs), server_inputs)
+
+
+def test_image_files_match_server(preprocessor, webcam_jpegs, server_inputs, tmp_path):
+    # scripts/test_model.py
+    outputs = []
+    for i, jpeg in enumerate(webcam_jpegs):
+        path = tmp_path / f'{i}.jpg'
+        path.write_bytes(jpeg)
+        outputs.append(preprocessor.preprocess_file(str(path)))
+    np.testing.assert_array_equal(np.stack(outputs), server_inputs)
+
+
+def test_training_set_matches_server(preprocessor, webcam_jpegs, server_inputs, tmp_path):
+    # scripts/train_model.py loads processed_dataset through preprocess_directory
+    for i, jpeg in enumerate(webcam_jpegs):
+        class_dir = tmp_path / f'class{i % 3}'
+        class_dir.mkdir(exist_ok=True)
+        (class_dir / f'{i:04d}.jpg').write_bytes(jpeg)
+    frames, labels, class_names = preprocessor.preprocess_directory(str(tmp_path))
+
+    assert class_names == ['class0', 'class1', 'class2']
+    assert frames.dtype == preprocessor.dtype
+    # Grouped by class, then by file name
+    order = [i for label in range(3) for i in range(label, len(webcam_jpegs), 3)]
+    np.testing.assert_array_equal(frames, server_inputs[order])
+    np.testing.assert_array_equal(labels, [i % 3 for i in order])
+
+
+def test_decoded_arrays_match_each_other(preprocessor, webcam_jpegs):
+    # scripts/real_time_detect.py (OpenCV BGR crops) and raw pixel payloads
+    rgb = _decoded(webcam_jpegs)
+    reference = np.stack([preprocessor(pixels) for pixels in rgb])
+    np.testing.assert_array_equal(np.stack([preprocessor(pixels[:, :, ::-1], channel_order='BGR')
+                                            for pixels in rgb]), reference)
+    np.testing.assert_array_equal(np.stack([preprocessor(pixels.tobytes(), pixels.shape) for pixels in rgb]),
+                                  reference)
+    np.testing.assert_array_equal(preprocessor.preprocess_batch(rgb), reference)
+
+
+def test_decoded_arrays_close_to_server(webcam_jpegs):
+    preprocessor = FramePreprocessor(DEFAULT_INPUT_SHAPE, dtype='uint8')
+    for jpeg, pixels in zip(webcam_jpegs, _decoded(webcam_jpegs)):
+        difference = np.abs(preprocessor(jpeg).astype(np.int16) - preprocessor(pixels).astype(np.int16))
+        assert difference.mean() <= MAX_MEAN_DIFFERENCE
+        assert difference.max() <= MAX_PIXEL_DIFFERENCE
+
+
+def test_outputs_have_model_shape_and_dtype(preprocessor, server_inputs):
+    assert server_inputs.shape[1:] == preprocessor.input_shape
+    assert server_inputs.dtype == preprocessor.dtype
+
+
+@pytest.mark.parametrize('shape', ['abc', 5, [120, 'x', 3], [120, 160, 2], [120, 160]])
+def test_bad_raw_shapes_are_decode_errors(preprocessor, shape):
+    # Clients send the shape; anything unusable is their error, not an inference failure
+    with pytest.raises(FrameDecodeError):
+        preprocessor(bytes(120 * 160 * 3), shape)
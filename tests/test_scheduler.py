@@ -0,0 +1,79 @@
+"""Stale-frame dropping in ``InferenceScheduler`` under client clock changes."""
+from unittest import mock
+
+import pytest
+
+from scheduler import InferenceScheduler
+
+MAX_FRAME_AGE_MS = 1000.0
+CLOCK_WINDOW_MS = 5000.0
+FRAME_MS = 1000.0 / 15
+
+
+class FakeClock:
+    """Server clocks for the scheduler module, advanced by hand."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    def time(self):
+        return 1.7e9 + self.now
+
+    perf_counter = monotonic
+
+
+@pytest.fixture
+def clock():
+    clock = FakeClock()
+    with mock.patch('scheduler.time', clock):
+        yield clock
+
+
+@pytest.fixture
+def scheduler(clock):
+    # Not started: submit() alone decides whether a frame is stale on arrival
+    return InferenceScheduler(lambda batch: batch, max_frame_age_ms=MAX_FRAME_AGE_MS,
+                              clock_window_ms=CLOCK_WINDOW_MS)
+
+
+def stream(scheduler, clock, seconds, client_clock):
+    """Send frames at 15 fps for ``seconds``; ``client_clock`` maps server ms to client ms."""
+    accepted = []
+    for _ in range(int(seconds * 1000 / FRAME_MS)):
+        clock.now += FRAME_MS / 1000
+        accepted.append(scheduler.submit('sid', b'frame', lambda *_: None,
+                                         client_ts=client_clock(clock.time() * 1000)))
+    return accepted
+
+
+def test_frames_delayed_past_the_budget_are_stale(scheduler, clock):
+    assert all(stream(scheduler, clock, 2, lambda ms: ms))
+    clock.now += 0.001
+    assert not scheduler.submit('sid', b'frame', lambda *_: None, client_ts=clock.time() * 1000 - 2000)
+    assert scheduler.dropped()['stale'] == 1
+
+
+def test_backwards_clock_step_recovers_within_two_windows(scheduler, clock):
+    assert all(stream(scheduler, clock, 2, lambda ms: ms))
+    accepted = stream(scheduler, clock, 2 * CLOCK_WINDOW_MS / 1000 + 1, lambda ms: ms - 2000)
+    assert not accepted[0]
+    # Once the offsets from before the step have aged out, every frame is fresh again
+    first_fresh = accepted.index(True)
+    assert first_fresh * FRAME_MS <= 2 * CLOCK_WINDOW_MS
+    assert all(accepted[first_fresh:])
+
+
+def test_slow_clock_drift_never_goes_stale(scheduler, clock):
+    # A client clock losing 1% would fall a whole age budget behind in 100 s
+    start = clock.time() * 1000
+    accepted = stream(scheduler, clock, 300, lambda ms: start + (ms - start) * 0.99)
+    assert all(accepted)
+    assert scheduler.dropped()['stale'] == 0
+
+
+def test_forward_clock_step_keeps_frames_fresh(scheduler, clock):
+    assert all(stream(scheduler, clock, 2, lambda ms: ms))
+    assert all(stream(scheduler, clock, 2, lambda ms: ms + 5000))
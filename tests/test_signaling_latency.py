@@ -0,0 +1,121 @@
+"""WebRTC signaling stays fast and ordered while inference is saturated.
+
+Runs the app under eventlet, as production does, with a stand-in model whose
+every call blocks its OS thread (see ``benchmarks/benchmark_signaling_latency.py``).
+Detection clients keep the scheduler saturated while signaling is measured.
+"""
+import socket
+import threading
+import time
+from argparse import Namespace
+
+import numpy as np
+import pytest
+
+pytest.importorskip('eventlet')
+socketio = pytest.importorskip('socketio')
+pytest.importorskip('websocket')  # websocket-client, for the websocket transport
+
+from benchmark_signaling_latency import detection_client, signaling_latency, start_server
+from dataset_frames import load_frames
+
+MODEL_MS = 50.0
+CLIENTS = 6
+FPS = 15.0
+MAX_P99_MS = 150.0
+TIMEOUT = 5.0
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture(scope='module')
+def frames():
+    return load_frames(8, (160, 120))
+
+
+def _saturated_server(direct, frames):
+    args = Namespace(port=_free_port(), model_ms=MODEL_MS)
+    process = start_server(args, direct)
+    url = f'http://127.0.0.1:{args.port}'
+    stop = threading.Event()
+    threads = [threading.Thread(target=detection_client, args=(url, frames, FPS, stop), daemon=True)
+               for _ in range(CLIENTS)]
+    for thread in threads:
+        thread.start()
+    time.sleep(1.0)  # let the scheduler saturate
+
+    def close():
+        stop.set()
+        for thread in threads:
+            thread.join(5)
+        process.terminate()
+        process.wait()
+    return url, close
+
+
+@pytest.fixture(scope='module')
+def saturated_url(frames):
+    url, close = _saturated_server(False, frames)
+    yield url
+    close()
+
+
+def test_signaling_latency_stays_low(saturated_url):
+    timings = signaling_latency(saturated_url, samples=50, interval=0.05, timeout=TIMEOUT)
+    assert timings is not None, "signaling client could not connect"
+    assert timings.max() < TIMEOUT * 1000, "a create_room round trip timed out"
+    assert np.percentile(timings, 99) <= MAX_P99_MS
+
+
+def test_model_calls_on_the_event_loop_are_slower(frames, saturated_url):
+    """The stand-in model does block the hub when the executor is bypassed."""
+    url, close = _saturated_server(True, frames)
+    try:
+        blocked = signaling_latency(url, samples=20, interval=0.05, timeout=TIMEOUT)
+    finally:
+        close()
+    offloaded = signaling_latency(saturated_url, samples=20, interval=0.05, timeout=TIMEOUT)
+    assert blocked is None or np.percentile(blocked, 50) > np.percentile(offloaded, 50) + MODEL_MS / 2
+
+
+def test_relayed_signaling_keeps_its_order(saturated_url):
+    host, guest = socketio.Client(), socketio.Client()
+    room_ready, done = threading.Event(), threading.Event()
+    rooms, received = [], []
+    candidates = 50
+
+    host.on('room_created', lambda room_id: (rooms.append(room_id), room_ready.set()))
+    guest.on('room_joined', lambda room_id: room_ready.set())
+
+    def on_relayed(kind):
+        def handler(data):
+            received.append((kind, data))
+            if len(received) == candidates + 1:
+                done.set()
+        return handler
+    guest.on('offer', on_relayed('offer'))
+    guest.on('ice_candidate', on_relayed('ice_candidate'))
+
+    host.connect(saturated_url, transports=['websocket'], wait_timeout=TIMEOUT)
+    guest.connect(saturated_url, transports=['websocket'], wait_timeout=TIMEOUT)
+    try:
+        host.emit('create_room')
+        assert room_ready.wait(TIMEOUT)
+        room_ready.clear()
+        guest.emit('join_room', rooms[0])
+        assert room_ready.wait(TIMEOUT)
+
+        host.emit('offer', {'roomId': rooms[0], 'offer': {'type': 'offer', 'sdp': 'v=0'}})
+        for i in range(candidates):
+            host.emit('ice_candidate', {'roomId': rooms[0], 'candidate': {'candidate': f'candidate:{i}'}})
+        assert done.wait(TIMEOUT)
+    finally:
+        host.disconnect()
+        guest.disconnect()
+
+    assert received[0] == ('offer', {'type': 'offer', 'sdp': 'v=0'})
+    assert [data['candidate'] for _, data in received[1:]] == [f'candidate:{i}' for i in range(candidates)]
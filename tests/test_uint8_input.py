@@ -0,0 +1,109 @@
+"""uint8 frames for models that rescale their own input.
+
+Without TensorFlow, checks that uint8 frames carry exactly the pixels the
+float path normalizes, at a quarter of the bytes. With TensorFlow, checks
+that a model wrapped with a uint8 input and a Rescaling layer (as
+``scripts/train_model.py`` builds and ``convert_model.py uint8`` exports)
+predicts the same as the float model on the same frames.
+"""
+import numpy as np
+import pytest
+
+from motion_gate import MotionGate
+from preprocessing import DEFAULT_INPUT_SHAPE, FramePreprocessor, model_frame_dtype, normalize
+from workers import SharedFrameRing
+
+NUM_CLASSES = 7
+
+
+@pytest.fixture(scope='module')
+def frames(webcam_jpegs):
+    """The same frames as (uint8 pixels, float32 in [0, 1])."""
+    uint8_frames = FramePreprocessor(DEFAULT_INPUT_SHAPE, dtype='uint8').preprocess_batch(webcam_jpegs)
+    float_frames = FramePreprocessor(DEFAULT_INPUT_SHAPE, dtype='float32').preprocess_batch(webcam_jpegs)
+    return uint8_frames, float_frames
+
+
+def test_uint8_frames_normalize_to_float_frames(frames):
+    uint8_frames, float_frames = frames
+    assert uint8_frames.dtype == np.uint8
+    np.testing.assert_array_equal(normalize(uint8_frames), float_frames)
+
+
+def test_preprocessor_follows_model_input():
+    class Backend:
+        input_shape = DEFAULT_INPUT_SHAPE
+        frame_dtype = np.dtype(np.uint8)
+
+    class LegacyBackend:
+        input_shape = (1,) + DEFAULT_INPUT_SHAPE
+
+    assert FramePreprocessor.for_model(Backend()).dtype == np.uint8
+    assert FramePreprocessor.for_model(LegacyBackend()).dtype == np.float32
+    assert model_frame_dtype(LegacyBackend()) == np.float32
+
+
+def test_shared_ring_holds_a_quarter_of_the_bytes():
+    rings = [SharedFrameRing(4, 8, DEFAULT_INPUT_SHAPE, dtype) for dtype in ('float32', 'uint8')]
+    try:
+        assert rings[1].slots.nbytes * 4 == rings[0].slots.nbytes
+    finally:
+        for ring in rings:
+            ring.close()
+
+
+def test_motion_gate_sees_the_same_motion(frames):
+    uint8_frames, float_frames = frames
+    _, uint8_grid = MotionGate().lookup('client', uint8_frames[0])
+    _, float_grid = MotionGate().lookup('client', float_frames[0])
+    np.testing.assert_allclose(uint8_grid, float_grid, atol=1e-5)
+
+
+@pytest.fixture(scope='module')
+def float_model():
+    tf = pytest.importorskip('tensorflow')
+    tf.random.set_seed(0)
+    return tf.keras.Sequential([
+        tf.keras.Input(shape=DEFAULT_INPUT_SHAPE),
+        tf.keras.layers.Conv2D(8, (3, 3), activation='relu'),
+        tf.keras.layers.MaxPooling2D(4, 4),
+        tf.keras.layers.Flatten(),
+        tf.keras.layers.Dense(NUM_CLASSES, activation='softmax'),
+    ])
+
+
+def _assert_same_predictions(actual, expected):
+    np.testing.assert_allclose(actual, expected, rtol=1e-5, atol=1e-6)
+    np.testing.assert_array_equal(actual.argmax(axis=1), expected.argmax(axis=1))
+
+
+def test_uint8_model_matches_float_model(float_model, frames):
+    from convert_model import uint8_input_model
+    from inference import CompiledModel
+
+    uint8_frames, float_frames = frames
+    reference = CompiledModel(float_model)
+    candidate = CompiledModel(uint8_input_model(float_model))
+    assert reference.frame_dtype == np.float32
+    assert candidate.frame_dtype == np.uint8
+    _assert_same_predictions(candidate(uint8_frames), reference(float_frames))
+
+
+def test_in_graph_normalization_matches_float_model(float_model, frames):
+    from inference import CompiledModel
+
+    uint8_frames, float_frames = frames
+    legacy = CompiledModel(float_model, input_dtype='uint8')
+    _assert_same_predictions(legacy(uint8_frames), CompiledModel(float_model)(float_frames))
+
+
+def test_saved_uint8_model_loads_as_uint8(float_model, frames, tmp_path):
+    from convert_model import uint8_input_model
+    from inference import CompiledModel, load_model
+
+    uint8_frames, float_frames = frames
+    path = str(tmp_path / 'model_uint8.keras')
+    uint8_input_model(float_model).save(path)
+    model = load_model(path)
+    assert model.frame_dtype == np.uint8
+    _assert_same_predictions(model(uint8_frames), CompiledModel(float_model)(float_frames))
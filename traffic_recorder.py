@@ -0,0 +1,149 @@
+"""Record incoming Socket.IO traffic for replay.
+
+Opt-in (``TRAFFIC_RECORD_PATH``): every ``connect``, ``disconnect``,
+signaling event and ``detect_sign`` frame of the sampled clients is appended
+to one file with its arrival time, sid and room, so
+``benchmarks/replay_traffic.py`` can re-issue real frame sequences and room
+activity, with their original timing, against a test server.
+
+Sampling picks whole clients, ``sample_rate`` of them, so a replayed client
+keeps every frame and signaling message it sent. Recording stops once the
+file reaches ``max_bytes``.
+
+The file starts with ``MAGIC``. Each record is a ``_HEADER`` (arrival time in
+seconds since the epoch, event code, flags, then the lengths of the fields
+that follow), the UTF-8 sid and room, the event's JSON data without the
+image, and the image exactly as received: JPEG bytes from a binary attachment,
+or a base64 data URL (``TEXT_IMAGE`` flag). Frames are not re-encoded, so
+records cost a copy of the payload and no CPU.
+"""
+import json
+import logging
+import random
+import struct
+import threading
+import time
+from collections import namedtuple
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'SLTRAFFIC1\n'
+EVENTS = ('connect', 'disconnect', 'create_room', 'join_room', 'offer', 'answer', 'ice_candidate',
+          'detect_sign')
+_EVENT_CODES = {event: code for code, event in enumerate(EVENTS)}
+TEXT_IMAGE = 1  # flag: the image is a data URL string rather than bytes
+# time, event, flags, sid length, room length, data length, image length
+_HEADER = struct.Struct('<dBBHHII')
+
+TrafficEvent = namedtuple('TrafficEvent', 'time event sid room data')
+
+
+class TrafficRecorder:
+    def __init__(self, path, sample_rate=1.0, max_bytes=1 << 30, flush_interval_s=1.0):
+        if not 0 < sample_rate <= 1:
+            raise ValueError("sample_rate must be in (0, 1]")
+        self.path = path
+        self.sample_rate = sample_rate
+        self.max_bytes = max_bytes
+        self.flush_interval_s = flush_interval_s
+        self._lock = threading.Lock()
+        self._file = open(path, 'ab')
+        if self._file.tell() == 0:
+            self._file.write(MAGIC)
+        self._bytes = self._file.tell()
+        self._flushed_at = time.monotonic()
+        self._sampled = {}  # sid -> whether its traffic is recorded
+        self._recorded = 0
+        self._full = False
+
+    def _is_sampled(self, sid):
+        sampled = self._sampled.get(sid)
+        if sampled is None:
+            sampled = self._sampled[sid] = self.sample_rate >= 1 or random.random() < self.sample_rate
+        return sampled
+
+    def record(self, event, sid, room=None, data=None):
+        """Append one incoming event; ``data`` is the event's argument."""
+        if self._full or not self._is_sampled(sid):
+            if event == 'disconnect':
+                self._sampled.pop(sid, None)
+            return
+        flags, image = 0, b''
+        if event == 'detect_sign' and isinstance(data, dict) and 'image' in data:
+            image = data['image']
+            data = {key: value for key, value in data.items() if key != 'image'}
+            if isinstance(image, str):
+                flags, image = TEXT_IMAGE, image.encode()
+            elif not isinstance(image, (bytes, bytearray)):
+                image = b''
+        sid_bytes = sid.encode()
+        room_bytes = str(room).encode() if room else b''
+        data_bytes = json.dumps(data, separators=(',', ':'), default=str).encode() if data is not None else b''
+        header = _HEADER.pack(time.time(), _EVENT_CODES[event], flags, len(sid_bytes), len(room_bytes),
+                              len(data_bytes), len(image))
+        size = len(header) + len(sid_bytes) + len(room_bytes) + len(data_bytes) + len(image)
+
+        with self._lock:
+            if self._file is None:
+                return
+            if self._bytes + size > self.max_bytes:
+                self._full = True
+                self._file.flush()
+                logger.warning(f"Traffic recording stopped: {self.path} reached {self.max_bytes} bytes")
+                return
+            self._file.write(header)
+            self._file.write(sid_bytes)
+            self._file.write(room_bytes)
+            self._file.write(data_bytes)
+            self._file.write(image)
+            self._bytes += size
+            self._recorded += 1
+            now = time.monotonic()
+            if now - self._flushed_at >= self.flush_interval_s:
+                self._file.flush()
+                self._flushed_at = now
+        if event == 'disconnect':
+            self._sampled.pop(sid, None)
+
+    def stats(self):
+        return {
+            'path': self.path,
+            'sample_rate': self.sample_rate,
+            'recorded': self._recorded,
+            'bytes': self._bytes,
+            'full': self._full,
+        }
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def read_traffic(path):
+    """Yield the ``TrafficEvent``s of a recording in order.
+
+    ``detect_sign`` data gets its image back under ``'image'``. A record cut
+    short (the server stopped mid-write) ends the recording.
+    """
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a traffic recording")
+        while True:
+            header = f.read(_HEADER.size)
+            if len(header) < _HEADER.size:
+                return
+            arrived, code, flags, sid_len, room_len, data_len, image_len = _HEADER.unpack(header)
+            body = f.read(sid_len + room_len + data_len + image_len)
+            if len(body) < sid_len + room_len + data_len + image_len:
+                return
+            sid = body[:sid_len].decode()
+            room = body[sid_len:sid_len + room_len].decode() or None
+            data_end = sid_len + room_len + data_len
+            data = json.loads(body[sid_len + room_len:data_end]) if data_len else None
+            event = EVENTS[code]
+            if event == 'detect_sign' and isinstance(data, dict) and (image_len or flags & TEXT_IMAGE):
+                image = body[data_end:]
+                data['image'] = image.decode() if flags & TEXT_IMAGE else image
+            yield TrafficEvent(arrived, event, sid, room, data)
@@ -0,0 +1,338 @@
+"""Out-of-process inference workers fed through shared-memory frame slots.
+
+Each worker process loads the model once and serves batches written by the
+server into a ``SharedFrameRing``: one shared-memory block split into
+batch-sized slots, in the dtype the model takes (uint8 pixels for models
+that rescale in their first layer, a quarter of the bytes of float32 frames).
+Only the slot index and batch size travel over the task queue, so frames are
+never pickled; the small prediction arrays come back on a result queue. The server process itself never imports TensorFlow.
+"""
+import itertools
+import logging
+import multiprocessing
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from multiprocessing import shared_memory
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class SharedFrameRing:
+    """``num_slots`` batch buffers of shape (max_batch_size, *frame_shape)."""
+
+    def __init__(self, num_slots, max_batch_size, frame_shape, dtype='float32', name=None):
+        self.num_slots = num_slots
+        self.max_batch_size = max_batch_size
+        self.frame_shape = tuple(frame_shape)
+        self.dtype = np.dtype(dtype)
+
+        shape = (num_slots, max_batch_size) + self.frame_shape
+        if name is None:
+            size = int(np.prod(shape)) * self.dtype.itemsize
+            self._shm = shared_memory.SharedMemory(create=True, size=size)
+            self._owner = True
+        else:
+            # Spawned workers share the server's resource tracker, so only
+            # the creating side ever unlinks the block
+            self._shm = shared_memory.SharedMemory(name=name)
+            self._owner = False
+        self.slots = np.ndarray(shape, dtype=self.dtype, buffer=self._shm.buf)
+
+    def describe(self):
+        """Picklable description used by worker processes to attach."""
+        return (self._shm.name, self.num_slots, self.max_batch_size, self.frame_shape, self.dtype.str)
+
+    @classmethod
+    def attach(cls, description):
+        name, num_slots, max_batch_size, frame_shape, dtype = description
+        return cls(num_slots, max_batch_size, frame_shape, dtype, name=name)
+
+    def close(self):
+        # Views into the buffer must be released before the block can close
+        self.slots = None
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
+
+
+def _worker_main(worker_id, model_path, model_options, tasks, results):
+    try:
+        from inference import load_and_warm_up
+        model, timings = load_and_warm_up(model_path, **model_options)
+    except Exception as e:
+        results.put(('error', worker_id, str(e)))
+        return
+    results.put(('ready', worker_id, model.input_shape, model.frame_dtype.str, timings))
+
+    rings = {}
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        task_id, ring_description, slot, count = task
+        try:
+            ring = rings.get(ring_description[0])
+            if ring is None:
+                ring = rings[ring_description[0]] = SharedFrameRing.attach(ring_description)
+            results.put(('result', task_id, model(ring.slots[slot, :count]), None))
+        except Exception as e:
+            results.put(('result', task_id, None, str(e)))
+
+    for ring in rings.values():
+        ring.close()
+
+
+class _Worker:
+    __slots__ = ('process', 'tasks', 'ready', 'inflight')
+
+    def __init__(self, process, tasks):
+        self.process = process
+        self.tasks = tasks  # this worker's own task queue
+        self.ready = False
+        self.inflight = set()  # task ids handed to this worker and not yet answered
+
+
+class _Task:
+    __slots__ = ('future', 'slot', 'worker_id', 'submitted_at')
+
+    def __init__(self, future, slot, worker_id, submitted_at):
+        self.future = future
+        self.slot = slot
+        self.worker_id = worker_id
+        self.submitted_at = submitted_at
+
+
+class InferencePool:
+    """Pool of model-serving processes, callable like the in-process model.
+
+    Each worker has its own task queue, so the pool knows which batches a
+    worker holds. A batch's slot is reused once its result arrives, even if
+    the caller gave up waiting for it. Workers that die, or hold a batch for
+    longer than ``hang_timeout``, are replaced, and the slots and callers of
+    their batches are released.
+    """
+
+    def __init__(self, model_path, num_workers, max_batch_size, input_dtype=None, backend='keras',
+                 num_threads=None, warmup_iterations=0, timeout=30.0, executor=None, intra_op_threads=0,
+                 inter_op_threads=0, omp_num_threads=0, hang_timeout=None, health_interval=1.0):
+        if num_workers < 1:
+            raise ValueError("num_workers must be at least 1")
+        self.model_path = model_path
+        self.num_workers = num_workers
+        self.max_batch_size = max_batch_size
+        self.input_dtype = input_dtype
+        # Every worker warms up at every batch size before reporting ready
+        self.model_options = {
+            'backend': backend,
+            'input_dtype': input_dtype,
+            'num_threads': num_threads,
+            'warmup_batch_sizes': range(1, max_batch_size + 1),
+            'warmup_iterations': warmup_iterations,
+            'intra_op_threads': intra_op_threads,
+            'inter_op_threads': inter_op_threads,
+            'omp_num_threads': omp_num_threads,
+        }
+        self.input_shape = None
+        self.frame_dtype = None  # reported by the workers once the model is loaded
+        # Per-phase startup timings (import, load, warm-up) reported by each worker
+        self.worker_timings = {}
+        self.timeout = timeout
+        self.hang_timeout = hang_timeout if hang_timeout is not None else 4 * timeout
+        self.health_interval = health_interval
+        self.restarts = 0
+        # Runs the blocking result-queue reads (see executor.py)
+        self._executor = executor
+
+        # Spawned, not forked: workers start from a clean interpreter rather
+        # than a copy of the server's threads and event loop.
+        self._context = multiprocessing.get_context('spawn')
+        self._workers = []
+        self._ring = None
+        self._free_slots = queue.Queue()
+        self._tasks_by_id = {}
+        self._lock = threading.Lock()
+        self._task_ids = itertools.count()
+        self._collector = None
+        self._closing = False
+
+    def _spawn(self, worker_id):
+        tasks = self._context.Queue()
+        process = self._context.Process(
+            target=_worker_main,
+            args=(worker_id, self.model_path, self.model_options, tasks, self._results),
+            name=f'inference-worker-{worker_id}',
+            daemon=True,
+        )
+        process.start()
+        return _Worker(process, tasks)
+
+    def start(self, ready_timeout=300.0):
+        self._results = self._context.Queue()
+        self._workers = [self._spawn(worker_id) for worker_id in range(self.num_workers)]
+
+        # Wait until every worker has the model loaded and warmed up
+        for _ in range(self.num_workers):
+            message = self._wait_for_result(timeout=ready_timeout)
+            if message[0] == 'error':
+                self.close()
+                raise RuntimeError(f"Inference worker {message[1]} failed to load model: {message[2]}")
+            self._on_ready(message)
+
+        # Two slots per worker keeps every worker fed while the next batch is written
+        self._ring = SharedFrameRing(2 * self.num_workers, self.max_batch_size, self.input_shape,
+                                     self.frame_dtype)
+        for slot in range(self._ring.num_slots):
+            self._free_slots.put(slot)
+
+        self._collector = threading.Thread(target=self._collect_results, name='inference-results', daemon=True)
+        self._collector.start()
+        logger.info(f"Started {self.num_workers} inference workers, input shape {self.input_shape}, "
+                    f"{self.frame_dtype} frames")
+
+    def _on_ready(self, message):
+        _, worker_id, input_shape, frame_dtype, timings = message
+        self.input_shape = tuple(input_shape)
+        self.frame_dtype = np.dtype(frame_dtype)
+        self.worker_timings[worker_id] = timings
+        with self._lock:
+            self._workers[worker_id].ready = True
+
+    def _wait_for_result(self, timeout=None):
+        # A blocking pipe read; under eventlet it must not run on the hub
+        if self._executor is None:
+            return self._results.get(timeout=timeout)
+        return self._executor.run(self._results.get, timeout=timeout)
+
+    def _collect_results(self):
+        while True:
+            try:
+                message = self._wait_for_result(timeout=self.health_interval)
+            except queue.Empty:
+                message = ()
+            if message is None:
+                return
+            if message and message[0] == 'result':
+                self._on_result(*message[1:])
+            elif message and message[0] == 'ready':
+                self._on_ready(message)
+                logger.info(f"Inference worker {message[1]} restarted")
+            elif message and message[0] == 'error':
+                logger.error(f"Inference worker {message[1]} failed to load model: {message[2]}")
+            self._check_workers()
+
+    def _on_result(self, task_id, predictions, error):
+        with self._lock:
+            task = self._tasks_by_id.pop(task_id, None)
+            if task is None:
+                return
+            self._workers[task.worker_id].inflight.discard(task_id)
+        # The worker is done with the slot, whether or not its caller is still waiting
+        self._free_slots.put(task.slot)
+        if task.future.done():
+            return
+        if error is not None:
+            task.future.set_exception(RuntimeError(error))
+        else:
+            task.future.set_result(predictions)
+
+    def _check_workers(self):
+        """Replace workers that died or hold a batch past ``hang_timeout``."""
+        now = time.monotonic()
+        for worker_id, worker in enumerate(self._workers):
+            if self._closing:
+                return
+            with self._lock:
+                oldest = min((self._tasks_by_id[task_id].submitted_at for task_id in worker.inflight), default=now)
+            alive = worker.process.is_alive()
+            if not alive and not worker.ready:
+                continue  # failed to load; its error is already logged, and a restart would fail the same way
+            if alive and now - oldest <= self.hang_timeout:
+                continue
+            if worker.process.is_alive():
+                logger.error(f"Inference worker {worker_id} held a batch for {now - oldest:.1f} s; restarting it")
+                worker.process.terminate()
+            else:
+                logger.error(f"Inference worker {worker_id} exited with code {worker.process.exitcode}; "
+                             f"restarting it")
+            worker.process.join(timeout=5)
+            self._restart(worker_id)
+
+    def _restart(self, worker_id):
+        with self._lock:
+            worker = self._workers[worker_id]
+            worker.ready = False
+            lost = [self._tasks_by_id.pop(task_id) for task_id in worker.inflight]
+            worker.inflight.clear()
+        replacement = self._spawn(worker_id)
+        with self._lock:
+            self._workers[worker_id] = replacement
+            self.restarts += 1
+        worker.tasks.cancel_join_thread()
+        worker.tasks.close()
+        for task in lost:
+            self._free_slots.put(task.slot)
+            if not task.future.done():
+                task.future.set_exception(RuntimeError(f"Inference worker {worker_id} stopped"))
+
+    def _pick_worker(self):
+        # Called with the lock held: the ready worker with the fewest batches in flight
+        ready = [(len(worker.inflight), worker_id) for worker_id, worker in enumerate(self._workers) if worker.ready]
+        if not ready:
+            raise RuntimeError("No inference worker is ready")
+        return min(ready)[1]
+
+    def __call__(self, inputs):
+        """Run a list of prepared frames through the least busy worker."""
+        if len(inputs) > self.max_batch_size:
+            raise ValueError(f"Batch of {len(inputs)} exceeds max_batch_size {self.max_batch_size}")
+        slot = self._free_slots.get(timeout=self.timeout)
+        task_id = next(self._task_ids)
+        future = Future()
+        try:
+            # Stack straight into shared memory; this is the only copy of the frames
+            np.stack(inputs, out=self._ring.slots[slot, :len(inputs)])
+            with self._lock:
+                worker_id = self._pick_worker()
+                self._tasks_by_id[task_id] = _Task(future, slot, worker_id, time.monotonic())
+                self._workers[worker_id].inflight.add(task_id)
+                self._workers[worker_id].tasks.put((task_id, self._ring.describe(), slot, len(inputs)))
+        except BaseException:
+            with self._lock:
+                task = self._tasks_by_id.pop(task_id, None)
+                if task is not None:
+                    self._workers[task.worker_id].inflight.discard(task_id)
+            self._free_slots.put(slot)
+            raise
+        # On timeout the slot stays with the task until its result (or its worker's restart) frees it
+        return future.result(timeout=self.timeout)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'workers': self.num_workers,
+                'ready': sum(worker.ready for worker in self._workers),
+                'inflight': len(self._tasks_by_id),
+                'free_slots': self._free_slots.qsize(),
+                'restarts': self.restarts,
+            }
+
+    def close(self):
+        self._closing = True
+        for worker in self._workers:
+            worker.tasks.put(None)
+        for worker in self._workers:
+            worker.process.join(timeout=5)
+            if worker.process.is_alive():
+                worker.process.terminate()
+        self._workers = []
+        if self._collector is not None:
+            self._results.put(None)
+            self._collector.join()
+            self._collector = None
+        if self._ring is not None:
+            self._ring.close()
+            self._ring = None